@@ -0,0 +1,122 @@
+"""
+Who may do what with a team, resolved in one place.
+
+A user's role comes from their profile. Their team memberships are loaded only when a
+check needs them, at most once per request (the TeamAccess is memoised on the request),
+and cached across requests under a key carrying ``Profile.access_version``. Saving a
+profile, or creating, changing or deleting one of the user's memberships, bumps the
+version, so a stale entry is never read again and simply expires. Team ownership is
+``team.created_by_id`` and needs no lookup.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from users.models import Profile
+
+from .models import TeamMembership
+
+
+class TeamAccess:
+    """
+    A user's role and memberships, answering permission questions without further queries.
+    """
+
+    def __init__(self, user, role, version):
+        self.user = user
+        self.role = role
+        self.version = version
+        self._memberships = None
+
+    @property
+    def memberships(self):
+        """
+        ``{team_id: status}`` of the user's memberships, loaded on first use.
+        """
+        if self._memberships is None:
+            key = _cache_key(self.user.id, self.version)
+            self._memberships = cache.get(key)
+            if self._memberships is None:
+                self._memberships = dict(TeamMembership.objects.filter(user=self.user).values_list('team_id', 'status'))
+                cache.set(key, self._memberships, settings.TEAM_ACCESS_CACHE_TIMEOUT)
+        return self._memberships
+
+    @property
+    def is_admin(self):
+        return self.role == 'admin'
+
+    @property
+    def is_common(self):
+        return self.role == 'common'
+
+    def status(self, team):
+        """
+        The user's membership status in ``team`` ('pending', 'accepted', 'rejected'), or None.
+        """
+        return self.memberships.get(team.id)
+
+    def is_owner(self, team):
+        return team.created_by_id == self.user.id
+
+    def is_member(self, team):
+        """
+        Accepted members and the owner.
+        """
+        return self.is_owner(team) or self.status(team) == 'accepted'
+
+    def can_view(self, team):
+        """
+        Members and PMA Administrators can read a team's files, chat, roadmap and calendar.
+        """
+        return self.is_admin or self.is_member(team)
+
+    def can_contribute(self, team):
+        """
+        Only members add files, milestones and availability; PMA Administrators moderate.
+        """
+        return self.is_member(team)
+
+    def can_manage(self, team):
+        """
+        The owner and PMA Administrators can delete a team.
+        """
+        return self.is_admin or self.is_owner(team)
+
+    def accepted_team_ids(self):
+        return [team_id for team_id, status in self.memberships.items() if status == 'accepted']
+
+
+def _cache_key(user_id, version):
+    return f'team_access:{user_id}:{version}'
+
+
+def load_access(user):
+    """
+    The TeamAccess of ``user``. Memberships are read, from the cache when it holds the
+    current version, only once a question needs them.
+    """
+    try:
+        profile = user.profile
+    except Profile.DoesNotExist:
+        # Users created outside the sign-up signal and never logged in through the site
+        # (e.g., by createsuperuser on an old database, or an admin session) have none yet
+        profile, _ = Profile.objects.get_or_create(user=user, defaults={'role': 'common'})
+        user.profile = profile
+    return TeamAccess(user, profile.role, profile.access_version)
+
+
+def get_access(request):
+    """
+    The TeamAccess of the request's user, resolved at most once per request.
+    """
+    access = getattr(request, '_team_access', None)
+    if access is None or access.user is not request.user:
+        access = request._team_access = load_access(request.user)
+    return access
+
+
+def invalidate_access(user_id):
+    """
+    Retire the cached access of a user after their memberships changed.
+    """
+    Profile.objects.filter(user_id=user_id).update(access_version=F('access_version') + 1)
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class ProjectB07Config(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'project_b_07'
+
+    def ready(self):
+        import project_b_07.signals
@@ -2,6 +2,8 @@
 ASGI config for project_b_07 project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serving the app through ASGI enables the team chat event stream; under WSGI the
+chat page falls back to polling.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -0,0 +1,189 @@
+"""
+Content-addressed storage for team file uploads.
+
+Uploads are hashed with SHA-256 and stored once under ``blobs/<2 hex>/<sha256>``. A
+StoredBlob row counts the TeamFile rows that point at the object, so identical
+uploads skip the S3 PUT and the object is only removed with its last reference.
+
+Released objects are not deleted inline: their keys are recorded as
+PendingObjectDelete rows and removed by a background job in batched
+``DeleteObjects`` requests.
+"""
+
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .jobs import enqueue, task_path
+from .models import Job, PendingObjectDelete, StoredBlob, TeamFile
+from .previews import PREVIEW_SUFFIX, preview_key
+from .storage import get_s3_client
+from .transfers import stream_upload
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def content_key(digest):
+    """
+    S3 key for an object with the given SHA-256 hex digest.
+    """
+    return f"blobs/{digest[:2]}/{digest}"
+
+
+def hash_file(fileobj):
+    """
+    Return the SHA-256 hex digest and size of a file-like object, leaving it rewound.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    fileobj.seek(0)
+    for chunk in iter(lambda: fileobj.read(HASH_CHUNK_SIZE), b''):
+        digest.update(chunk)
+        size += len(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest(), size
+
+
+def store_file(fileobj, content_type, digest=None, size=None):
+    """
+    Store a file content-addressed and take a reference on its StoredBlob.
+    Returns ``(blob, uploaded)``; ``uploaded`` is False when the bytes were already stored.
+    The caller must ``release_blob`` the reference if it does not end up attached to a TeamFile.
+    """
+    if digest is None:
+        digest, size = hash_file(fileobj)
+
+    # Reuse the stored object when these bytes were uploaded before
+    if StoredBlob.objects.filter(sha256=digest).update(ref_count=F('ref_count') + 1):
+        return StoredBlob.objects.get(sha256=digest), False
+
+    key = content_key(digest)
+    stream_upload(get_s3_client(), fileobj, key, content_type)
+    with transaction.atomic():
+        blob, _ = StoredBlob.objects.get_or_create(
+            sha256=digest,
+            defaults={'key': key, 'size': size, 'content_type': content_type},
+        )
+        StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+    blob.refresh_from_db()
+    return blob, True
+
+
+def store_many(items, max_workers):
+    """
+    Store several files content-addressed, uploading the distinct new contents concurrently.
+
+    ``items`` is a list of ``(fileobj, content_type, digest, size)``. Returns one
+    ``(blob, error)`` pair per item, in order. Each returned blob carries one reference
+    for its item, which the caller must ``release_blob`` if it is not attached to a TeamFile.
+    """
+    by_digest = {}
+    for index, (_, _, digest, _) in enumerate(items):
+        by_digest.setdefault(digest, []).append(index)
+    stored = set(StoredBlob.objects.filter(sha256__in=by_digest).values_list('sha256', flat=True))
+
+    # Only the S3 transfers run in the pool; database work stays on the calling thread
+    s3 = get_s3_client()
+    errors = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            digest: pool.submit(stream_upload, s3, items[indexes[0]][0], content_key(digest), items[indexes[0]][1])
+            for digest, indexes in by_digest.items()
+            if digest not in stored
+        }
+        for digest, future in futures.items():
+            error = future.exception()
+            if error is not None:
+                errors[digest] = error
+
+    results = [None] * len(items)
+    for digest, indexes in by_digest.items():
+        if digest in errors:
+            for index in indexes:
+                results[index] = (None, errors[digest])
+            continue
+        fileobj, content_type, _, size = items[indexes[0]]
+        with transaction.atomic():
+            if not StoredBlob.objects.filter(sha256=digest).update(ref_count=F('ref_count') + len(indexes)):
+                if digest in stored:
+                    # Released since it was looked up; store the bytes the usual way
+                    blob, _ = store_file(fileobj, content_type, digest, size)
+                    StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + len(indexes) - 1)
+                else:
+                    blob, _ = StoredBlob.objects.get_or_create(
+                        sha256=digest,
+                        defaults={'key': content_key(digest), 'size': size, 'content_type': content_type},
+                    )
+                    StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + len(indexes))
+        blob = StoredBlob.objects.get(sha256=digest)
+        for index in indexes:
+            results[index] = (blob, None)
+    return results
+
+
+def release_blob(blob_id):
+    """
+    Drop one reference to a StoredBlob, deleting the row and its S3 object with the last one.
+    """
+    with transaction.atomic():
+        blob = StoredBlob.objects.select_for_update().filter(pk=blob_id).first()
+        if blob is None:
+            return
+        if blob.ref_count > 1:
+            StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+            return
+        blob.delete()
+        # Files sharing the blob also share its preview
+        queue_object_deletes([blob.key, preview_key(blob.key)])
+
+
+def queue_object_deletes(keys):
+    """
+    Record S3 keys to delete and make sure a purge job is queued. Called inside the
+    transaction that drops the last reference, so the objects go exactly when the rows do.
+    """
+    PendingObjectDelete.objects.bulk_create(
+        [PendingObjectDelete(key=key) for key in keys], ignore_conflicts=True
+    )
+    if not Job.objects.filter(task=task_path(purge_pending_objects), status='queued').exists():
+        enqueue(purge_pending_objects)
+
+
+def _referenced_keys(keys):
+    """
+    Keys that are in use again, e.g. because the same bytes were uploaded since they were released.
+    """
+    # A preview is in use while its source is
+    sources = {key: key[:-len(PREVIEW_SUFFIX)] if key.endswith(PREVIEW_SUFFIX) else key for key in keys}
+    wanted = set(sources.values())
+    referenced = set(StoredBlob.objects.filter(key__in=wanted).values_list('key', flat=True))
+    referenced |= set(TeamFile.objects.filter(file__in=wanted).values_list('file', flat=True))
+    return {key for key, source in sources.items() if source in referenced}
+
+
+def purge_pending_objects():
+    """
+    Background job removing released S3 objects with ``DeleteObjects``, up to
+    ``S3_DELETE_BATCH_SIZE`` (at most 1000) keys per request.
+    """
+    s3 = get_s3_client()
+    while True:
+        pending = list(PendingObjectDelete.objects.order_by('id')[:settings.S3_DELETE_BATCH_SIZE])
+        if not pending:
+            return
+        keys = {row.key for row in pending}
+        stale = keys - _referenced_keys(keys)
+        failed = {}
+        if stale:
+            response = s3.delete_objects(
+                Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+                Delete={'Objects': [{'Key': key} for key in sorted(stale)], 'Quiet': True},
+            )
+            failed = {error['Key']: error.get('Code') for error in response.get('Errors', [])}
+        PendingObjectDelete.objects.filter(id__in=[row.id for row in pending if row.key not in failed]).delete()
+        if failed:
+            # The job is retried with backoff; the failed keys stay pending
+            raise RuntimeError(f"Failed to delete {len(failed)} S3 object(s): {failed}")
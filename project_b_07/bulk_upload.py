@@ -0,0 +1,176 @@
+"""
+Bulk uploads of many files, or of one zip archive, into a team.
+
+Zip entries are read one at a time and copied to spooled temporary files while they
+are hashed, so memory stays bounded whatever the archive holds. Size and count limits
+are enforced on the bytes actually read, not on the sizes the archive claims. The
+distinct new contents are then uploaded to S3 concurrently (``blobs.store_many``).
+All TeamFile rows are created with a single ``bulk_create``.
+"""
+
+import hashlib
+import mimetypes
+import os
+import tempfile
+import zipfile
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+
+from .blobs import HASH_CHUNK_SIZE, hash_file, release_blob, store_many
+from .extraction import schedule_extraction
+from .models import TeamFile
+from .previews import schedule_preview
+from .search import index_files
+from .tags import sync_tags
+
+ZIP_CONTENT_TYPES = {'application/zip', 'application/x-zip-compressed'}
+# Entries written by archivers rather than by the user
+IGNORED_ENTRY_PREFIXES = ('__MACOSX/', '.')
+
+
+class BulkUploadError(Exception):
+    """
+    The batch as a whole cannot be accepted (too many files, too large, corrupt archive).
+    """
+
+
+class BulkEntry:
+    """
+    One file of a bulk upload, ready to be stored.
+    """
+
+    def __init__(self, name, fileobj, content_type, digest=None, size=None):
+        self.name = name
+        self.fileobj = fileobj
+        self.content_type = content_type
+        self.digest = digest
+        self.size = size
+        self.error = None
+
+    @property
+    def title(self):
+        return os.path.basename(self.name)[:255]
+
+
+def guess_content_type(name, fallback='application/octet-stream'):
+    return mimetypes.guess_type(name)[0] or fallback
+
+
+def is_zip(uploaded_file):
+    return uploaded_file.content_type in ZIP_CONTENT_TYPES or uploaded_file.name.lower().endswith('.zip')
+
+
+def _spool(stream, budget):
+    """
+    Copy a stream to a spooled temporary file while hashing it.
+    Returns ``(spool, digest, size)``; raises BulkUploadError once ``budget`` bytes are exceeded.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=settings.BULK_UPLOAD_SPOOL_BYTES)
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: stream.read(HASH_CHUNK_SIZE), b''):
+        size += len(chunk)
+        if size > budget:
+            spool.close()
+            raise BulkUploadError("The upload is larger than the allowed total size.")
+        digest.update(chunk)
+        spool.write(chunk)
+    spool.seek(0)
+    return spool, digest.hexdigest(), size
+
+
+def zip_entries(uploaded_file):
+    """
+    Yield a BulkEntry for each regular file in a zip archive.
+    """
+    budget = settings.BULK_UPLOAD_MAX_BYTES
+    count = 0
+    try:
+        with zipfile.ZipFile(uploaded_file) as archive:
+            for info in archive.infolist():
+                name = info.filename
+                if info.is_dir() or name.startswith(IGNORED_ENTRY_PREFIXES) or '/.' in name:
+                    continue
+                count += 1
+                if count > settings.BULK_UPLOAD_MAX_FILES:
+                    raise BulkUploadError(f"An upload may contain at most {settings.BULK_UPLOAD_MAX_FILES} files.")
+                with archive.open(info) as stream:
+                    spool, digest, size = _spool(stream, budget)
+                budget -= size
+                yield BulkEntry(name, spool, guess_content_type(name), digest, size)
+    except (zipfile.BadZipFile, zipfile.LargeZipFile, NotImplementedError) as e:
+        raise BulkUploadError(f"The archive could not be read: {e}")
+
+
+def file_entries(uploaded_files):
+    """
+    Yield a BulkEntry for each file of a multi-file upload. Django has already spooled them.
+    """
+    if len(uploaded_files) > settings.BULK_UPLOAD_MAX_FILES:
+        raise BulkUploadError(f"An upload may contain at most {settings.BULK_UPLOAD_MAX_FILES} files.")
+    if sum(uploaded.size for uploaded in uploaded_files) > settings.BULK_UPLOAD_MAX_BYTES:
+        raise BulkUploadError("The upload is larger than the allowed total size.")
+    for uploaded in uploaded_files:
+        digest, size = hash_file(uploaded)
+        yield BulkEntry(uploaded.name, uploaded, guess_content_type(uploaded.name, uploaded.content_type), digest, size)
+
+
+def collect_entries(uploaded_files):
+    """
+    Expand a single zip archive into its entries; otherwise take the files as they are.
+    """
+    if len(uploaded_files) == 1 and is_zip(uploaded_files[0]):
+        return list(zip_entries(uploaded_files[0]))
+    return list(file_entries(uploaded_files))
+
+
+def bulk_store(entries, team, user, description='', keywords=''):
+    """
+    Store the entries and create their TeamFile rows. Returns one result dict per entry.
+    """
+    accepted = []
+    for entry in entries:
+        if entry.content_type not in settings.ALLOWED_UPLOAD_CONTENT_TYPES:
+            entry.error = f"Files of type {entry.content_type} are not allowed."
+        else:
+            accepted.append(entry)
+
+    stored = store_many(
+        [(entry.fileobj, entry.content_type, entry.digest, entry.size) for entry in accepted],
+        max_workers=settings.BULK_UPLOAD_CONCURRENCY,
+    )
+    rows = []
+    for entry, (blob, error) in zip(accepted, stored):
+        if error is not None:
+            entry.error = f"Upload failed: {error}"
+            continue
+        rows.append((entry, TeamFile(
+            title=entry.title, file=blob.key, blob=blob, description=description,
+            keywords=keywords, uploaded_by=user, team=team,
+        )))
+
+    try:
+        with transaction.atomic():
+            created = TeamFile.objects.bulk_create([team_file for _, team_file in rows])
+            # bulk_create skips post_save, so index and tag the files and queue previews and extraction here
+            index_files(created)
+            sync_tags(created)
+            for team_file in created:
+                transaction.on_commit(partial(schedule_preview, team_file.id))
+                transaction.on_commit(partial(schedule_extraction, team_file.id))
+    except Exception:
+        for _, team_file in rows:
+            release_blob(team_file.blob_id)
+        raise
+
+    file_ids = {id(entry): team_file.id for entry, team_file in rows}
+    results = []
+    for entry in entries:
+        if entry.error:
+            results.append({'name': entry.name, 'status': 'error', 'error': entry.error})
+        else:
+            results.append({'name': entry.name, 'status': 'created', 'id': file_ids[id(entry)], 'size': entry.size})
+        entry.fileobj.close()
+    return results
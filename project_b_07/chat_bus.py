@@ -0,0 +1,129 @@
+"""
+Publish/subscribe bus used to push new team chat messages to connected clients.
+
+``post_chat_message`` publishes every new message to a per-team channel and the
+``team_chat_stream`` view subscribes to it for as long as the browser keeps the
+connection open. The backend is chosen with the ``CHAT_BUS_BACKEND`` setting so a
+multi-node deployment can swap in a shared broker without touching the views.
+"""
+
+import asyncio
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class BaseChatBus:
+    """
+    Interface every chat bus backend implements.
+    """
+
+    def publish(self, team_id, message):
+        """
+        Deliver ``message`` (a JSON-serialisable dict) to every subscriber of ``team_id``.
+        Safe to call from synchronous code running in any thread.
+        """
+        raise NotImplementedError
+
+    def subscribe(self, team_id):
+        """
+        Return a subscription for ``team_id``. Must be called from inside a running event loop.
+        """
+        raise NotImplementedError
+
+
+class Subscription:
+    """
+    A single listener on a team channel, backed by a bounded asyncio queue.
+    """
+
+    def __init__(self, bus, team_id, maxsize):
+        self.bus = bus
+        self.team_id = team_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def deliver(self, message):
+        """
+        Hand a message over to the subscriber's event loop from any thread.
+        """
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            # The subscriber's loop has already shut down
+            self.close()
+
+    def _put(self, message):
+        # A slow consumer loses its oldest messages rather than growing without bound;
+        # the client catches up through the updates endpoint when it reconnects.
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self):
+        """
+        Wait for the next message published on this channel.
+        """
+        return await self.queue.get()
+
+    def close(self):
+        """
+        Stop receiving messages.
+        """
+        self.bus.unsubscribe(self)
+
+
+class InMemoryChatBus(BaseChatBus):
+    """
+    Chat bus that only reaches subscribers in the current process.
+    Suitable for a single-process ASGI server and for tests.
+    """
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers = {}  # team_id -> set of Subscription
+
+    def publish(self, team_id, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(team_id, ()))
+        for subscription in subscribers:
+            subscription.deliver(message)
+
+    def subscribe(self, team_id):
+        subscription = Subscription(self, team_id, self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(team_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.team_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.team_id]
+
+    def subscriber_count(self, team_id):
+        """
+        Number of open subscriptions on a team channel.
+        """
+        with self._lock:
+            return len(self._subscribers.get(team_id, ()))
+
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def get_chat_bus():
+    """
+    Return the process-wide chat bus configured by ``CHAT_BUS_BACKEND``.
+    """
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                _bus = import_string(settings.CHAT_BUS_BACKEND)()
+    return _bus
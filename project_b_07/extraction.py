@@ -0,0 +1,186 @@
+"""
+Background text extraction from team files, feeding the search index.
+
+After a TeamFile is committed, extracting the text of a .txt or .pdf upload is queued as
+a job of the database queue (``jobs.enqueue``, run by ``run_jobs``), so it survives
+restarts of the web process. The text is cut into chunks on whitespace and stored in
+FileContentChunk.
+The file is then reindexed, so its content becomes searchable next to its title,
+keywords and description, and the chunks serve search snippets without another
+trip to S3.
+
+Extraction is idempotent: a file whose content was already extracted from the same
+S3 key is left alone, and a re-upload of known content (deduplicated blobs share a
+key) copies the existing chunks instead of extracting again.
+"""
+
+import logging
+
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.db import transaction
+
+from .jobs import enqueue
+from .models import FileContent, FileContentChunk, TeamFile
+from .search import index_files, tokenize
+from .storage import get_s3_client, is_missing_object
+
+logger = logging.getLogger(__name__)
+
+EXTRACT_KINDS = {
+    'application/pdf': 'pdf',
+    'text/plain': 'text',
+}
+
+
+def extract_text(kind, data, max_chars):
+    """
+    Text of the source bytes, cut at ``max_chars``.
+    Raises ImportError when the library needed for ``kind`` is not installed.
+    """
+    if kind == 'text':
+        return data.decode('utf-8', errors='replace')[:max_chars]
+    if kind == 'pdf':
+        import pypdfium2
+        pdf = pypdfium2.PdfDocument(data)
+        try:
+            pages = []
+            length = 0
+            for page in pdf:
+                text = page.get_textpage().get_text_bounded()
+                pages.append(text)
+                length += len(text)
+                if length >= max_chars:
+                    break
+        finally:
+            pdf.close()
+        return '\n'.join(pages)[:max_chars]
+    raise ValueError(f"Unknown extraction kind: {kind}")
+
+
+def chunk_text(text, size):
+    """
+    Split text into chunks of about ``size`` characters, cut on whitespace so no word is split.
+    """
+    chunks = []
+    start = 0
+    while start < len(text):
+        while start < len(text) and text[start].isspace():
+            start += 1
+        end = start + size
+        if end < len(text):
+            cut = text.rfind(' ', start, end)
+            cut = max(cut, text.rfind('\n', start, end))
+            if cut > start:
+                end = cut
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        start = end
+    return chunks
+
+
+def build_extraction(source_key, kind):
+    """
+    Download the source and extract its text. Returns a dict describing the outcome,
+    with the text already chunked. S3 and network errors are raised, so the job is
+    retried; only a missing source or one that cannot be parsed fails for good.
+    """
+    s3 = get_s3_client()
+    bucket = settings.AWS_STORAGE_BUCKET_NAME
+    try:
+        head = s3.head_object(Bucket=bucket, Key=source_key)
+        if head['ContentLength'] > settings.EXTRACT_MAX_SOURCE_BYTES:
+            return {'status': 'unsupported', 'error': 'File is too large to index.'}
+        data = s3.get_object(Bucket=bucket, Key=source_key)['Body'].read()
+    except ClientError as e:
+        if not is_missing_object(e):
+            raise
+        return {'status': 'failed', 'error': 'The file is missing from storage.'}
+    try:
+        text = extract_text(kind, data, settings.EXTRACT_MAX_CHARS)
+    except ImportError as e:
+        return {'status': 'unsupported', 'error': str(e)}
+    except Exception as e:
+        return {'status': 'failed', 'error': str(e)}
+    return {'status': 'ready', 'chunks': chunk_text(text, settings.EXTRACT_CHUNK_CHARS)}
+
+
+def _save_result(team_file_id, source_key, result):
+    """
+    Replace the file's chunks with the extracted ones and reindex it.
+    """
+    chunks = result.get('chunks', [])
+    with transaction.atomic():
+        team_file = TeamFile.objects.select_for_update().filter(id=team_file_id).first()
+        if team_file is None or team_file.file.name != source_key:
+            # Deleted, or pointed at other content while the worker was busy
+            return
+        FileContentChunk.objects.filter(team_file_id=team_file_id).delete()
+        FileContentChunk.objects.bulk_create([
+            FileContentChunk(team_file_id=team_file_id, position=position, text=text)
+            for position, text in enumerate(chunks)
+        ])
+        FileContent.objects.filter(team_file_id=team_file_id).update(
+            status=result['status'],
+            char_count=sum(len(text) for text in chunks),
+            term_count=sum(len(tokenize(text)) for text in chunks),
+            error=result.get('error', ''),
+        )
+        index_files([team_file])
+
+
+def extract_team_file(team_file_id, source_key):
+    """
+    Job: extract the text of a team file and reindex it, unless the file is gone or now
+    points at other content.
+    """
+    team_file = TeamFile.objects.select_related('blob').filter(id=team_file_id).first()
+    if team_file is None or team_file.file.name != source_key:
+        return
+    kind = EXTRACT_KINDS.get(team_file.get_content_type())
+    if kind is not None:
+        _save_result(team_file_id, source_key, build_extraction(source_key, kind))
+
+
+def schedule_extraction(team_file_id):
+    """
+    Queue a job extracting the text of a team file. With ``PREVIEW_INLINE`` the text is
+    extracted inline, which is what the tests use.
+    """
+    team_file = TeamFile.objects.select_related('blob').filter(id=team_file_id).first()
+    if team_file is None:
+        return
+    source_key = team_file.file.name
+    kind = EXTRACT_KINDS.get(team_file.get_content_type())
+    if kind is None:
+        FileContent.objects.update_or_create(team_file=team_file, defaults={'status': 'unsupported', 'source_key': source_key})
+        return
+    if FileContent.objects.filter(team_file=team_file, source_key=source_key, status='ready').exists():
+        return
+
+    known = FileContent.objects.filter(source_key=source_key, status='ready').exclude(team_file=team_file).first()
+    if known is not None:
+        FileContent.objects.update_or_create(
+            team_file=team_file, defaults={'status': 'pending', 'source_key': source_key, 'error': ''}
+        )
+        chunks = list(
+            FileContentChunk.objects.filter(team_file_id=known.team_file_id).order_by('position').values_list('text', flat=True)
+        )
+        _save_result(team_file.id, source_key, {'status': 'ready', 'chunks': chunks})
+        return
+
+    # The pending row and its job are written together, so no row is left pending without one
+    with transaction.atomic():
+        FileContent.objects.update_or_create(
+            team_file=team_file, defaults={'status': 'pending', 'source_key': source_key, 'error': ''}
+        )
+        if not settings.PREVIEW_INLINE:
+            enqueue(extract_team_file, team_file_id=team_file.id, source_key=source_key)
+            logger.info("Queued %s text extraction for team file %s", kind, team_file_id)
+            return
+    try:
+        extract_team_file(team_file.id, source_key)
+    except Exception as e:
+        # Inline there is no job to retry, so storage errors fail the extraction
+        _save_result(team_file.id, source_key, {'status': 'failed', 'error': str(e)})
@@ -0,0 +1,207 @@
+"""
+Size-bounded on-disk LRU cache for S3 objects served by ``serve_file``.
+
+Each object is stored as ``<id>.data`` plus a ``<id>.json`` metadata file holding
+its S3 key, ETag and content type, where ``<id>`` is a hash of the key. Recency is
+tracked through the data file's mtime, so several worker processes can share one
+cache directory without coordinating an in-memory index. Hit, miss, revalidation
+and eviction counters are kept per process.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class CacheEntry:
+    """
+    A cached object: the path of its bytes on disk and the metadata S3 returned for it.
+    """
+
+    def __init__(self, path, key, etag, content_type, size, last_modified=None, handle=None):
+        self.path = path
+        self.key = key
+        self.etag = etag
+        self.content_type = content_type
+        self.size = size
+        self.last_modified = last_modified
+        self._handle = handle
+
+    def open(self):
+        """
+        Open the cached bytes. An open handle survives eviction of the entry by another process.
+        """
+        if self._handle is not None:
+            handle, self._handle = self._handle, None
+            return handle
+        return open(self.path, 'rb')
+
+    def release(self):
+        """
+        Close the handle left open by ``DiskLRUCache.put`` if it was never used.
+        """
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+class DiskLRUCache:
+    """
+    Stores whole objects under ``directory`` and evicts the least recently used
+    ones once their total size exceeds ``max_bytes``.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, key):
+        entry_id = hashlib.sha256(key.encode()).hexdigest()
+        base = os.path.join(self.directory, entry_id)
+        return base + '.data', base + '.json'
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, key):
+        """
+        Return the CacheEntry for ``key`` and mark it as recently used, or ``None``.
+        """
+        data_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path) as meta_file:
+                meta = json.load(meta_file)
+            os.utime(data_path)  # Bump recency for eviction
+        except (OSError, ValueError):
+            self._count('misses')
+            return None
+        if meta.get('key') != key:
+            self._count('misses')
+            return None
+        return CacheEntry(data_path, key, meta['etag'], meta['content_type'], meta['size'], meta.get('last_modified'))
+
+    def record_hit(self):
+        """
+        Count a lookup whose cached copy was confirmed fresh.
+        """
+        self._count('hits')
+
+    def record_revalidation(self):
+        """
+        Count a lookup whose cached copy turned out to be stale.
+        """
+        self._count('revalidations')
+
+    def put(self, key, body, etag, content_type, last_modified=None):
+        """
+        Copy a readable ``body`` into the cache in chunks and return its CacheEntry.
+        """
+        data_path, meta_path = self._paths(key)
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                for chunk in iter(lambda: body.read(CHUNK_SIZE), b''):
+                    tmp_file.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp_path, data_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        meta = {'key': key, 'etag': etag, 'content_type': content_type, 'size': size, 'last_modified': last_modified}
+        fd, tmp_meta = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as meta_file:
+            json.dump(meta, meta_file)
+        os.replace(tmp_meta, meta_path)
+
+        # Open before enforcing the budget so the caller can still serve the bytes
+        # even if the entry is evicted straight away
+        handle = open(data_path, 'rb')
+        self._enforce_budget()
+        return CacheEntry(data_path, key, etag, content_type, size, last_modified, handle)
+
+    def _enforce_budget(self):
+        """
+        Remove least recently used entries until the cache fits in ``max_bytes``.
+        """
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as scan:
+            for item in scan:
+                if not item.name.endswith('.data'):
+                    continue
+                try:
+                    stat = item.stat()
+                except FileNotFoundError:
+                    continue  # Evicted by another process
+                entries.append((stat.st_mtime, stat.st_size, item.path))
+                total += stat.st_size
+
+        entries.sort()
+        for _, size, data_path in entries:
+            if total <= self.max_bytes:
+                break
+            for path in (data_path, data_path[:-len('.data')] + '.json'):
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+            total -= size
+            self._count('evictions')
+
+    def stats(self):
+        """
+        Counters for this process plus the current on-disk footprint.
+        """
+        used = 0
+        files = 0
+        with os.scandir(self.directory) as scan:
+            for item in scan:
+                if item.name.endswith('.data'):
+                    try:
+                        used += item.stat().st_size
+                        files += 1
+                    except FileNotFoundError:
+                        pass
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'revalidations': self.revalidations,
+            'evictions': self.evictions,
+            'objects': files,
+            'bytes': used,
+            'max_bytes': self.max_bytes,
+            'checked_at': time.time(),
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_file_cache():
+    """
+    Return the process-wide cache for ``FILE_CACHE_DIR``, or ``None`` when caching is disabled.
+    """
+    global _cache
+    if not settings.FILE_CACHE_DIR:
+        return None
+    with _cache_lock:
+        if _cache is None or (_cache.directory, _cache.max_bytes) != (settings.FILE_CACHE_DIR, settings.FILE_CACHE_MAX_BYTES):
+            _cache = DiskLRUCache(settings.FILE_CACHE_DIR, settings.FILE_CACHE_MAX_BYTES)
+    return _cache
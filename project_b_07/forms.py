@@ -15,6 +15,40 @@ class TeamFileUploadForm(forms.ModelForm):
         model = TeamFile
         fields = ['title', 'file', 'description', 'keywords']
 
+class DirectUploadCompleteForm(forms.Form):
+    """
+    Metadata sent once the browser has finished uploading a file straight to S3.
+    """
+    key = forms.CharField(max_length=1024)
+    title = forms.CharField(max_length=255, required=False)
+    description = forms.CharField(required=False)
+    keywords = forms.CharField(max_length=255, required=False)
+
+class MultipleFileInput(forms.ClearableFileInput):
+    allow_multiple_selected = True
+
+class MultipleFileField(forms.FileField):
+    """
+    File field accepting several files at once; cleans to a list of uploaded files.
+    """
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('widget', MultipleFileInput())
+        super().__init__(*args, **kwargs)
+
+    def clean(self, data, initial=None):
+        single_clean = super().clean
+        if isinstance(data, (list, tuple)):
+            return [single_clean(item, initial) for item in data]
+        return [single_clean(data, initial)]
+
+class BulkUploadForm(forms.Form):
+    """
+    Several files, or one zip archive, with a description and keywords applied to all of them.
+    """
+    files = MultipleFileField(help_text="Select several files, or a single .zip archive.")
+    description = forms.CharField(widget=forms.Textarea(attrs={'rows': 3}), required=False)
+    keywords = forms.CharField(max_length=255, required=False)
+
 class ChatMessageForm(forms.ModelForm):
     class Meta:
         model = TeamChatMessage
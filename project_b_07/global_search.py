@@ -0,0 +1,149 @@
+"""
+Search across everything a user can see: files, chat messages and milestones of all
+their teams.
+
+The user's team set (owned teams and accepted memberships from their
+``access.TeamAccess``, or every team for PMA Administrators) is a subquery, so it is
+resolved inside the one ranked query built by ``search.search_teams`` rather than by
+looping over teams. The query runs under a time
+budget; when the budget is spent the page comes back empty and marked as timed out
+instead of holding the request.
+"""
+
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.db.models import Q
+from django.urls import reverse
+from roadmap.models import Milestone
+
+from .models import Team, TeamChatMessage, TeamFile
+from .search import highlight, search_teams, with_snippets
+
+# Rows the SQLite progress handler lets through between two clock checks
+_PROGRESS_STEPS = 10000
+
+
+class SearchResult:
+    """
+    One hit of the global search, ready to render or serialise.
+    """
+
+    def __init__(self, kind, obj, team, title, url, snippet, rank):
+        self.kind = kind
+        self.object = obj
+        self.team = team
+        self.title = title
+        self.url = url
+        self.snippet = snippet
+        self.rank = rank
+
+    def as_dict(self):
+        return {
+            'kind': self.kind,
+            'id': self.object.pk,
+            'team': {'id': self.team.id, 'name': self.team.name},
+            'title': self.title,
+            'url': self.url,
+            'snippet': str(self.snippet),
+            'rank': self.rank,
+        }
+
+
+class SearchPage:
+    """
+    A page of global search results.
+    """
+
+    def __init__(self, results, page, has_next, timed_out=False):
+        self.results = results
+        self.page = page
+        self.has_next = has_next
+        self.timed_out = timed_out
+
+
+def visible_team_ids(access):
+    """
+    Subquery of the ids of the teams whose content the user of ``access`` may search.
+    """
+    teams = Team.objects.all()  # Teams being deleted are already left out
+    if not access.is_admin:
+        teams = teams.filter(Q(created_by=access.user) | Q(id__in=access.accepted_team_ids()))
+    return teams.values('id')
+
+
+@contextmanager
+def time_budget(seconds):
+    """
+    Abort queries run inside the block once ``seconds`` have passed, raising OperationalError.
+    PostgreSQL enforces it with ``statement_timeout``; SQLite with a progress handler.
+    """
+    if connection.vendor == 'postgresql':
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SET LOCAL statement_timeout = %s", [max(1, int(seconds * 1000))])
+            yield
+        return
+    if connection.vendor != 'sqlite':
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    connection.ensure_connection()
+    raw = connection.connection
+    raw.set_progress_handler(lambda: time.monotonic() > deadline, _PROGRESS_STEPS)
+    try:
+        yield
+    finally:
+        raw.set_progress_handler(None, 0)
+
+
+def global_search(access, query, page=1):
+    """
+    Return a SearchPage of the files, chat messages and milestones the user of ``access``
+    (an ``access.TeamAccess``) can see matching ``query``, best first. Deep pages are capped at ``SEARCH_MAX_PAGES``.
+    """
+    page_size = settings.SEARCH_PAGE_SIZE
+    page = max(1, min(page, settings.SEARCH_MAX_PAGES))
+    offset = (page - 1) * page_size
+    matches = search_teams(visible_team_ids(access), query)
+    try:
+        with time_budget(settings.SEARCH_TIME_BUDGET):
+            rows = list(matches[offset:offset + page_size + 1])
+    except OperationalError:
+        return SearchPage([], page, has_next=False, timed_out=True)
+
+    has_next = len(rows) > page_size and page < settings.SEARCH_MAX_PAGES
+    rows = rows[:page_size]
+    objects = _load_objects(rows, query)
+    results = []
+    for kind, object_id, rank in rows:
+        obj = objects[kind].get(object_id)
+        if obj is not None:  # Deleted since it was matched
+            results.append(_result(kind, obj, query, rank))
+    return SearchPage(results, page, has_next)
+
+
+def _load_objects(rows, query):
+    """
+    Fetch the matched objects with one query per kind.
+    """
+    ids = {'file': [], 'message': [], 'milestone': []}
+    for kind, object_id, _ in rows:
+        ids[kind].append(object_id)
+    return {
+        'file': with_snippets(TeamFile.objects.select_related('team'), query).in_bulk(ids['file']) if ids['file'] else {},
+        'message': TeamChatMessage.objects.select_related('team', 'user').in_bulk(ids['message']) if ids['message'] else {},
+        'milestone': Milestone.objects.select_related('team').in_bulk(ids['milestone']) if ids['milestone'] else {},
+    }
+
+
+def _result(kind, obj, query, rank):
+    if kind == 'file':
+        snippet = highlight(obj.snippet_text or obj.description, query)
+        return SearchResult(kind, obj, obj.team, obj.title, reverse('serve_file', args=[obj.id]), snippet, rank)
+    if kind == 'message':
+        title = f"{obj.user.username} in {obj.team.name} chat"
+        return SearchResult(kind, obj, obj.team, title, reverse('team_chat', args=[obj.team_id]), highlight(obj.message, query), rank)
+    url = reverse('team_roadmap', args=[obj.team_id])
+    return SearchResult(kind, obj, obj.team, obj.title, url, highlight(obj.description, query), rank)
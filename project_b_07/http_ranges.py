@@ -0,0 +1,118 @@
+"""
+HTTP byte-range helpers for ``serve_file`` (RFC 9110 section 14).
+"""
+
+from django.utils.http import parse_http_date_safe
+
+CHUNK_SIZE = 64 * 1024
+# Requests asking for more ranges than this get the whole body instead
+MAX_RANGES = 16
+
+
+def parse_range_header(header, size):
+    """
+    Parse a ``Range: bytes=...`` header against a representation of ``size`` bytes.
+
+    Returns ``None`` when the header is absent, malformed or should be ignored (the
+    full body is served), an empty list when no range is satisfiable (416), or a
+    list of inclusive ``(start, end)`` offsets.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes' or not spec.strip():
+        return None
+
+    ranges = []
+    for part in spec.split(','):
+        first, sep, last = part.strip().partition('-')
+        if not sep:
+            return None
+        first, last = first.strip(), last.strip()
+        try:
+            if not first:
+                # Suffix range: the last N bytes
+                if not last:
+                    return None
+                length = int(last)
+                if length <= 0 or size == 0:
+                    continue
+                start, end = max(size - length, 0), size - 1
+            else:
+                start = int(first)
+                end = int(last) if last else size - 1
+                if start < 0 or end < start:
+                    return None
+                if start >= size:
+                    continue
+                end = min(end, size - 1)
+        except ValueError:
+            return None
+        ranges.append((start, end))
+
+    if len(ranges) > MAX_RANGES:
+        return None
+    return ranges
+
+
+def range_applies(if_range, etag, last_modified):
+    """
+    Evaluate an ``If-Range`` header: the Range is only honoured if the validator still matches.
+    """
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return etag is not None and if_range == etag
+    if if_range.startswith('W/'):
+        return False  # Weak validators cannot be used with If-Range
+    return last_modified is not None and parse_http_date_safe(if_range) == last_modified
+
+
+def read_chunks(stream, length, close=True):
+    """
+    Yield ``length`` bytes from a readable stream in chunks, closing it afterwards
+    unless ``close`` is False.
+    """
+    try:
+        remaining = length
+        while remaining > 0:
+            chunk = stream.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        if close:
+            stream.close()
+
+
+def content_range(start, end, size):
+    return f"bytes {start}-{end}/{size}"
+
+
+def multipart_byteranges(ranges, size, content_type, boundary, open_range):
+    """
+    Build a ``multipart/byteranges`` body.
+
+    ``open_range(start, end)`` must return an iterable of the bytes in that range; it is
+    called lazily, one part at a time, so only one range is being read at once.
+    Returns ``(body_iterator, content_length)``.
+    """
+    headers = [
+        (
+            f"\r\n--{boundary}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Range: {content_range(start, end, size)}\r\n\r\n"
+        ).encode()
+        for start, end in ranges
+    ]
+    closing = f"\r\n--{boundary}--\r\n".encode()
+    length = sum(len(header) for header in headers) + sum(end - start + 1 for start, end in ranges) + len(closing)
+
+    def body():
+        for header, (start, end) in zip(headers, ranges):
+            yield header
+            yield from open_range(start, end)
+        yield closing
+
+    return body(), length
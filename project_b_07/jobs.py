@@ -0,0 +1,186 @@
+"""
+Durable background jobs stored in the project database.
+
+``enqueue`` inserts a Job row in the caller's transaction, so work is only queued
+if the change that needs it commits, and no outside broker is involved. The
+``run_jobs`` management command claims due jobs and runs them:
+
+- On PostgreSQL a job is claimed with ``SELECT ... FOR UPDATE SKIP LOCKED``, so
+  concurrent workers never wait on each other's rows.
+- SQLite has no row locks. There the worker picks the oldest due job and claims it
+  with a conditional UPDATE, retrying with the next job if another worker won.
+
+A failed job is retried with exponential backoff until ``max_attempts``. A job whose
+worker died is requeued once it has been running longer than ``JOB_TIMEOUT``.
+"""
+
+import logging
+import random
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Avg, Count, F, Max
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Conditional-update attempts before an SQLite worker gives up on this poll
+CLAIM_RETRIES = 5
+
+
+def task_path(func):
+    """
+    Dotted path a worker imports to run ``func``; it must be a module-level function.
+    """
+    return f"{func.__module__}.{func.__qualname__}"
+
+
+def enqueue(func, max_attempts=None, delay=0, **kwargs):
+    """
+    Queue ``func(**kwargs)`` to run in a worker. Arguments must be JSON serializable.
+    """
+    return Job.objects.create(
+        task=task_path(func),
+        kwargs=kwargs,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def retry_delay(attempts):
+    """
+    Seconds to wait before retrying a job that has failed ``attempts`` times.
+    """
+    delay = min(settings.JOB_RETRY_BACKOFF * 2 ** (attempts - 1), settings.JOB_RETRY_MAX_BACKOFF)
+    # Jitter keeps jobs that failed together from all retrying at the same instant
+    return delay * random.uniform(1, 1.1)
+
+
+def claim_job(worker_id):
+    """
+    Mark the oldest due job as running for ``worker_id`` and return it, or ``None``.
+    """
+    now = timezone.now()
+    due = Job.objects.filter(status='queued', run_after__lte=now).order_by('run_after', 'id')
+    claim = {'status': 'running', 'locked_by': worker_id, 'locked_at': now}
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job = due.select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            Job.objects.filter(id=job.id).update(attempts=F('attempts') + 1, **claim)
+        job.refresh_from_db()
+        return job
+
+    for _ in range(CLAIM_RETRIES):
+        job_id = due.values_list('id', flat=True).first()
+        if job_id is None:
+            return None
+        if Job.objects.filter(id=job_id, status='queued').update(attempts=F('attempts') + 1, **claim):
+            return Job.objects.get(id=job_id)
+    return None
+
+
+def run_job(job):
+    """
+    Run a claimed job and record the outcome. Returns True if it succeeded.
+    """
+    started = time.monotonic()
+    try:
+        import_string(job.task)(**job.kwargs)
+    except Exception:
+        duration = time.monotonic() - started
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            outcome = {'status': 'failed', 'finished_at': timezone.now()}
+            logger.error("Job %s (%s) failed for good after %s attempts:\n%s", job.id, job.task, job.attempts, error)
+        else:
+            delay = retry_delay(job.attempts)
+            outcome = {'status': 'queued', 'run_after': timezone.now() + timedelta(seconds=delay)}
+            logger.warning("Job %s (%s) failed, retrying in %.0fs:\n%s", job.id, job.task, delay, error)
+        succeeded = False
+    else:
+        duration = time.monotonic() - started
+        outcome = {'status': 'done', 'finished_at': timezone.now(), 'last_error': ''}
+        succeeded = True
+        error = None
+
+    # Only the worker holding the claim may record the result; a timed-out job may have been requeued meanwhile
+    Job.objects.filter(id=job.id, status='running', locked_by=job.locked_by).update(
+        duration=duration,
+        locked_by='',
+        locked_at=None,
+        **({'last_error': error} if error else {}),
+        **outcome,
+    )
+    return succeeded
+
+
+def requeue_stale_jobs():
+    """
+    Put back jobs whose worker has not finished them within ``JOB_TIMEOUT`` seconds,
+    typically because it crashed. Returns the number of jobs requeued.
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(status='running', locked_at__lt=now - timedelta(seconds=settings.JOB_TIMEOUT))
+    release = {'locked_by': '', 'locked_at': None, 'last_error': 'Timed out.'}
+    # A job that keeps killing its worker must not be retried forever
+    stale.filter(attempts__gte=F('max_attempts')).update(status='failed', finished_at=now, **release)
+    return stale.update(status='queued', **release)
+
+
+def purge_finished_jobs():
+    """
+    Delete completed jobs older than ``JOB_RETENTION`` seconds; failed jobs are kept for inspection.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.JOB_RETENTION)
+    deleted, _ = Job.objects.filter(status='done', finished_at__lt=cutoff).delete()
+    return deleted
+
+
+def job_stats():
+    """
+    Queue depth by status and per-task timing of completed jobs.
+    """
+    by_status = dict(Job.objects.values_list('status').annotate(count=Count('id')).order_by())
+    tasks = Job.objects.filter(status='done').values('task').annotate(
+        count=Count('id'), avg_seconds=Avg('duration'), max_seconds=Max('duration')
+    ).order_by('task')
+    return {'by_status': by_status, 'tasks': list(tasks)}
+
+
+class WorkerMetrics:
+    """
+    Counts and timings of the jobs run by one worker process, shared by its threads.
+    """
+
+    def __init__(self):
+        self.tasks = {}  # task -> [succeeded, failed, total_seconds, max_seconds]
+        self._lock = threading.Lock()
+
+    def record(self, task, seconds, succeeded):
+        with self._lock:
+            counts = self.tasks.setdefault(task, [0, 0, 0.0, 0.0])
+            counts[0 if succeeded else 1] += 1
+            counts[2] += seconds
+            counts[3] = max(counts[3], seconds)
+
+    def summary(self):
+        with self._lock:
+            return {
+                task: {
+                    'succeeded': succeeded,
+                    'failed': failed,
+                    'avg_seconds': round(total / (succeeded + failed), 3),
+                    'max_seconds': round(longest, 3),
+                }
+                for task, (succeeded, failed, total, longest) in self.tasks.items()
+            }
@@ -0,0 +1,59 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+from django.urls import reverse
+
+from project_b_07.models import Team
+from project_b_07.public_teams import invalidate_public_teams
+from project_b_07.views import PublicTeamListView
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure requests per second of the public team directory view: rendered on every request "
+        "(as without the cache), served from the cache, and revalidated by a shared cache (304)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help="Requests timed per scenario.")
+        parser.add_argument('--seed', type=int, default=0,
+                            help="Teams to create for the run; they are rolled back afterwards.")
+
+    def handle(self, *args, **options):
+        view = PublicTeamListView.as_view()
+        factory = RequestFactory()
+        url = reverse('public_team_list')
+
+        with transaction.atomic():
+            if options['seed']:
+                owner = get_user_model().objects.create_user(username='benchmark-owner', first_name='Benchmark')
+                Team.objects.bulk_create(
+                    [Team(name=f"Benchmark team {index}", created_by=owner) for index in range(options['seed'])],
+                    batch_size=1000,
+                )
+            invalidate_public_teams()
+            etag = view(factory.get(url))['ETag']
+
+            def uncached():
+                invalidate_public_teams()
+                return view(factory.get(url))
+
+            scenarios = [
+                ("rendered per request", uncached),
+                ("cached", lambda: view(factory.get(url))),
+                ("revalidated (304)", lambda: view(factory.get(url, HTTP_IF_NONE_MATCH=etag))),
+            ]
+            for label, request in scenarios:
+                request()  # Warm up
+                started = time.perf_counter()
+                for _ in range(options['requests']):
+                    request()
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f"{label}: {options['requests'] / elapsed:.0f} requests/s")
+            transaction.set_rollback(True)
+
+        # Pages cached during the run may list the rolled-back teams
+        invalidate_public_teams()
@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from project_b_07.extraction import schedule_extraction
+from project_b_07.models import TeamFile
+
+
+class Command(BaseCommand):
+    help = "Queue text extraction for team files uploaded before content search, or whose extraction failed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retry-failed', action='store_true', help="Also retry extractions that failed.")
+        parser.add_argument(
+            '--retry-pending', action='store_true',
+            help="Also requeue extractions left pending for longer than JOB_TIMEOUT, such as ones lost with their job.",
+        )
+
+    def handle(self, *args, **options):
+        missing = Q(content__isnull=True)
+        if options['retry_failed']:
+            missing |= Q(content__status='failed')
+        if options['retry_pending']:
+            stale_before = timezone.now() - timedelta(seconds=settings.JOB_TIMEOUT)
+            missing |= Q(content__status='pending', content__updated_at__lt=stale_before)
+        file_ids = list(TeamFile.objects.filter(missing).values_list('id', flat=True))
+
+        for file_id in file_ids:
+            schedule_extraction(file_id)
+        self.stdout.write(self.style.SUCCESS(f"Queued text extraction for {len(file_ids)} file(s); run_jobs processes them."))
@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from project_b_07.models import TeamFile
+from project_b_07.previews import schedule_preview
+
+
+class Command(BaseCommand):
+    help = "Queue previews for team files uploaded before the preview pipeline, or whose preview failed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retry-failed', action='store_true', help="Also rebuild previews that failed.")
+        parser.add_argument(
+            '--retry-pending', action='store_true',
+            help="Also requeue previews left pending for longer than JOB_TIMEOUT, such as ones lost with their job.",
+        )
+
+    def handle(self, *args, **options):
+        missing = Q(preview__isnull=True)
+        if options['retry_failed']:
+            missing |= Q(preview__status='failed')
+        if options['retry_pending']:
+            stale_before = timezone.now() - timedelta(seconds=settings.JOB_TIMEOUT)
+            missing |= Q(preview__status='pending', preview__updated_at__lt=stale_before)
+        file_ids = list(TeamFile.objects.filter(missing).values_list('id', flat=True))
+
+        for file_id in file_ids:
+            schedule_preview(file_id)
+        self.stdout.write(self.style.SUCCESS(f"Queued previews for {len(file_ids)} file(s); run_jobs processes them."))
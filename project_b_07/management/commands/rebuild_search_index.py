@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from roadmap.models import Milestone
+from project_b_07.models import TeamChatMessage, TeamFile
+from project_b_07.search import index_files, index_postings
+
+
+class Command(BaseCommand):
+    help = "Rebuild the search index of team files, chat messages and milestones, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Objects indexed per batch.")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        sources = [
+            ('file(s)', TeamFile.objects.only('id', 'team', 'title', 'keywords', 'description'), index_files),
+            ('chat message(s)', TeamChatMessage.objects.only('id', 'team', 'message'), lambda batch: index_postings('message', batch)),
+            ('milestone(s)', Milestone.objects.only('id', 'team', 'title', 'description'), lambda batch: index_postings('milestone', batch)),
+        ]
+        for label, objects, index in sources:
+            objects = objects.order_by('id')
+            last_id = 0
+            count = 0
+            while True:
+                batch = list(objects.filter(id__gt=last_id)[:batch_size])
+                if not batch:
+                    break
+                index(batch)
+                last_id = batch[-1].id
+                count += len(batch)
+            self.stdout.write(self.style.SUCCESS(f"Indexed {count} {label}."))
@@ -0,0 +1,62 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from project_b_07.reconciliation import Reconciler, delete_dangling, delete_orphans
+from project_b_07.storage import get_s3_client
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the S3 bucket with TeamFile, StoredBlob and FilePreview keys, reporting "
+        "objects no row refers to (orphans) and rows whose object is missing (dangling)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='', help="Only reconcile keys under this prefix.")
+        parser.add_argument('--delete-orphans', action='store_true', help="Delete orphaned objects in batches.")
+        parser.add_argument('--delete-dangling', action='store_true', help="Delete rows whose object is missing.")
+        parser.add_argument('--min-age-hours', type=float, default=24,
+                            help="Ignore orphans and rows modified more recently than this.")
+        parser.add_argument('--page-size', type=int, default=1000, help="Keys per ListObjectsV2 page.")
+        parser.add_argument('--checkpoint', help="File to record progress in, so an interrupted run can resume.")
+
+    def handle(self, *args, **options):
+        verbose = options['verbosity'] >= 2
+        s3 = get_s3_client()
+        bucket = settings.AWS_STORAGE_BUCKET_NAME
+
+        def on_orphans(keys):
+            if verbose:
+                for key in keys:
+                    self.stdout.write(f"orphan {key}")
+            if options['delete_orphans']:
+                delete_orphans(keys)
+
+        def on_dangling(entries):
+            if verbose:
+                for key, sources in entries:
+                    self.stdout.write(f"dangling {key} ({', '.join(sorted(sources))})")
+            if options['delete_dangling']:
+                delete_dangling(s3, bucket, entries)
+
+        reconciler = Reconciler(
+            s3,
+            bucket,
+            prefix=options['prefix'],
+            min_age=timedelta(hours=options['min_age_hours']),
+            page_size=options['page_size'],
+            checkpoint_path=options['checkpoint'],
+            on_orphans=on_orphans,
+            on_dangling=on_dangling,
+        )
+        start_after = reconciler.load_checkpoint()
+        if start_after:
+            self.stdout.write(f"Resuming after {start_after}")
+
+        counts = reconciler.run()
+        self.stdout.write(self.style.SUCCESS(
+            "Checked {objects} object(s): {matched} matched, {orphans} orphaned ({orphan_bytes} bytes), "
+            "{recent} object(s) or row key(s) too recent to judge, {dangling} dangling row key(s).".format(**counts)
+        ))
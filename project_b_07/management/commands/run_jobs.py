@@ -0,0 +1,91 @@
+import json
+import os
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from project_b_07.jobs import WorkerMetrics, claim_job, job_stats, purge_finished_jobs, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs from the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=settings.JOB_WORKER_CONCURRENCY, help="Number of worker threads.")
+        parser.add_argument('--poll-interval', type=float, default=settings.JOB_POLL_INTERVAL, help="Seconds to wait when the queue is empty.")
+        parser.add_argument('--burst', action='store_true', help="Exit once no job is due instead of polling.")
+        parser.add_argument('--stats', action='store_true', help="Print queue depth and job timings, then exit.")
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(json.dumps(job_stats(), indent=2, default=str))
+            return
+
+        self.stop = threading.Event()
+        self.metrics = WorkerMetrics()
+        self.burst = options['burst']
+        self.poll_interval = options['poll_interval']
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+
+        requeue_stale_jobs()
+        purge_finished_jobs()
+        concurrency = max(options['concurrency'], 1)
+        threads = []
+        try:
+            if concurrency == 1:
+                self.work(f"{worker_id}:0")
+            else:
+                threads = [
+                    threading.Thread(target=self.work_in_thread, args=(f"{worker_id}:{n}",), daemon=True)
+                    for n in range(concurrency)
+                ]
+                for thread in threads:
+                    thread.start()
+                # Join with a timeout so Ctrl+C reaches the main thread
+                while any(thread.is_alive() for thread in threads):
+                    for thread in threads:
+                        thread.join(timeout=1)
+        except KeyboardInterrupt:
+            self.stop.set()
+            self.stdout.write("Stopping after the running jobs finish...")
+            for thread in threads:
+                thread.join()
+
+        self.stdout.write(json.dumps(self.metrics.summary(), indent=2))
+
+    def work_in_thread(self, worker_id):
+        try:
+            self.work(worker_id)
+        finally:
+            # Each thread has its own database connection
+            connection.close()
+
+    def work(self, worker_id):
+        last_maintenance = time.monotonic()
+        while not self.stop.is_set():
+            close_old_connections()
+            if time.monotonic() - last_maintenance > settings.JOB_TIMEOUT:
+                requeue_stale_jobs()
+                purge_finished_jobs()
+                last_maintenance = time.monotonic()
+
+            job = claim_job(worker_id)
+            if job is None:
+                if self.burst:
+                    return
+                self.stop.wait(self.poll_interval)
+                continue
+
+            waited = (job.locked_at - job.run_after).total_seconds()
+            started = time.monotonic()
+            succeeded = run_job(job)
+            seconds = time.monotonic() - started
+            self.metrics.record(job.task, seconds, succeeded)
+            self.stdout.write(
+                f"{worker_id} job {job.id} {job.task} attempt {job.attempts}: "
+                f"{'ok' if succeeded else 'error'} in {seconds:.3f}s after waiting {waited:.3f}s"
+            )
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.1 on 2026-10-18 20:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project_b_07', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='teamchatmessage',
+            index=models.Index(fields=['team', 'id'], name='chat_team_id_idx'),
+        ),
+    ]
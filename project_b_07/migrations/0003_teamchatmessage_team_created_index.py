@@ -0,0 +1,19 @@
+# Generated by Django 5.1.1 on 2026-10-18 20:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project_b_07', '0002_teamchatmessage_team_id_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='teamchatmessage',
+            index=models.Index(fields=['team', 'created_at', 'id'], name='chat_team_created_idx'),
+        ),
+    ]
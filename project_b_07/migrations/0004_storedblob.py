@@ -0,0 +1,31 @@
+# Generated by Django 5.1.1 on 2026-10-18 20:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project_b_07', '0003_teamchatmessage_team_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('key', models.CharField(max_length=255, unique=True)),
+                ('size', models.BigIntegerField()),
+                ('content_type', models.CharField(max_length=100)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='teamfile',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='team_files', to='project_b_07.storedblob'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.1 on 2026-10-18 20:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project_b_07', '0004_storedblob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FilePreview',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('unsupported', 'Unsupported'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('image_key', models.CharField(blank=True, default='', max_length=255)),
+                ('snippet', models.TextField(blank=True, default='')),
+                ('error', models.TextField(blank=True, default='')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('team_file', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='preview', to='project_b_07.teamfile')),
+            ],
+        ),
+    ]
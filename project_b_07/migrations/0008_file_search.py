@@ -0,0 +1,61 @@
+# Generated by Django 5.1.1 on 2026-10-18 21:00
+
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_search_index(apps, schema_editor):
+    """
+    PostgreSQL only: GIN index over the search vector, and vectors for the existing files.
+    Other databases use the FileSearchTerm table, filled by ``manage.py rebuild_search_index``.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS teamfile_search_vector_gin "
+        "ON project_b_07_teamfile USING gin (search_vector)"
+    )
+    schema_editor.execute(
+        "UPDATE project_b_07_teamfile SET search_vector = "
+        "setweight(to_tsvector(%s::regconfig, coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector(%s::regconfig, coalesce(keywords, '')), 'B') || "
+        "setweight(to_tsvector(%s::regconfig, coalesce(description, '')), 'C')",
+        # The same text search configuration search.py builds and queries vectors with
+        [settings.SEARCH_CONFIG] * 3,
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS teamfile_search_vector_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project_b_07', '0007_team_deletion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='teamfile',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='FileSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.FloatField()),
+                ('team_file', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='project_b_07.teamfile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term'], name='search_term_idx')],
+                'unique_together': {('team_file', 'term')},
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
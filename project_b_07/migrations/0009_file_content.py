@@ -0,0 +1,57 @@
+# Generated by Django 5.1.1 on 2026-10-18 21:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project_b_07', '0008_file_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='filesearchterm',
+            name='occurrences',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='FileContent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_key', models.CharField(blank=True, db_index=True, default='', max_length=1024)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('unsupported', 'Unsupported'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('char_count', models.PositiveIntegerField(default=0)),
+                ('term_count', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('team_file', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='content', to='project_b_07.teamfile')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='FileContentChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('text', models.TextField()),
+                ('team_file', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='content_chunks', to='project_b_07.teamfile')),
+            ],
+            options={
+                'unique_together': {('team_file', 'position')},
+            },
+        ),
+        migrations.CreateModel(
+            name='TeamSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('file_count', models.PositiveIntegerField(default=0)),
+                ('occurrences', models.PositiveIntegerField(default=0)),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='project_b_07.team')),
+            ],
+            options={
+                'unique_together': {('team', 'term')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.1 on 2026-10-18 21:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project_b_07', '0009_file_content'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('message', 'Chat message'), ('milestone', 'Milestone')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.FloatField()),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_postings', to='project_b_07.team')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'team'], name='search_posting_term_idx')],
+                'unique_together': {('kind', 'object_id', 'term')},
+            },
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.1.1 on 2026-10-18 21:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_tags(apps, schema_editor):
+    """
+    Split the keywords of existing files into tags, in batches, then set the counters.
+    Parsing mirrors ``tags.parse_keywords``.
+    """
+    TeamFile = apps.get_model('project_b_07', 'TeamFile')
+    Tag = apps.get_model('project_b_07', 'Tag')
+    FileTag = TeamFile.tags.through
+
+    tag_ids = {}
+    last_id = 0
+    while True:
+        batch = list(TeamFile.objects.filter(id__gt=last_id).order_by('id').values_list('id', 'team_id', 'keywords')[:1000])
+        if not batch:
+            break
+        links = []
+        for file_id, team_id, keywords in batch:
+            names = (' '.join(part.split()).lower()[:64] for part in (keywords or '').split(','))
+            for name in dict.fromkeys(name for name in names if name):
+                if (team_id, name) not in tag_ids:
+                    tag_ids[(team_id, name)] = Tag.objects.create(team_id=team_id, name=name).pk
+                links.append(FileTag(teamfile_id=file_id, tag_id=tag_ids[(team_id, name)]))
+        FileTag.objects.bulk_create(links)
+        last_id = batch[-1][0]
+
+    counts = Tag.objects.annotate(count=Count('files')).values_list('pk', 'count')
+    for pk, count in counts.iterator():
+        Tag.objects.filter(pk=pk).update(file_count=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project_b_07', '0010_search_posting'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64)),
+                ('file_count', models.PositiveIntegerField(default=0)),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tags', to='project_b_07.team')),
+            ],
+            options={
+                'unique_together': {('team', 'name')},
+            },
+        ),
+        migrations.AddField(
+            model_name='teamfile',
+            name='tags',
+            field=models.ManyToManyField(blank=True, editable=False, related_name='files', to='project_b_07.tag'),
+        ),
+        migrations.RunPython(backfill_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.1 on 2026-10-18 21:30
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project_b_07', '0011_tags'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='team',
+            index=models.Index(django.db.models.functions.text.Lower('name'), models.F('id'), name='team_lower_name_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.1 on 2026-10-18 21:43
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project_b_07', '0012_team_name_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PublicDirectoryVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
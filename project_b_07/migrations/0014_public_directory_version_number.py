@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 22:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project_b_07', '0013_public_directory_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publicdirectoryversion',
+            name='number',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -9,12 +9,23 @@
 """
 
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import User
 from storages.backends.s3boto3 import S3Boto3Storage
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
+from django.utils import timezone
 from datetime import datetime
+import mimetypes
 
 
+class ActiveTeamManager(models.Manager):
+    """
+    Manager hiding teams that are being deleted in the background.
+    """
+    def get_queryset(self):
+        return super().get_queryset().filter(deleting_at__isnull=True)
+
 class Team(models.Model):
     """
     Model representing a team with a name, description, creation timestamp, and creator.
@@ -23,6 +34,15 @@ class Team(models.Model):
     description = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)  # Automatically sets the field to the current timestamp when the object is created
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)  # Links to the user who created the team
+    deleting_at = models.DateTimeField(null=True, blank=True)  # Set when the team is queued for deletion; hides it everywhere
+
+    objects = ActiveTeamManager()  # Teams that are not being deleted
+    all_objects = models.Manager()  # Every team, including those being deleted
+
+    class Meta:
+        indexes = [
+            models.Index(Lower('name'), 'id', name='team_lower_name_idx'),  # Supports the team list's name order, prefix search and cursor
+        ]
 
     def __str__(self):
         """
@@ -48,6 +68,53 @@ class TeamMembership(models.Model):
     class Meta:
         unique_together = ('user', 'team')  # Ensures a user cannot have multiple memberships in the same team
 
+class StoredBlob(models.Model):
+    """
+    Model representing an S3 object stored under the SHA-256 of its content, shared by every TeamFile with the same bytes.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)  # Hex digest of the object's content
+    key = models.CharField(max_length=255, unique=True)  # Content-addressed S3 key
+    size = models.BigIntegerField()  # Size of the object in bytes
+    content_type = models.CharField(max_length=100)  # Content type the object was uploaded with
+    ref_count = models.PositiveIntegerField(default=0)  # Number of TeamFile rows pointing at this object
+    created_at = models.DateTimeField(auto_now_add=True)  # Timestamp when the object was first uploaded
+
+    def __str__(self):
+        """
+        String representation of the StoredBlob model, displaying the S3 key.
+        """
+        return self.key
+
+class PendingObjectDelete(models.Model):
+    """
+    Model representing an S3 object whose last reference is gone, waiting to be removed in a batched delete.
+    """
+    key = models.CharField(max_length=1024, unique=True)  # S3 key to delete
+    created_at = models.DateTimeField(auto_now_add=True)  # Timestamp when the object was released
+
+    def __str__(self):
+        """
+        String representation of the PendingObjectDelete model, displaying the S3 key.
+        """
+        return self.key
+
+class Tag(models.Model):
+    """
+    Model representing a keyword tag of a team's files, with a maintained count of the files carrying it.
+    """
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='tags')  # Team the tag belongs to
+    name = models.CharField(max_length=64)  # Normalised keyword
+    file_count = models.PositiveIntegerField(default=0)  # Number of the team's files with the tag, kept up to date (see tags.py)
+
+    class Meta:
+        unique_together = ('team', 'name')  # One tag per team and name; also serves prefix lookups within a team
+
+    def __str__(self):
+        """
+        String representation of the Tag model, displaying the name and file count.
+        """
+        return f"{self.name} ({self.file_count})"
+
 class TeamFile(models.Model):
     """
     Model representing a file uploaded to a team, with details about the title, file content, description, keywords, and uploader.
@@ -59,6 +126,9 @@ class TeamFile(models.Model):
     uploaded_at = models.DateTimeField(auto_now_add=True)  # Timestamp when the file was uploaded
     uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)  # User who uploaded the file
     team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='files')  # Team the file is associated with
+    blob = models.ForeignKey(StoredBlob, on_delete=models.PROTECT, null=True, blank=True, related_name='team_files')  # Shared content, if stored content-addressed
+    search_vector = SearchVectorField(null=True, editable=False)  # Weighted title/keywords/description on PostgreSQL (see search.py)
+    tags = models.ManyToManyField(Tag, related_name='files', blank=True, editable=False)  # Tags parsed from the keywords (see tags.py)
 
     def __str__(self):
         """
@@ -66,6 +136,143 @@ class TeamFile(models.Model):
         """
         return self.title
 
+    def get_content_type(self):
+        """
+        Content type of the file: recorded for content-addressed uploads, guessed from the key otherwise.
+        """
+        if self.blob_id:
+            return self.blob.content_type
+        return mimetypes.guess_type(self.file.name)[0] or 'application/octet-stream'
+
+class FileSearchTerm(models.Model):
+    """
+    Model representing one posting of the inverted index used for file search where PostgreSQL full-text search is unavailable.
+    """
+    team_file = models.ForeignKey(TeamFile, on_delete=models.CASCADE, related_name='search_terms')  # File containing the term
+    term = models.CharField(max_length=64)  # Normalised token
+    weight = models.FloatField()  # Occurrences weighted by the field they appear in
+    occurrences = models.PositiveIntegerField(default=0)  # Times the term appears in the extracted file content
+
+    class Meta:
+        unique_together = ('team_file', 'term')  # One posting per file and term; also serves per-file lookups
+        indexes = [
+            models.Index(fields=['term'], name='search_term_idx'),  # Supports exact and prefix term lookups
+        ]
+
+    def __str__(self):
+        """
+        String representation of the FileSearchTerm model, displaying the term and file.
+        """
+        return f"{self.term} in {self.team_file_id}"
+
+class SearchPosting(models.Model):
+    """
+    Model representing one posting of the inverted index over team chat messages and milestones, used by the global search.
+    """
+    KIND_CHOICES = [
+        ('message', 'Chat message'),
+        ('milestone', 'Milestone'),
+    ]
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='search_postings')  # Team the indexed object belongs to
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)  # Type of the indexed object
+    object_id = models.PositiveBigIntegerField()  # Primary key of the indexed object
+    term = models.CharField(max_length=64)  # Normalised token
+    weight = models.FloatField()  # Occurrences weighted by the field they appear in
+
+    class Meta:
+        unique_together = ('kind', 'object_id', 'term')  # One posting per object and term; also serves per-object lookups
+        indexes = [
+            models.Index(fields=['term', 'team'], name='search_posting_term_idx'),  # Term lookups narrowed to the user's teams
+        ]
+
+    def __str__(self):
+        """
+        String representation of the SearchPosting model, displaying the term and object.
+        """
+        return f"{self.term} in {self.kind} {self.object_id}"
+
+class TeamSearchTerm(models.Model):
+    """
+    Model representing how common a term is among a team's files.
+    """
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='search_terms')  # Team whose files contain the term
+    term = models.CharField(max_length=64)  # Normalised token
+    file_count = models.PositiveIntegerField(default=0)  # Number of the team's files containing the term
+    occurrences = models.PositiveIntegerField(default=0)  # Total occurrences in the content of those files
+
+    class Meta:
+        unique_together = ('team', 'term')  # One row per team and term
+
+    def __str__(self):
+        """
+        String representation of the TeamSearchTerm model, displaying the term and team.
+        """
+        return f"{self.term} in team {self.team_id} ({self.file_count} files)"
+
+class FileContent(models.Model):
+    """
+    Model representing the text extracted in the background from a team file for search.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('ready', 'Ready'),
+        ('unsupported', 'Unsupported'),
+        ('failed', 'Failed'),
+    ]
+    team_file = models.OneToOneField(TeamFile, on_delete=models.CASCADE, related_name='content')  # File the text was extracted from
+    source_key = models.CharField(max_length=1024, blank=True, default='', db_index=True)  # S3 key the text was extracted from
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')  # Progress of the extraction
+    char_count = models.PositiveIntegerField(default=0)  # Length of the extracted text
+    term_count = models.PositiveIntegerField(default=0)  # Number of terms in the extracted text
+    error = models.TextField(blank=True, default='')  # Reason the last attempt failed
+    updated_at = models.DateTimeField(auto_now=True)  # Timestamp of the last status change
+
+    def __str__(self):
+        """
+        String representation of the FileContent model, displaying the file and status.
+        """
+        return f"Content of {self.team_file.title} ({self.status})"
+
+class FileContentChunk(models.Model):
+    """
+    Model representing one chunk of the text extracted from a team file, used for search snippets.
+    """
+    team_file = models.ForeignKey(TeamFile, on_delete=models.CASCADE, related_name='content_chunks')  # File the text belongs to
+    position = models.PositiveIntegerField()  # Order of the chunk within the text
+    text = models.TextField()  # Chunk of the extracted text, cut on whitespace
+
+    class Meta:
+        unique_together = ('team_file', 'position')  # Chunks of a file, in order
+
+    def __str__(self):
+        """
+        String representation of the FileContentChunk model, displaying the file and position.
+        """
+        return f"Chunk {self.position} of {self.team_file_id}"
+
+class FilePreview(models.Model):
+    """
+    Model representing the small preview generated in the background for a team file.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('ready', 'Ready'),
+        ('unsupported', 'Unsupported'),
+        ('failed', 'Failed'),
+    ]
+    team_file = models.OneToOneField(TeamFile, on_delete=models.CASCADE, related_name='preview')  # File the preview belongs to
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')  # Progress of the preview generation
+    image_key = models.CharField(max_length=255, blank=True, default='')  # S3 key of the thumbnail, stored next to the original
+    snippet = models.TextField(blank=True, default='')  # Opening text of .txt files
+    error = models.TextField(blank=True, default='')  # Reason the last attempt failed
+    updated_at = models.DateTimeField(auto_now=True)  # Timestamp of the last status change
+
+    def __str__(self):
+        """
+        String representation of the FilePreview model, displaying the file and status.
+        """
+        return f"Preview of {self.team_file.title} ({self.status})"
+
 class TeamChatMessage(models.Model):
     """
     Model representing a chat message within a team.
@@ -77,9 +284,83 @@ class TeamChatMessage(models.Model):
 
     class Meta:
         ordering = ['created_at']  # Orders chat messages by creation time in ascending order
+        indexes = [
+            models.Index(fields=['team', 'id'], name='chat_team_id_idx'),  # Supports "messages since id" polling
+            models.Index(fields=['team', 'created_at', 'id'], name='chat_team_created_idx'),  # Supports history pages
+        ]
 
     def __str__(self):
         """
         String representation of the TeamChatMessage model, displaying the user and team.
         """
-        return f"Message by {self.user.username} in {self.team.name}"
\ No newline at end of file
+        return f"Message by {self.user.username} in {self.team.name}"
+
+class Job(models.Model):
+    """
+    Model representing a unit of deferred work in the database-backed job queue (see project_b_07/jobs.py).
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    task = models.CharField(max_length=200)  # Dotted path of the function to call
+    kwargs = models.JSONField(default=dict, blank=True)  # Keyword arguments passed to the function
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')  # Lifecycle of the job
+    attempts = models.PositiveIntegerField(default=0)  # Number of times a worker has started the job
+    max_attempts = models.PositiveIntegerField(default=5)  # Attempts allowed before the job is marked failed
+    run_after = models.DateTimeField(default=timezone.now)  # Earliest time the job may run, pushed back on retries
+    locked_by = models.CharField(max_length=100, blank=True, default='')  # Worker currently running the job
+    locked_at = models.DateTimeField(null=True, blank=True)  # When the current attempt was claimed
+    last_error = models.TextField(blank=True, default='')  # Traceback of the last failed attempt
+    duration = models.FloatField(null=True, blank=True)  # Seconds the last attempt took
+    created_at = models.DateTimeField(auto_now_add=True)  # Timestamp when the job was enqueued
+    finished_at = models.DateTimeField(null=True, blank=True)  # Timestamp when the job succeeded or gave up
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after', 'id'], name='job_claim_idx'),  # Supports claiming the next due job
+        ]
+
+    def __str__(self):
+        """
+        String representation of the Job model, displaying the task and status.
+        """
+        return f"{self.task} ({self.status})"
+
+class TeamDeletion(models.Model):
+    """
+    Model tracking the background deletion of a team and its children, batch by batch.
+    """
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('done', 'Done'),
+    ]
+    # No database constraint, so the record outlives the team it describes
+    team = models.ForeignKey(Team, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')  # Team being deleted
+    team_name = models.CharField(max_length=100)  # Name of the team, kept for reporting
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)  # User who deleted the team
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='running')  # Progress of the deletion
+    progress = models.JSONField(default=dict, blank=True)  # Rows deleted so far, per model label
+    created_at = models.DateTimeField(auto_now_add=True)  # Timestamp when the deletion was requested
+    finished_at = models.DateTimeField(null=True, blank=True)  # Timestamp when the team row itself was removed
+
+    def __str__(self):
+        """
+        String representation of the TeamDeletion model, displaying the team and status.
+        """
+        return f"Deletion of {self.team_name} ({self.status})"
+
+class PublicDirectoryVersion(models.Model):
+    """
+    Model holding the single row that records when the public team directory last changed.
+    """
+    number = models.PositiveBigIntegerField(default=0)  # Bumped on every change; keys the cached pages and their ETags
+    changed_at = models.DateTimeField(default=timezone.now)  # Time of the last change, sent as the pages' Last-Modified
+
+    def __str__(self):
+        """
+        String representation of the PublicDirectoryVersion model, displaying its number and the time of the last change.
+        """
+        return f"Public directory version {self.number} as of {self.changed_at}"
@@ -0,0 +1,54 @@
+"""
+Helpers for keyset (cursor) pagination.
+
+A cursor is an opaque, URL-safe token holding the sort-key values of the last row
+a client has seen. The next page is read with a ``WHERE (a, b) < (x, y)`` style
+filter instead of OFFSET, so every page costs the same no matter how deep it is.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+
+def encode_cursor(*values):
+    """
+    Pack sort-key values (strings, numbers or datetimes) into an opaque cursor string.
+    """
+    packed = [
+        {'dt': value.isoformat()} if isinstance(value, datetime) else value
+        for value in values
+    ]
+    raw = json.dumps(packed, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, *types):
+    """
+    Unpack a cursor produced by ``encode_cursor`` whose values should have ``types``
+    (``datetime``, ``int`` or ``str``, in order). Returns the list of values, or ``None``
+    when the cursor is missing, malformed or holds values of other types, so a forged
+    cursor never reaches a query.
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        packed = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(packed, list) or len(packed) != len(types):
+        return None
+    values = []
+    for value, expected in zip(packed, types):
+        if expected is datetime:
+            if not isinstance(value, dict) or not isinstance(value.get('dt'), str):
+                return None
+            try:
+                value = datetime.fromisoformat(value['dt'])
+            except ValueError:
+                return None
+        elif not isinstance(value, expected) or isinstance(value, bool):
+            return None
+        values.append(value)
+    return values
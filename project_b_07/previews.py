@@ -0,0 +1,166 @@
+"""
+Background generation of small previews for team files.
+
+After a TeamFile is committed, building its preview is queued as a job of the
+database queue (``jobs.enqueue``, run by ``run_jobs``), so it survives restarts of
+the web process and is not duplicated per web worker: a JPEG thumbnail for .jpg
+images, a rasterised first page for .pdf documents and the opening text for .txt
+files. Thumbnails are stored in S3 next to the original (``<key>.preview.jpg``), so
+team pages can show them without downloading the file.
+
+The outcome is recorded in the FilePreview row. Pillow and pypdfium2 are optional -
+without them the affected previews are marked unsupported.
+"""
+
+import io
+import logging
+
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.db import transaction
+
+from .jobs import enqueue
+from .models import FilePreview, TeamFile
+from .storage import get_s3_client, is_missing_object
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_SUFFIX = '.preview.jpg'
+THUMBNAIL_SIZE = (320, 320)
+SNIPPET_CHARS = 500
+# Bytes read from the head of a .txt file to build its snippet
+SNIPPET_BYTES = 4 * SNIPPET_CHARS
+
+PREVIEW_KINDS = {
+    'image/jpeg': 'image',
+    'application/pdf': 'pdf',
+    'text/plain': 'text',
+}
+
+
+def preview_key(source_key):
+    """
+    S3 key of the thumbnail generated for ``source_key``.
+    """
+    return source_key + PREVIEW_SUFFIX
+
+
+def _thumbnail(image):
+    """
+    Shrink a PIL image in place and return it encoded as JPEG bytes.
+    """
+    image.thumbnail(THUMBNAIL_SIZE)
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    output = io.BytesIO()
+    image.save(output, format='JPEG', quality=80)
+    return output.getvalue()
+
+
+def render_preview(kind, data):
+    """
+    Turn the source bytes into ``(thumbnail_jpeg_or_None, snippet)``.
+    Raises ImportError when the library needed for ``kind`` is not installed.
+    """
+    if kind == 'text':
+        return None, data.decode('utf-8', errors='replace')[:SNIPPET_CHARS]
+    if kind == 'image':
+        from PIL import Image
+        with Image.open(io.BytesIO(data)) as image:
+            return _thumbnail(image), ''
+    if kind == 'pdf':
+        import pypdfium2
+        pdf = pypdfium2.PdfDocument(data)
+        try:
+            page = pdf[0]
+            image = page.render(scale=1).to_pil()
+        finally:
+            pdf.close()
+        return _thumbnail(image), ''
+    raise ValueError(f"Unknown preview kind: {kind}")
+
+
+def build_preview(source_key, kind):
+    """
+    Download the source, render its preview and upload the thumbnail.
+    Returns a dict describing the outcome. S3 and network errors are raised, so the
+    job is retried; only a missing source or one that cannot be rendered fails for good.
+    """
+    s3 = get_s3_client()
+    bucket = settings.AWS_STORAGE_BUCKET_NAME
+    try:
+        if kind == 'text':
+            # The snippet only needs the head of the file
+            obj = s3.get_object(Bucket=bucket, Key=source_key, Range=f"bytes=0-{SNIPPET_BYTES - 1}")
+        else:
+            head = s3.head_object(Bucket=bucket, Key=source_key)
+            if head['ContentLength'] > settings.PREVIEW_MAX_SOURCE_BYTES:
+                return {'status': 'unsupported', 'error': 'File is too large to preview.'}
+            obj = s3.get_object(Bucket=bucket, Key=source_key)
+        data = obj['Body'].read()
+    except ClientError as e:
+        if not is_missing_object(e):
+            raise
+        return {'status': 'failed', 'error': 'The file is missing from storage.'}
+    try:
+        thumbnail, snippet = render_preview(kind, data)
+    except ImportError as e:
+        return {'status': 'unsupported', 'error': str(e)}
+    except Exception as e:
+        return {'status': 'failed', 'error': str(e)}
+
+    image_key = ''
+    if thumbnail is not None:
+        image_key = preview_key(source_key)
+        s3.put_object(Bucket=bucket, Key=image_key, Body=thumbnail, ContentType='image/jpeg')
+    return {'status': 'ready', 'image_key': image_key, 'snippet': snippet}
+
+
+def _save_result(team_file_id, result):
+    FilePreview.objects.filter(team_file_id=team_file_id).update(
+        status=result['status'],
+        image_key=result.get('image_key', ''),
+        snippet=result.get('snippet', ''),
+        error=result.get('error', ''),
+    )
+
+
+def generate_preview(team_file_id, source_key):
+    """
+    Job: build the preview of a team file, unless the file is gone or now points at
+    other content.
+    """
+    team_file = TeamFile.objects.select_related('blob').filter(id=team_file_id).first()
+    if team_file is None or team_file.file.name != source_key:
+        return
+    kind = PREVIEW_KINDS.get(team_file.get_content_type())
+    if kind is not None:
+        _save_result(team_file_id, build_preview(source_key, kind))
+
+
+def schedule_preview(team_file_id):
+    """
+    Queue a job building the preview of a team file. With ``PREVIEW_INLINE`` the
+    preview is built inline, which is what the tests use.
+    """
+    team_file = TeamFile.objects.select_related('blob').filter(id=team_file_id).first()
+    if team_file is None:
+        return
+    kind = PREVIEW_KINDS.get(team_file.get_content_type())
+    if kind is None:
+        FilePreview.objects.update_or_create(team_file=team_file, defaults={'status': 'unsupported'})
+        return
+    # The pending row and its job are written together, so no row is left pending without one
+    with transaction.atomic():
+        FilePreview.objects.update_or_create(
+            team_file=team_file, defaults={'status': 'pending', 'image_key': '', 'snippet': '', 'error': ''}
+        )
+        if not settings.PREVIEW_INLINE:
+            enqueue(generate_preview, team_file_id=team_file.id, source_key=team_file.file.name)
+            logger.info("Queued %s preview for team file %s", kind, team_file_id)
+            return
+    try:
+        generate_preview(team_file.id, team_file.file.name)
+    except Exception as e:
+        # Inline there is no job to retry, so storage errors fail the preview
+        _save_result(team_file.id, {'status': 'failed', 'error': str(e)})
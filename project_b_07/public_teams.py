@@ -0,0 +1,98 @@
+"""
+The public team directory shown to visitors who are not logged in.
+
+Pages are rendered once and kept in the cache under a version that changes whenever a
+team is created, edited or deleted, or its creator renamed, so a burst of anonymous
+visitors costs one small query per request instead of a render. The version is the
+PublicDirectoryVersion row, kept in the database so every worker process sees a change at
+once. Its counter keys the cached pages and prefixes their ETag, so changes within the
+same second still get new validators; the time of the last change is the Last-Modified.
+Responses are marked ``Cache-Control: public`` so a shared cache or CDN in front of the
+site can absorb the traffic and revalidate with a conditional request once
+``PUBLIC_TEAMS_MAX_AGE`` is up.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Q
+from django.db.models.functions import Lower
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.http import quote_etag
+
+from .models import PublicDirectoryVersion, Team
+from .pagination import decode_cursor, encode_cursor
+
+# Number of teams listed per page of the public directory
+PUBLIC_TEAM_PAGE_SIZE = 50
+
+
+class PublicTeamPage:
+    """
+    A rendered page of the directory with the validators of its response.
+    """
+
+    def __init__(self, body, etag, last_modified):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+def current_version():
+    """
+    The directory's PublicDirectoryVersion, bumped by every change to a team shown in it.
+    """
+    version, _ = PublicDirectoryVersion.objects.get_or_create(pk=1)
+    return version
+
+
+def invalidate_public_teams():
+    """
+    Start a new version so every cached page is rendered again on its next request.
+    """
+    PublicDirectoryVersion.objects.get_or_create(pk=1)
+    # Incremented in the database, so concurrent changes each get a number of their own
+    PublicDirectoryVersion.objects.filter(pk=1).update(number=F('number') + 1, changed_at=timezone.now())
+
+
+def public_team_page(after=None):
+    """
+    The PublicTeamPage following the ``after`` cursor (the first page when it is missing or malformed).
+    """
+    cursor = decode_cursor(after, str, int)
+    version = current_version()
+    key = f"public_teams:{version.number}:{after if cursor is not None else ''}"
+    page = cache.get(key)
+    if page is None:
+        page = _render_page(cursor, version)
+        cache.set(key, page, settings.PUBLIC_TEAMS_CACHE_TIMEOUT)
+    return page
+
+
+def _render_page(cursor, version):
+    teams = Team.objects.annotate(name_key=Lower('name'))
+    if cursor is not None:
+        after_name, after_id = cursor
+        teams = teams.filter(Q(name_key__gt=after_name) | Q(name_key=after_name, id__gt=after_id))
+    # Only what the page shows, with the creator's name joined in
+    rows = list(
+        teams.order_by('name_key', 'id')
+        .values_list('id', 'name', 'name_key', 'created_by__first_name', 'created_by__last_name')[:PUBLIC_TEAM_PAGE_SIZE + 1]
+    )
+    next_cursor = None
+    if len(rows) > PUBLIC_TEAM_PAGE_SIZE:
+        rows = rows[:PUBLIC_TEAM_PAGE_SIZE]
+        next_cursor = encode_cursor(rows[-1][2], rows[-1][0])
+
+    body = render_to_string('public_team_list.html', {
+        'teams': [
+            {'name': name, 'created_by_name': f"{first_name} {last_name}".strip()}
+            for _, name, _, first_name, last_name in rows
+        ],
+        'next_cursor': next_cursor,
+        'is_first_page': cursor is None,
+    })
+    etag = quote_etag(f"{version.number}-{hashlib.sha256(body.encode()).hexdigest()[:32]}")
+    return PublicTeamPage(body, etag, int(version.changed_at.timestamp()))
@@ -0,0 +1,238 @@
+"""
+Reconciliation between the S3 bucket and the rows that reference its objects.
+
+Both sides are streamed in the same order and compared with a sorted merge, so memory
+stays constant however many keys the bucket holds:
+
+- ``ListObjectsV2`` returns keys in UTF-8 byte order.
+- TeamFile.file, StoredBlob.key and FilePreview.image_key are read with server-side
+  iterators, sorted in byte order. On PostgreSQL this uses the ``"C"`` collation.
+  SQLite's default BINARY collation already compares bytes.
+
+Objects no row refers to are orphans. Rows whose object is missing are dangling.
+Objects and rows younger than ``min_age`` are never judged: an upload may be between
+writing its object and its row, and a row committed mid-run may sort behind the listing.
+Progress is checkpointed after every listing page. An interrupted run can resume from
+the last key it finished with.
+"""
+
+import heapq
+import itertools
+import json
+import os
+from datetime import timedelta
+
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+from django.db.models.functions import Collate
+from django.utils import timezone
+
+from .blobs import purge_pending_objects, queue_object_deletes
+from .models import FilePreview, StoredBlob, TeamFile
+
+# Rows fetched per round trip from each ordered database stream
+DB_CHUNK_SIZE = 2000
+
+# Models and fields holding S3 keys, reported by this name when dangling, with the
+# field recording when the key was written
+KEY_SOURCES = [
+    ('file', TeamFile, 'file', 'uploaded_at'),
+    ('blob', StoredBlob, 'key', 'created_at'),
+    ('preview', FilePreview, 'image_key', 'updated_at'),
+]
+
+
+def _ordered_keys(source, model, field, written_field, prefix, start_after):
+    """
+    Yield ``(key, source, written_at)`` for every non-empty key of ``model.field`` under
+    ``prefix``, in byte order.
+    """
+    sort_key = Collate(field, 'C') if connection.vendor == 'postgresql' else F(field)
+    rows = model._base_manager.annotate(sort_key=sort_key).exclude(**{field: ''})
+    if prefix:
+        rows = rows.filter(**{f'{field}__startswith': prefix})
+    if start_after:
+        rows = rows.filter(sort_key__gt=start_after)
+    for key, written_at in rows.order_by('sort_key').values_list(field, written_field).iterator(chunk_size=DB_CHUNK_SIZE):
+        yield key, source, written_at
+
+
+def referenced_keys(prefix='', start_after=''):
+    """
+    Yield ``(key, sources)`` for every key referenced by the database, in byte order,
+    where ``sources`` maps each source naming the key to when its newest row was written.
+    """
+    streams = [
+        _ordered_keys(source, model, field, written_field, prefix, start_after)
+        for source, model, field, written_field in KEY_SOURCES
+    ]
+    # Python compares str by code point, which matches UTF-8 byte order
+    merged = heapq.merge(*streams, key=lambda item: item[0])
+    for key, group in itertools.groupby(merged, key=lambda item: item[0]):
+        sources = {}
+        for _, source, written_at in group:
+            sources[source] = max(written_at, sources.get(source, written_at))
+        yield key, sources
+
+
+class Reconciler:
+    """
+    Walks the bucket and the database side by side, collecting orphans and dangling
+    keys in batches and handing full batches to ``on_orphans`` / ``on_dangling``.
+    """
+
+    def __init__(self, s3, bucket, prefix='', min_age=timedelta(hours=24), page_size=1000,
+                 checkpoint_path=None, on_orphans=None, on_dangling=None, batch_size=1000):
+        self.s3 = s3
+        self.bucket = bucket
+        self.prefix = prefix
+        self.min_age = min_age
+        self.page_size = page_size
+        self.checkpoint_path = checkpoint_path
+        self.on_orphans = on_orphans or (lambda keys: None)
+        self.on_dangling = on_dangling or (lambda entries: None)
+        self.batch_size = batch_size
+        self.counts = {'objects': 0, 'matched': 0, 'orphans': 0, 'recent': 0, 'dangling': 0, 'orphan_bytes': 0}
+        self.start_after = ''
+        self._orphans = []
+        self._dangling = []
+
+    def load_checkpoint(self):
+        """
+        Resume from the checkpoint file, if one was left by an interrupted run.
+        """
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as checkpoint:
+                state = json.load(checkpoint)
+            if state.get('prefix') == self.prefix:
+                self.start_after = state['start_after']
+                self.counts.update(state['counts'])
+        return self.start_after
+
+    def _save_checkpoint(self, last_key):
+        if not self.checkpoint_path:
+            return
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w') as checkpoint:
+            json.dump({'prefix': self.prefix, 'start_after': last_key, 'counts': self.counts}, checkpoint)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _orphan(self, obj, cutoff):
+        if obj['LastModified'] > cutoff:
+            # May belong to an upload whose row has not been written yet
+            self.counts['recent'] += 1
+            return
+        self.counts['orphans'] += 1
+        self.counts['orphan_bytes'] += obj.get('Size', 0)
+        self._orphans.append(obj['Key'])
+        if len(self._orphans) >= self.batch_size:
+            self._flush_orphans()
+
+    def _dangle(self, key, sources, cutoff):
+        old_sources = {source for source, written_at in sources.items() if written_at <= cutoff}
+        if not old_sources:
+            # May have been committed after the listing passed its key
+            self.counts['recent'] += 1
+            return
+        self.counts['dangling'] += 1
+        self._dangling.append((key, old_sources))
+        if len(self._dangling) >= self.batch_size:
+            self._flush_dangling()
+
+    def _flush_orphans(self):
+        if self._orphans:
+            self.on_orphans(self._orphans)
+            self._orphans = []
+
+    def _flush_dangling(self):
+        if self._dangling:
+            self.on_dangling(self._dangling)
+            self._dangling = []
+
+    def _objects(self):
+        """
+        Yield listing pages as lists of objects, resuming after ``start_after``.
+        """
+        params = {'Bucket': self.bucket, 'Prefix': self.prefix}
+        if self.start_after:
+            params['StartAfter'] = self.start_after
+        paginator = self.s3.get_paginator('list_objects_v2')
+        for page in paginator.paginate(PaginationConfig={'PageSize': self.page_size}, **params):
+            yield page.get('Contents', [])
+
+    def run(self):
+        """
+        Compare the bucket with the database and return the counts.
+        """
+        cutoff = timezone.now() - self.min_age
+        db_keys = referenced_keys(self.prefix, self.start_after)
+        db_entry = next(db_keys, None)
+
+        for page in self._objects():
+            for obj in page:
+                self.counts['objects'] += 1
+                key = obj['Key']
+                # Rows whose key sorts before this object have no object
+                while db_entry is not None and db_entry[0] < key:
+                    self._dangle(*db_entry, cutoff)
+                    db_entry = next(db_keys, None)
+                if db_entry is not None and db_entry[0] == key:
+                    self.counts['matched'] += 1
+                    db_entry = next(db_keys, None)
+                else:
+                    self._orphan(obj, cutoff)
+            if page:
+                # Everything up to the page's last key has been decided
+                self._flush_orphans()
+                self._flush_dangling()
+                self._save_checkpoint(page[-1]['Key'])
+
+        while db_entry is not None:
+            self._dangle(*db_entry, cutoff)
+            db_entry = next(db_keys, None)
+        self._flush_orphans()
+        self._flush_dangling()
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        return self.counts
+
+
+def delete_orphans(keys):
+    """
+    Remove orphaned objects through the batched purge, which re-checks each key is still unreferenced.
+    """
+    queue_object_deletes(keys)
+    purge_pending_objects()
+
+
+def _object_exists(s3, bucket, key):
+    try:
+        s3.head_object(Bucket=bucket, Key=key)
+    except ClientError as error:
+        if error.response.get('ResponseMetadata', {}).get('HTTPStatusCode') == 404:
+            return False
+        raise
+    return True
+
+
+def delete_dangling(s3, bucket, entries):
+    """
+    Remove rows whose object is gone, once a HEAD request confirms it still is.
+    Deleting a file also releases its blob. Previews are dropped so
+    ``generate_previews`` can rebuild them.
+    """
+    by_source = {}
+    for key, sources in entries:
+        if _object_exists(s3, bucket, key):
+            continue
+        for source in sources:
+            by_source.setdefault(source, []).append(key)
+    if 'file' in by_source:
+        TeamFile.objects.filter(file__in=by_source['file']).delete()
+    if 'preview' in by_source:
+        FilePreview.objects.filter(image_key__in=by_source['preview']).delete()
+    if 'blob' in by_source:
+        # Only blobs no file points at any more; the others went with their files above
+        StoredBlob.objects.filter(key__in=by_source['blob'], team_files__isnull=True).delete()
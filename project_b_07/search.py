@@ -0,0 +1,356 @@
+"""
+Full-text search over team files: title, keywords, description and extracted content.
+
+Two interchangeable backends, picked from the database vendor:
+
+- PostgreSQL: a weighted ``tsvector`` in ``TeamFile.search_vector``, GIN-indexed (see
+  migration 0008), queried with ``to_tsquery`` and ranked with ``ts_rank``.
+- Elsewhere (SQLite): an inverted index in FileSearchTerm. It holds one posting per
+  file and normalised term, weighted by the fields the term appears in. Prefix
+  matching is an index range scan (``term >= 'pap' AND term < 'paq'``).
+
+Both backends treat every query word as a prefix and require all of them to match (AND).
+The index is updated whenever a file is saved or its content extracted (see
+extraction.py); postings go with the file on delete.
+
+FileSearchTerm also carries per-file term statistics (occurrences in the content) and
+is kept on both backends, so TeamSearchTerm can hold the per-team ones: how many of a
+team's files contain each term. Only the terms whose statistics changed are recounted.
+Snippets come from the stored content chunks, never from S3.
+"""
+
+import math
+import operator
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from functools import reduce
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, FloatField, IntegerField, Max, OuterRef, Q, Subquery, Sum, Value, When
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import FileContentChunk, FileSearchTerm, SearchPosting, Team, TeamFile, TeamSearchTerm
+
+# Field weights; title matches rank above keyword matches, which rank above description matches
+FIELD_WEIGHTS = {'title': 1.0, 'keywords': 0.6, 'description': 0.3}
+POSTGRES_WEIGHTS = {'title': 'A', 'keywords': 'B', 'description': 'C'}
+# Content matches rank lowest; repeated occurrences count logarithmically
+CONTENT_WEIGHT = 0.1
+POSTGRES_CONTENT_WEIGHT = 'D'
+# Fields of the other objects covered by the global search, with their weights
+POSTING_FIELDS = {
+    'message': {'message': 0.6},
+    'milestone': {'title': 1.0, 'description': 0.3},
+}
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 8
+SNIPPET_CHARS = 240
+# Terms per IN (...) list when recounting team statistics
+STATS_BATCH_SIZE = 500
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text, strip_accents=True):
+    """
+    Split text into lower-case terms, by default with accents removed.
+    """
+    text = text or ''
+    if strip_accents:
+        text = unicodedata.normalize('NFKD', text)
+        text = ''.join(char for char in text if not unicodedata.combining(char))
+    return [token[:MAX_TERM_LENGTH] for token in _TOKEN_RE.findall(text.lower())]
+
+
+def query_terms(query, strip_accents=True):
+    """
+    The distinct terms of a search box query, in order, capped at ``MAX_QUERY_TERMS``.
+    """
+    return list(dict.fromkeys(tokenize(query, strip_accents)))[:MAX_QUERY_TERMS]
+
+
+def use_postgres():
+    return connection.vendor == 'postgresql'
+
+
+def _postgres_vector():
+    content = (
+        FileContentChunk.objects.filter(team_file=OuterRef('pk'))
+        .values('team_file')
+        .annotate(text=StringAgg('text', ' ', ordering='position'))
+        .values('text')
+    )
+    vectors = [
+        SearchVector(field, weight=weight, config=settings.SEARCH_CONFIG) for field, weight in POSTGRES_WEIGHTS.items()
+    ]
+    vectors.append(SearchVector(Subquery(content), weight=POSTGRES_CONTENT_WEIGHT, config=settings.SEARCH_CONFIG))
+    return reduce(operator.add, vectors)
+
+
+def file_postings(team_file, content_terms=()):
+    """
+    Postings of a file for the inverted index: ``{term: (weight, occurrences in the content)}``.
+    """
+    weights = Counter()
+    for field, weight in FIELD_WEIGHTS.items():
+        for term in tokenize(getattr(team_file, field)):
+            weights[term] += weight
+    occurrences = Counter(content_terms)
+    for term, count in occurrences.items():
+        weights[term] += CONTENT_WEIGHT * (1 + math.log(count))
+    return {term: (weight, occurrences[term]) for term, weight in weights.items()}
+
+
+def _content_terms(file_ids):
+    """
+    Terms of the extracted content of the given files, by file id.
+    """
+    terms = defaultdict(list)
+    chunks = FileContentChunk.objects.filter(team_file_id__in=file_ids).values_list('team_file_id', 'text')
+    for file_id, text in chunks.iterator():
+        terms[file_id].extend(tokenize(text))
+    return terms
+
+
+def index_files(team_files):
+    """
+    (Re)index the given files and refresh the team statistics of the terms that changed.
+    """
+    team_files = list(team_files)
+    if not team_files:
+        return
+    ids = [team_file.pk for team_file in team_files]
+    content_terms = _content_terms(ids)
+    with transaction.atomic():
+        if use_postgres():
+            TeamFile.objects.filter(pk__in=ids).update(search_vector=_postgres_vector())
+
+        old = {
+            (file_id, term): occurrences
+            for file_id, term, occurrences in FileSearchTerm.objects.filter(team_file_id__in=ids)
+            .values_list('team_file_id', 'term', 'occurrences').iterator()
+        }
+        FileSearchTerm.objects.filter(team_file_id__in=ids).delete()
+        changed = defaultdict(set)
+        postings = []
+        for team_file in team_files:
+            for term, (weight, occurrences) in file_postings(team_file, content_terms[team_file.pk]).items():
+                postings.append(FileSearchTerm(team_file_id=team_file.pk, term=term, weight=weight, occurrences=occurrences))
+                if old.pop((team_file.pk, term), None) != occurrences:
+                    changed[team_file.team_id].add(term)
+        FileSearchTerm.objects.bulk_create(postings, batch_size=1000)
+
+        # Whatever is left in ``old`` has disappeared from its file
+        teams = {team_file.pk: team_file.team_id for team_file in team_files}
+        for file_id, term in old:
+            changed[teams[file_id]].add(term)
+        refresh_team_terms(changed)
+
+
+def remove_from_index(team_files):
+    """
+    Drop the postings of files about to be deleted and update their teams' statistics.
+    """
+    ids = [team_file.pk for team_file in team_files]
+    postings = FileSearchTerm.objects.filter(team_file_id__in=ids)
+    changed = defaultdict(set)
+    for team_id, term in postings.values_list('team_file__team_id', 'term').iterator():
+        changed[team_id].add(term)
+    with transaction.atomic():
+        postings.delete()
+        # Never recreate rows here: while a team is deleted its statistics may already be gone
+        refresh_team_terms(changed, create=False)
+
+
+def refresh_team_terms(changed, create=True):
+    """
+    Recount the team statistics of the given terms (``{team_id: terms}``) from the postings.
+    """
+    for team_id, terms in changed.items():
+        if not terms:
+            continue
+        # Serialises concurrent refreshes of one team, so rows are not created twice
+        list(Team.all_objects.select_for_update().filter(pk=team_id).values_list('pk'))
+        terms = sorted(terms)
+        for start in range(0, len(terms), STATS_BATCH_SIZE):
+            batch = terms[start:start + STATS_BATCH_SIZE]
+            counts = {
+                row['term']: row for row in FileSearchTerm.objects.filter(team_file__team_id=team_id, term__in=batch)
+                .values('term').annotate(files=Count('id'), total=Sum('occurrences'))
+            }
+            existing = {row.term: row for row in TeamSearchTerm.objects.filter(team_id=team_id, term__in=batch)}
+            updated, created, emptied = [], [], []
+            for term in batch:
+                row, count = existing.get(term), counts.get(term)
+                if count is None:
+                    if row is not None:
+                        emptied.append(row.pk)
+                elif row is not None:
+                    row.file_count, row.occurrences = count['files'], count['total']
+                    updated.append(row)
+                elif create:
+                    created.append(TeamSearchTerm(team_id=team_id, term=term, file_count=count['files'], occurrences=count['total']))
+            TeamSearchTerm.objects.filter(pk__in=emptied).delete()
+            TeamSearchTerm.objects.bulk_update(updated, ['file_count', 'occurrences'])
+            TeamSearchTerm.objects.bulk_create(created)
+
+
+def prefix_q(term, prefix='term'):
+    """
+    Index-friendly prefix match: a range over the term column rather than LIKE.
+    """
+    upper = term[:-1] + chr(ord(term[-1]) + 1)
+    return Q(**{f'{prefix}__gte': term, f'{prefix}__lt': upper})
+
+
+def search_files(queryset, query):
+    """
+    Narrow a TeamFile queryset to the files matching every word of ``query`` (as a
+    prefix), annotated with ``search_rank`` and ordered best first.
+    """
+    # The PostgreSQL text search configuration keeps accents, so the query must too
+    terms = query_terms(query, strip_accents=not use_postgres())
+    if not terms:
+        return queryset.none()
+
+    if use_postgres():
+        # Terms are \w+ tokens, so they cannot inject tsquery operators
+        search_query = SearchQuery(
+            ' & '.join(f'{term}:*' for term in terms), search_type='raw', config=settings.SEARCH_CONFIG
+        )
+        return (
+            queryset.filter(search_vector=search_query)
+            .annotate(search_rank=SearchRank(F('search_vector'), search_query))
+            .order_by('-search_rank', '-id')
+        )
+
+    # One grouped query: join the postings matching any term, keep files where every term matched
+    any_term, per_term = _term_matches(terms, 'search_terms__term')
+    return (
+        queryset.filter(any_term)
+        .annotate(search_rank=Sum('search_terms__weight', output_field=FloatField()), **per_term)
+        .filter(**{name: 1 for name in per_term})
+        .order_by('-search_rank', '-id')
+    )
+
+
+def _term_matches(terms, prefix):
+    """
+    A filter for postings matching any of the terms, and per-term aggregates that are 1
+    for groups where that term matched.
+    """
+    matches = [prefix_q(term, prefix) for term in terms]
+    any_term = reduce(operator.or_, matches)
+    per_term = {
+        f'_term_{n}': Max(Case(When(match, then=1), default=0, output_field=IntegerField()))
+        for n, match in enumerate(matches)
+    }
+    return any_term, per_term
+
+
+def index_postings(kind, objects):
+    """
+    (Re)index chat messages or milestones for the global search. Objects without a team are left out.
+    """
+    objects = list(objects)
+    if not objects:
+        return
+    with transaction.atomic():
+        remove_postings(kind, [obj.pk for obj in objects])
+        postings = []
+        for obj in objects:
+            if obj.team_id is None:
+                continue
+            weights = Counter()
+            for field, weight in POSTING_FIELDS[kind].items():
+                for term in tokenize(getattr(obj, field)):
+                    weights[term] += weight
+            postings.extend(
+                SearchPosting(team_id=obj.team_id, kind=kind, object_id=obj.pk, term=term, weight=weight)
+                for term, weight in weights.items()
+            )
+        SearchPosting.objects.bulk_create(postings, batch_size=1000)
+
+
+def remove_postings(kind, object_ids):
+    SearchPosting.objects.filter(kind=kind, object_id__in=object_ids).delete()
+
+
+def search_teams(team_ids, query):
+    """
+    Files, chat messages and milestones of the given teams matching every word of
+    ``query``, as one ranked query of ``(kind, object_id, rank)`` rows, best first.
+    ``team_ids`` may be a subquery, so the caller's team set never leaves the database.
+    Both backends use the postings here, so ranks are comparable across kinds.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return SearchPosting.objects.none().values_list('kind', 'object_id', 'weight')
+
+    any_term, per_term = _term_matches(terms, 'term')
+    all_terms = {name: 1 for name in per_term}
+    files = (
+        FileSearchTerm.objects.filter(any_term, team_file__team_id__in=team_ids)
+        .values(object_id=F('team_file_id'))
+        .annotate(kind=Value('file'), rank=Sum('weight'), **per_term)
+        .filter(**all_terms)
+        .values_list('kind', 'object_id', 'rank')
+    )
+    others = (
+        SearchPosting.objects.filter(any_term, team_id__in=team_ids)
+        .values('kind', 'object_id')
+        .annotate(rank=Sum('weight'), **per_term)
+        .filter(**all_terms)
+        .values_list('kind', 'object_id', 'rank')
+    )
+    return files.union(others, all=True).order_by('-rank', 'kind', '-object_id')
+
+
+def with_snippets(queryset, query):
+    """
+    Annotate each file with ``snippet_text``: its first content chunk containing a query word.
+    """
+    terms = query_terms(query, strip_accents=False)
+    if not terms:
+        return queryset
+    any_term = Q()
+    for term in terms:
+        any_term |= Q(text__icontains=term)
+    chunks = FileContentChunk.objects.filter(any_term, team_file=OuterRef('pk')).order_by('position')
+    return queryset.annotate(snippet_text=Subquery(chunks.values('text')[:1]))
+
+
+def highlight(text, query, width=SNIPPET_CHARS):
+    """
+    HTML excerpt of ``text`` around the first query word, with the words wrapped in ``<mark>``.
+    """
+    terms = query_terms(query, strip_accents=False)
+    if not text or not terms:
+        return ''
+    pattern = re.compile(r'\b(?:' + '|'.join(map(re.escape, terms)) + r')\w*', re.IGNORECASE)
+    first = pattern.search(text)
+    start = max(0, first.start() - width // 3) if first else 0
+    if start:
+        # Start on a word boundary
+        space = text.find(' ', start, first.start())
+        start = space + 1 if space != -1 else start
+    end = min(len(text), start + width)
+    if end < len(text):
+        space = text.rfind(' ', start, end)
+        end = space if space > start else end
+    excerpt = text[start:end]
+
+    parts = ['\u2026' if start else '']
+    position = 0
+    for match in pattern.finditer(excerpt):
+        parts.append(escape(excerpt[position:match.start()]))
+        parts.append(f'<mark>{escape(match.group())}</mark>')
+        position = match.end()
+    parts.append(escape(excerpt[position:]))
+    parts.append('\u2026' if end < len(text) else '')
+    return mark_safe(''.join(parts))
@@ -64,7 +64,6 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',
-    'users.middleware.EnsureProfileMiddleware',
 ]
 
 ROOT_URLCONF = 'project_b_07.urls'
@@ -119,9 +118,13 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Both load the session user together with their Profile (users/backends.py)
 AUTHENTICATION_BACKENDS = (
+    "users.backends.ProfileModelBackend",
+    "users.backends.ProfileAuthenticationBackend",
+    # Kept so sessions that logged in through the stock backends stay valid
     "django.contrib.auth.backends.ModelBackend",
-    "allauth.account.auth_backends.AuthenticationBackend"
+    "allauth.account.auth_backends.AuthenticationBackend",
 )
 
 SOCIALACCOUNT_LOGIN_ON_GET = True
@@ -142,8 +145,83 @@ AWS_DEFAULT_ACL = None
 AWS_S3_ADDRESSING_STYLE = "virtual"
 AWS_QUERYSTRING_AUTH = False
 
+# Shared boto3 client used by the views (see project_b_07/storage.py)
+S3_MAX_POOL_CONNECTIONS = int(os.getenv('S3_MAX_POOL_CONNECTIONS', '32'))
+S3_MAX_ATTEMPTS = int(os.getenv('S3_MAX_ATTEMPTS', '5'))
+S3_CONNECT_TIMEOUT = int(os.getenv('S3_CONNECT_TIMEOUT', '5'))  # Seconds
+S3_READ_TIMEOUT = int(os.getenv('S3_READ_TIMEOUT', '60'))  # Seconds
+
 MEDIA_URL = f'https://{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/'
 
+# How serve_file delivers team files: 'redirect' sends the browser to a presigned S3 URL,
+# 'proxy' streams the object through the web worker
+FILE_SERVE_MODE = os.getenv('FILE_SERVE_MODE', 'redirect')
+FILE_PRESIGNED_URL_EXPIRY = int(os.getenv('FILE_PRESIGNED_URL_EXPIRY', '300'))  # Seconds
+
+# Local disk cache for files served in proxy mode; disabled when FILE_CACHE_DIR is empty
+FILE_CACHE_DIR = os.getenv('FILE_CACHE_DIR', '')
+FILE_CACHE_MAX_BYTES = int(os.getenv('FILE_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+FILE_CACHE_MAX_OBJECT_BYTES = int(os.getenv('FILE_CACHE_MAX_OBJECT_BYTES', str(64 * 1024 * 1024)))
+
+# Direct-to-S3 browser uploads (the bucket needs a CORS rule allowing POST from the site)
+DIRECT_UPLOAD_MAX_BYTES = int(os.getenv('DIRECT_UPLOAD_MAX_BYTES', str(100 * 1024 * 1024)))
+DIRECT_UPLOAD_EXPIRY = int(os.getenv('DIRECT_UPLOAD_EXPIRY', '600'))  # Seconds
+ALLOWED_UPLOAD_CONTENT_TYPES = ['application/pdf', 'image/jpeg', 'text/plain']
+
+# Server-side uploads are streamed to S3 in parts; memory per upload is roughly chunksize * concurrency
+S3_MULTIPART_THRESHOLD = int(os.getenv('S3_MULTIPART_THRESHOLD', str(8 * 1024 * 1024)))
+S3_MULTIPART_CHUNKSIZE = int(os.getenv('S3_MULTIPART_CHUNKSIZE', str(8 * 1024 * 1024)))
+S3_UPLOAD_MAX_CONCURRENCY = int(os.getenv('S3_UPLOAD_MAX_CONCURRENCY', '4'))
+
+# Previews and text extraction run as queued jobs (see project_b_07/previews.py); inline renders them in the request
+PREVIEW_INLINE = os.getenv('PREVIEW_INLINE', 'False') == 'True'
+PREVIEW_MAX_SOURCE_BYTES = int(os.getenv('PREVIEW_MAX_SOURCE_BYTES', str(50 * 1024 * 1024)))
+
+# Database-backed job queue (see project_b_07/jobs.py), processed by `manage.py run_jobs`
+JOB_WORKER_CONCURRENCY = int(os.getenv('JOB_WORKER_CONCURRENCY', '4'))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '1'))  # Seconds
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '5'))
+JOB_RETRY_BACKOFF = int(os.getenv('JOB_RETRY_BACKOFF', '10'))  # Seconds before the first retry, doubled each time
+JOB_RETRY_MAX_BACKOFF = int(os.getenv('JOB_RETRY_MAX_BACKOFF', '3600'))  # Seconds
+JOB_TIMEOUT = int(os.getenv('JOB_TIMEOUT', '900'))  # Seconds a job may run before it is assumed lost
+JOB_RETENTION = int(os.getenv('JOB_RETENTION', str(7 * 24 * 3600)))  # Seconds completed jobs are kept
+
+# Background team deletion removes children in batches, re-queuing itself after each slice
+TEAM_DELETE_BATCH_SIZE = int(os.getenv('TEAM_DELETE_BATCH_SIZE', '500'))
+TEAM_DELETE_BATCHES_PER_JOB = int(os.getenv('TEAM_DELETE_BATCHES_PER_JOB', '20'))
+# Keys per DeleteObjects request when purging released S3 objects (S3 allows at most 1000)
+S3_DELETE_BATCH_SIZE = int(os.getenv('S3_DELETE_BATCH_SIZE', '1000'))
+
+# Bulk uploads (several files or one zip archive); transfers run BULK_UPLOAD_CONCURRENCY at a time
+BULK_UPLOAD_MAX_FILES = int(os.getenv('BULK_UPLOAD_MAX_FILES', '500'))
+BULK_UPLOAD_MAX_BYTES = int(os.getenv('BULK_UPLOAD_MAX_BYTES', str(2 * 1024 * 1024 * 1024)))  # Uncompressed total
+BULK_UPLOAD_CONCURRENCY = int(os.getenv('BULK_UPLOAD_CONCURRENCY', '8'))
+BULK_UPLOAD_SPOOL_BYTES = int(os.getenv('BULK_UPLOAD_SPOOL_BYTES', str(1024 * 1024)))  # Zip entries larger than this spill to disk
+DATA_UPLOAD_MAX_NUMBER_FILES = BULK_UPLOAD_MAX_FILES
+
+# Text search configuration for the PostgreSQL full-text index over team files (see project_b_07/search.py)
+SEARCH_CONFIG = 'english'
+# Text extracted from .txt and .pdf files for search (see project_b_07/extraction.py), in the preview worker pool
+EXTRACT_MAX_SOURCE_BYTES = int(os.getenv('EXTRACT_MAX_SOURCE_BYTES', str(50 * 1024 * 1024)))
+EXTRACT_MAX_CHARS = int(os.getenv('EXTRACT_MAX_CHARS', str(500 * 1000)))  # Longer text is cut; a tsvector is limited to 1 MB
+EXTRACT_CHUNK_CHARS = int(os.getenv('EXTRACT_CHUNK_CHARS', '2000'))
+# Search across all of a user's teams (see project_b_07/global_search.py)
+SEARCH_PAGE_SIZE = int(os.getenv('SEARCH_PAGE_SIZE', '20'))
+SEARCH_MAX_PAGES = int(os.getenv('SEARCH_MAX_PAGES', '25'))
+SEARCH_TIME_BUDGET = float(os.getenv('SEARCH_TIME_BUDGET', '2'))  # Seconds before the search query is abandoned
+
+# Users' team memberships are cached across requests (see project_b_07/access.py); entries are versioned, not deleted
+TEAM_ACCESS_CACHE_TIMEOUT = int(os.getenv('TEAM_ACCESS_CACHE_TIMEOUT', '300'))  # Seconds
+
+# Public team directory pages are cached until a team changes (see project_b_07/public_teams.py)
+PUBLIC_TEAMS_CACHE_TIMEOUT = int(os.getenv('PUBLIC_TEAMS_CACHE_TIMEOUT', '300'))  # Seconds
+PUBLIC_TEAMS_MAX_AGE = int(os.getenv('PUBLIC_TEAMS_MAX_AGE', '60'))  # Seconds shared caches and browsers may reuse a page
+
+# Team chat push
+# The in-memory bus only reaches clients connected to the same process, so the chat
+# stream needs a single-process ASGI server (or a shared backend) to be useful.
+CHAT_BUS_BACKEND = os.getenv('CHAT_BUS_BACKEND', 'project_b_07.chat_bus.InMemoryChatBus')
+
 SESSION_COOKIE_SECURE = False
 CSRF_COOKIE_SECURE = False
 SECURE_SSL_REDIRECT = False
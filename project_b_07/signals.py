@@ -0,0 +1,104 @@
+# signals.py
+from functools import partial
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from .access import invalidate_access
+from .blobs import queue_object_deletes, release_blob
+from .extraction import schedule_extraction
+from .previews import preview_key, schedule_preview
+from .public_teams import invalidate_public_teams
+from .search import index_files, index_postings, remove_from_index, remove_postings
+from .tags import sync_tags, untag_files
+from roadmap.models import Milestone
+from .models import Team, TeamChatMessage, TeamFile, TeamMembership
+
+
+@receiver(post_delete, sender=TeamFile)
+def release_team_file_blob(sender, instance, **kwargs):
+    # Drop the file's reference on its shared content so the last one removes the S3 object
+    if instance.blob_id:
+        release_blob(instance.blob_id)
+    elif instance.file.name:
+        # Files stored before deduplication (and direct uploads) own their key
+        queue_object_deletes([instance.file.name, preview_key(instance.file.name)])
+
+
+@receiver(post_save, sender=TeamFile)
+def queue_team_file_preview(sender, instance, created, **kwargs):
+    # Build the preview once the row is committed, so the worker's result has a row to update
+    if created:
+        transaction.on_commit(partial(schedule_preview, instance.id))
+
+
+@receiver(post_save, sender=TeamFile)
+def index_team_file(sender, instance, **kwargs):
+    # Keep the search index in step with the title, keywords and description
+    index_files([instance])
+
+
+@receiver(post_save, sender=TeamFile)
+def tag_team_file(sender, instance, **kwargs):
+    # Keep the tags and their counters in step with the keywords
+    sync_tags([instance])
+
+
+@receiver(post_save, sender=TeamFile)
+def queue_team_file_extraction(sender, instance, created, **kwargs):
+    # Extract the text for search once the row is committed, like the preview
+    if created:
+        transaction.on_commit(partial(schedule_extraction, instance.id))
+
+
+@receiver(pre_delete, sender=TeamFile)
+def unindex_team_file(sender, instance, **kwargs):
+    # Before the postings cascade away, so the team's term statistics can be updated
+    remove_from_index([instance])
+
+
+@receiver(pre_delete, sender=TeamFile)
+def untag_team_file(sender, instance, **kwargs):
+    # Before the tag links cascade away, so the tag counters can be decremented
+    untag_files([instance])
+
+
+@receiver(post_save, sender=TeamChatMessage)
+def index_chat_message(sender, instance, **kwargs):
+    # Messages are only removed with their team, whose postings cascade; a post_delete
+    # receiver would stop team deletion from deleting messages without loading them
+    index_postings('message', [instance])
+
+
+@receiver(post_save, sender=Milestone)
+def index_milestone(sender, instance, **kwargs):
+    index_postings('milestone', [instance])
+
+
+@receiver(post_delete, sender=Milestone)
+def unindex_milestone(sender, instance, **kwargs):
+    remove_postings('milestone', [instance.pk])
+
+
+@receiver(post_save, sender=TeamMembership)
+@receiver(post_delete, sender=TeamMembership)
+def invalidate_member_access(sender, instance, **kwargs):
+    # The member's cached team access no longer matches their memberships
+    invalidate_access(instance.user_id)
+
+
+@receiver(post_save, sender=Team)
+@receiver(post_delete, sender=Team)
+def invalidate_public_team_pages(sender, instance, **kwargs):
+    # Once committed, so a page rendered meanwhile is not cached under the new version
+    transaction.on_commit(invalidate_public_teams)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_public_pages_of_creator(sender, instance, created, update_fields=None, **kwargs):
+    # The directory shows each team's creator by name; saves that cannot rename (e.g., the
+    # last_login update at login) are skipped before looking for the user's teams
+    if created or (update_fields is not None and not {'first_name', 'last_name'} & set(update_fields)):
+        return
+    if Team.all_objects.filter(created_by=instance).exists():
+        transaction.on_commit(invalidate_public_teams)
@@ -0,0 +1,81 @@
+"""
+Process-wide S3 client shared by every view.
+
+boto3 clients are thread-safe, so one client (and its urllib3 connection pool) is
+built lazily per process and reused. Requests then skip credential resolution and
+endpoint setup, and reuse warm keep-alive connections instead of new TLS handshakes.
+Tests swap in a local stand-in with ``use_s3_client``.
+"""
+
+import threading
+from contextlib import contextmanager
+
+import boto3
+from botocore.config import Config
+from django.conf import settings
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def build_s3_client():
+    """
+    Create a new S3 client tuned for a long-running web process.
+    """
+    config = Config(
+        max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+        retries={'max_attempts': settings.S3_MAX_ATTEMPTS, 'mode': 'standard'},
+        tcp_keepalive=True,
+        connect_timeout=settings.S3_CONNECT_TIMEOUT,
+        read_timeout=settings.S3_READ_TIMEOUT,
+    )
+    # Sessions are not thread-safe, so each client gets its own
+    session = boto3.session.Session(
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        region_name=settings.AWS_S3_REGION_NAME,
+    )
+    return session.client('s3', config=config)
+
+
+def get_s3_client():
+    """
+    Return the shared S3 client, building it on first use.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = build_s3_client()
+    return _client
+
+
+def set_s3_client(client):
+    """
+    Replace the shared client, e.g. with a local S3 stand-in. Pass ``None`` to rebuild lazily.
+    """
+    global _client
+    with _client_lock:
+        _client = client
+
+
+def is_missing_object(error):
+    """
+    Whether a botocore ClientError says the requested object does not exist.
+    """
+    return error.response.get('ResponseMetadata', {}).get('HTTPStatusCode') == 404
+
+
+@contextmanager
+def use_s3_client(client):
+    """
+    Temporarily route all S3 access through ``client``.
+    """
+    global _client
+    with _client_lock:
+        previous = _client
+        _client = client
+    try:
+        yield client
+    finally:
+        set_s3_client(previous)
@@ -0,0 +1,127 @@
+"""
+Keyword tags of team files.
+
+``TeamFile.keywords`` stays the text users edit. It is split on commas into Tag rows,
+one per team and normalised name, linked to the files through ``TeamFile.tags``.
+Every Tag keeps ``file_count`` up to date as files gain and lose it, so the facets on
+the team page and the autocomplete read counters instead of counting rows.
+"""
+
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import F
+
+from .models import Tag, TeamFile
+from .search import prefix_q
+
+MAX_TAG_LENGTH = 64
+FACET_LIMIT = 30
+AUTOCOMPLETE_LIMIT = 10
+
+FileTag = TeamFile.tags.through
+
+
+def normalize_tag(name):
+    return ' '.join(name.split()).lower()[:MAX_TAG_LENGTH]
+
+
+def parse_keywords(keywords):
+    """
+    The distinct tag names of a keywords string, in order.
+    """
+    names = (normalize_tag(part) for part in (keywords or '').split(','))
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def _tag_ids(pairs):
+    """
+    Ids of the tags for ``(team_id, name)`` pairs, creating the missing ones.
+    """
+    names = defaultdict(set)
+    for team_id, name in pairs:
+        names[team_id].add(name)
+    ids = {}
+    for team_id, team_names in names.items():
+        existing = Tag.objects.filter(team_id=team_id, name__in=team_names)
+        ids.update(((team_id, name), pk) for pk, name in existing.values_list('pk', 'name'))
+        missing = [name for name in team_names if (team_id, name) not in ids]
+        if missing:
+            # Conflicts are tags created concurrently; they are read back below
+            Tag.objects.bulk_create([Tag(team_id=team_id, name=name) for name in missing], ignore_conflicts=True)
+            created = Tag.objects.filter(team_id=team_id, name__in=missing)
+            ids.update(((team_id, name), pk) for pk, name in created.values_list('pk', 'name'))
+    return ids
+
+
+def _adjust_counts(deltas):
+    """
+    Apply ``{tag_id: change}`` to the file counters, with one UPDATE per distinct change.
+    """
+    by_delta = defaultdict(list)
+    for tag_id, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(tag_id)
+    for delta, tag_ids in by_delta.items():
+        Tag.objects.filter(pk__in=tag_ids).update(file_count=F('file_count') + delta)
+
+
+def sync_tags(team_files):
+    """
+    Link the files to the tags of their keywords and update the counters of the tags they gained or lost.
+    """
+    team_files = list(team_files)
+    if not team_files:
+        return
+    wanted_names = {team_file.pk: parse_keywords(team_file.keywords) for team_file in team_files}
+    with transaction.atomic():
+        tag_ids = _tag_ids({
+            (team_file.team_id, name) for team_file in team_files for name in wanted_names[team_file.pk]
+        })
+        current = defaultdict(set)
+        links = FileTag.objects.filter(teamfile_id__in=wanted_names).values_list('teamfile_id', 'tag_id')
+        for file_id, tag_id in links:
+            current[file_id].add(tag_id)
+
+        added = []
+        deltas = Counter()
+        for team_file in team_files:
+            wanted = {tag_ids[(team_file.team_id, name)] for name in wanted_names[team_file.pk]}
+            removed = current[team_file.pk] - wanted
+            if removed:
+                FileTag.objects.filter(teamfile_id=team_file.pk, tag_id__in=removed).delete()
+            for tag_id in removed:
+                deltas[tag_id] -= 1
+            for tag_id in wanted - current[team_file.pk]:
+                added.append(FileTag(teamfile_id=team_file.pk, tag_id=tag_id))
+                deltas[tag_id] += 1
+        FileTag.objects.bulk_create(added)
+        _adjust_counts(deltas)
+
+
+def untag_files(team_files):
+    """
+    Decrement the counters of the tags of files about to be deleted; their links cascade.
+    """
+    links = FileTag.objects.filter(teamfile_id__in=[team_file.pk for team_file in team_files])
+    deltas = Counter()
+    for tag_id in links.values_list('tag_id', flat=True):
+        deltas[tag_id] -= 1
+    _adjust_counts(deltas)
+
+
+def team_facets(team, limit=FACET_LIMIT):
+    """
+    The team's most used tags, with their file counts.
+    """
+    return team.tags.filter(file_count__gt=0).order_by('-file_count', 'name')[:limit]
+
+
+def autocomplete_tags(team, prefix, limit=AUTOCOMPLETE_LIMIT):
+    """
+    The team's tags starting with ``prefix``, most used first.
+    """
+    prefix = normalize_tag(prefix)
+    if not prefix:
+        return team.tags.none()
+    return team.tags.filter(prefix_q(prefix, 'name'), file_count__gt=0).order_by('-file_count', 'name')[:limit]
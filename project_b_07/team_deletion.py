@@ -0,0 +1,98 @@
+"""
+Background deletion of teams.
+
+Deleting a team in one ``team.delete()`` cascades through every membership, file,
+chat message, availability and milestone in a single transaction. Instead, the
+team is marked with ``deleting_at``, which hides it through ``Team.objects``
+straight away. A job then removes its children a batch at a time, each batch in its
+own short transaction that also records progress on the TeamDeletion row. If a
+worker crashes, the job is retried and carries on with whatever is left.
+
+S3 objects of deleted files are handed to the batched purge in ``blobs``.
+"""
+
+import logging
+
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
+
+from .jobs import enqueue
+from .models import Team, TeamDeletion
+from .public_teams import invalidate_public_teams
+
+logger = logging.getLogger(__name__)
+
+
+def request_team_deletion(team, user):
+    """
+    Hide ``team`` and queue the removal of its data. Returns the TeamDeletion tracking it.
+    """
+    with transaction.atomic():
+        Team.all_objects.filter(pk=team.pk).update(deleting_at=timezone.now())
+        deletion = TeamDeletion.objects.create(team_id=team.pk, team_name=team.name, requested_by=user)
+        enqueue(delete_team_batches, deletion_id=deletion.id)
+        # The update above sends no signal; the team leaves the public directory now
+        transaction.on_commit(invalidate_public_teams)
+    return deletion
+
+
+def _child_relations():
+    """
+    Reverse relations removed before the team row, e.g. ``(TeamFile, 'team')``.
+    Only cascading relations are included; bookkeeping rows such as TeamDeletion stay.
+    """
+    return [
+        (relation.related_model, relation.field.name)
+        for relation in Team._meta.related_objects
+        if relation.on_delete is models.CASCADE and not relation.many_to_many
+    ]
+
+
+def _delete_batch(deletion_id, model, field_name, team_id):
+    """
+    Delete up to ``TEAM_DELETE_BATCH_SIZE`` rows of ``model`` belonging to the team and
+    record them in the deletion's progress. Returns the number of rows of ``model`` removed.
+    """
+    ids = list(
+        model._base_manager.filter(**{field_name: team_id}).order_by('pk')
+        .values_list('pk', flat=True)[:settings.TEAM_DELETE_BATCH_SIZE]
+    )
+    if not ids:
+        return 0
+    label = model._meta.label
+    with transaction.atomic():
+        deletion = TeamDeletion.objects.select_for_update().get(pk=deletion_id)
+        # Goes through the ORM, so nested cascades and post_delete signals (S3 cleanup) still run
+        _, per_model = model._base_manager.filter(pk__in=ids).delete()
+        for deleted_label, count in per_model.items():
+            deletion.progress[deleted_label] = deletion.progress.get(deleted_label, 0) + count
+        deletion.save(update_fields=['progress'])
+    return per_model.get(label, 0)
+
+
+def delete_team_batches(deletion_id):
+    """
+    Background job: remove up to ``TEAM_DELETE_BATCHES_PER_JOB`` batches of the team's
+    children, then queue itself again, so no single job holds a worker for long.
+    The team row goes last, once nothing refers to it.
+    """
+    deletion = TeamDeletion.objects.filter(pk=deletion_id, status='running').first()
+    if deletion is None:
+        return
+
+    batches = 0
+    for model, field_name in _child_relations():
+        while batches < settings.TEAM_DELETE_BATCHES_PER_JOB:
+            if not _delete_batch(deletion.pk, model, field_name, deletion.team_id):
+                break
+            batches += 1
+        if batches >= settings.TEAM_DELETE_BATCHES_PER_JOB:
+            enqueue(delete_team_batches, deletion_id=deletion.pk)
+            return
+
+    with transaction.atomic():
+        Team.all_objects.filter(pk=deletion.team_id).delete()
+        TeamDeletion.objects.filter(pk=deletion.pk).update(status='done', finished_at=timezone.now())
+    deletion.refresh_from_db()
+    logger.info("Deleted team %s (%s): %s", deletion.team_id, deletion.team_name, deletion.progress)
@@ -0,0 +1,174 @@
+"""
+In-memory stand-in for the parts of the boto3 S3 client the views use.
+"""
+
+import hashlib
+import io
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+from botocore.exceptions import ClientError
+
+
+class FakeS3Client:
+    """
+    Keeps objects in a dict keyed by (bucket, key) and records every call made to it.
+    """
+
+    def __init__(self):
+        self.objects = {}  # (bucket, key) -> {'Body': bytes, 'ContentType': str, 'ETag': str, 'LastModified': datetime}
+        self.calls = []
+
+    def _error(self, code, operation, status=404):
+        return ClientError(
+            {'Error': {'Code': code, 'Message': code}, 'ResponseMetadata': {'HTTPStatusCode': status}}, operation
+        )
+
+    def _store(self, bucket, key, body, content_type):
+        self.objects[(bucket, key)] = {
+            'Body': bytes(body),
+            'ContentType': content_type,
+            'ETag': f'"{hashlib.md5(body).hexdigest()}"',
+            'LastModified': datetime.now(timezone.utc).replace(microsecond=0),
+        }
+
+    def _get(self, bucket, key, operation):
+        try:
+            return self.objects[(bucket, key)]
+        except KeyError:
+            raise self._error('NoSuchKey', operation)
+
+    def put_object(self, Bucket, Key, Body, ContentType='binary/octet-stream', **kwargs):
+        self.calls.append(('put_object', Key))
+        if hasattr(Body, 'read'):
+            Body = Body.read()
+        self._store(Bucket, Key, bytes(Body), ContentType)
+        return {'ETag': self.objects[(Bucket, Key)]['ETag']}
+
+    def get_object(self, Bucket, Key, IfNoneMatch=None, IfMatch=None, Range=None, **kwargs):
+        self.calls.append(('get_object', Key, Range) if Range else ('get_object', Key))
+        obj = self._get(Bucket, Key, 'GetObject')
+        if IfNoneMatch is not None and IfNoneMatch == obj['ETag']:
+            raise self._error('304', 'GetObject', status=304)
+        if IfMatch is not None and IfMatch != obj['ETag']:
+            raise self._error('PreconditionFailed', 'GetObject', status=412)
+        body = obj['Body']
+        response = {'ContentType': obj['ContentType'], 'ETag': obj['ETag'], 'LastModified': obj['LastModified']}
+        if Range:
+            # Only the single "bytes=start-end" form the views send is supported
+            start, end = (int(value) for value in Range[len('bytes='):].split('-'))
+            response['ContentRange'] = f"bytes {start}-{end}/{len(body)}"
+            body = body[start:end + 1]
+        response['Body'] = io.BytesIO(body)
+        response['ContentLength'] = len(body)
+        return response
+
+    def head_object(self, Bucket, Key, **kwargs):
+        self.calls.append(('head_object', Key))
+        obj = self._get(Bucket, Key, 'HeadObject')
+        return {
+            'ContentType': obj['ContentType'],
+            'ContentLength': len(obj['Body']),
+            'ETag': obj['ETag'],
+            'LastModified': obj['LastModified'],
+        }
+
+    def generate_presigned_url(self, ClientMethod, Params, ExpiresIn=3600, **kwargs):
+        self.calls.append(('generate_presigned_url', Params['Key']))
+        query = {name: value for name, value in Params.items() if name not in ('Bucket', 'Key')}
+        query['Expires'] = ExpiresIn
+        return f"https://{Params['Bucket']}.s3.test/{Params['Key']}?{urlencode(query)}"
+
+    def generate_presigned_post(self, Bucket, Key, Fields=None, Conditions=None, ExpiresIn=3600):
+        self.calls.append(('generate_presigned_post', Key))
+        fields = dict(Fields or {}, key=Key, policy='test-policy')
+        return {'url': f"https://{Bucket}.s3.test/", 'fields': fields, 'conditions': Conditions}
+
+    def list_objects_v2(self, Bucket, Prefix='', StartAfter='', MaxKeys=1000, ContinuationToken=None, **kwargs):
+        self.calls.append(('list_objects_v2', ContinuationToken or StartAfter))
+        # Keys are listed in UTF-8 byte order, like S3
+        keys = sorted(
+            (key for bucket, key in self.objects if bucket == Bucket and key.startswith(Prefix)),
+            key=lambda key: key.encode(),
+        )
+        after = ContinuationToken or StartAfter
+        keys = [key for key in keys if key.encode() > after.encode()]
+        page = keys[:MaxKeys]
+        response = {
+            'Contents': [
+                {'Key': key, 'Size': len(self.objects[(Bucket, key)]['Body']), 'LastModified': self.objects[(Bucket, key)]['LastModified']}
+                for key in page
+            ],
+            'KeyCount': len(page),
+            'IsTruncated': len(keys) > MaxKeys,
+        }
+        if response['IsTruncated']:
+            response['NextContinuationToken'] = page[-1]
+        return response
+
+    def get_paginator(self, operation_name):
+        assert operation_name == 'list_objects_v2'
+        return FakeListObjectsPaginator(self)
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None, Callback=None, Config=None):
+        self.calls.append(('upload_fileobj', Key))
+        chunk_size = Config.multipart_chunksize if Config else 8 * 1024 * 1024
+        body = b''
+        while True:
+            chunk = Fileobj.read(chunk_size)
+            if not chunk:
+                break
+            body += chunk
+            if Callback:
+                Callback(len(chunk))
+        content_type = (ExtraArgs or {}).get('ContentType', 'binary/octet-stream')
+        self._store(Bucket, Key, body, content_type)
+
+    def delete_object(self, Bucket, Key, **kwargs):
+        self.calls.append(('delete_object', Key))
+        self.objects.pop((Bucket, Key), None)
+        return {}
+
+    def delete_objects(self, Bucket, Delete, **kwargs):
+        keys = [obj['Key'] for obj in Delete['Objects']]
+        self.calls.append(('delete_objects', tuple(keys)))
+        if len(keys) > 1000:
+            raise self._error('MalformedXML', 'DeleteObjects', status=400)
+        for key in keys:
+            self.objects.pop((Bucket, key), None)
+        return {} if Delete.get('Quiet') else {'Deleted': [{'Key': key} for key in keys]}
+
+
+class FlakyS3Client(FakeS3Client):
+    """
+    A FakeS3Client whose first ``failures`` reads fail as if S3 were briefly unavailable.
+    """
+
+    def __init__(self, failures=1):
+        super().__init__()
+        self.failures = failures
+
+    def get_object(self, Bucket, Key, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            raise self._error('SlowDown', 'GetObject', status=503)
+        return super().get_object(Bucket, Key, **kwargs)
+
+
+class FakeListObjectsPaginator:
+    """
+    Stand-in for boto3's ListObjectsV2 paginator.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def paginate(self, PaginationConfig=None, **kwargs):
+        page_size = (PaginationConfig or {}).get('PageSize', 1000)
+        token = None
+        while True:
+            page = self.client.list_objects_v2(MaxKeys=page_size, ContinuationToken=token, **kwargs)
+            yield page
+            if not page['IsTruncated']:
+                return
+            token = page['NextContinuationToken']
@@ -0,0 +1,93 @@
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from project_b_07.access import get_access, invalidate_access, load_access
+from project_b_07.models import Team, TeamMembership
+from users.models import Profile
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+
+class TeamAccessTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password")
+        self.owner = User.objects.create_user(username="owner", password="password")
+        self.own = Team.objects.create(name="Own Team", created_by=self.user)
+        self.joined = Team.objects.create(name="Joined Team", created_by=self.owner)
+        self.pending = Team.objects.create(name="Pending Team", created_by=self.owner)
+        TeamMembership.objects.create(user=self.user, team=self.joined, status='accepted')
+        TeamMembership.objects.create(user=self.user, team=self.pending, status='pending')
+        self.user.refresh_from_db()
+        self.addCleanup(cache.clear)
+
+    def fresh_access(self):
+        return load_access(User.objects.select_related('profile').get(pk=self.user.pk))
+
+    def test_permissions(self):
+        access = self.fresh_access()
+        self.assertTrue(access.is_owner(self.own))
+        self.assertTrue(access.can_contribute(self.own))
+        self.assertTrue(access.can_view(self.joined))
+        self.assertFalse(access.can_manage(self.joined))
+        self.assertEqual(access.status(self.pending), 'pending')
+        self.assertFalse(access.can_view(self.pending))
+        self.assertEqual(access.accepted_team_ids(), [self.joined.id])
+
+    def test_admins_view_and_manage_but_do_not_contribute(self):
+        self.user.profile.role = 'admin'
+        self.user.profile.save()
+        access = self.fresh_access()
+        self.assertTrue(access.can_view(self.pending))
+        self.assertTrue(access.can_manage(self.pending))
+        self.assertFalse(access.can_contribute(self.pending))
+
+    def test_memberships_are_resolved_once_per_request(self):
+        request = RequestFactory().get('/')
+        request.user = User.objects.select_related('profile').get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            for team in (self.own, self.joined, self.pending):
+                get_access(request).can_view(team)
+                get_access(request).status(team)
+        self.assertIs(get_access(request), get_access(request))
+
+    def test_memberships_are_cached_across_requests(self):
+        self.fresh_access().accepted_team_ids()
+        access = self.fresh_access()
+        with self.assertNumQueries(0):
+            self.assertTrue(access.can_view(self.joined))
+
+    def test_membership_changes_invalidate_the_cache(self):
+        self.fresh_access().accepted_team_ids()
+        membership = TeamMembership.objects.get(user=self.user, team=self.pending)
+        membership.status = 'accepted'
+        membership.save()
+        self.assertTrue(self.fresh_access().can_view(self.pending))
+
+        TeamMembership.objects.filter(user=self.user, team=self.joined).get().delete()
+        self.assertFalse(self.fresh_access().can_view(self.joined))
+
+    def test_profile_changes_invalidate_the_cache(self):
+        before = self.fresh_access().version
+        profile = self.user.profile
+        profile.role = 'admin'
+        profile.save(update_fields=['role'])
+        self.assertNotEqual(self.fresh_access().version, before)
+
+    def test_saving_a_stale_profile_keeps_later_bumps(self):
+        stale = Profile.objects.get(user=self.user)
+        invalidate_access(self.user.pk)
+        bumped = Profile.objects.get(user=self.user).access_version
+        stale.role = 'admin'
+        stale.save()
+        self.assertGreater(stale.access_version, bumped)
+        self.assertEqual(Profile.objects.get(user=self.user).access_version, stale.access_version)
+
+    def test_team_page_reads_the_users_memberships_from_the_cache(self):
+        self.client.login(username="testuser", password="password")
+        url = reverse('team_detail', args=[self.joined.id])
+        self.client.get(url)
+        # session, user with profile, team and the page's own four; none for the user's memberships
+        with self.assertNumQueries(7):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,113 @@
+import io
+import zipfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from project_b_07.models import FilePreview, StoredBlob, Team, TeamFile
+from project_b_07.search import search_files
+from project_b_07.storage import set_s3_client
+from project_b_07.tests.fakes import FakeS3Client
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+
+def zip_upload(entries, name='dataset.zip'):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for entry_name, data in entries:
+            archive.writestr(entry_name, data)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='application/zip')
+
+
+@override_settings(AWS_STORAGE_BUCKET_NAME='test-bucket', BULK_UPLOAD_CONCURRENCY=4, PREVIEW_INLINE=True)
+class BulkUploadViewTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password")
+        self.team = Team.objects.create(name="Test Team", created_by=self.user)
+        self.client.login(username="testuser", password="password")
+        self.s3 = FakeS3Client()
+        set_s3_client(self.s3)
+        self.addCleanup(set_s3_client, None)
+        self.url = reverse('bulk_upload_team_files', args=[self.team.id])
+
+    def post(self, files, **data):
+        return self.client.post(
+            self.url, dict(data, files=files), HTTP_ACCEPT='application/json',
+        )
+
+    def test_multiple_files_share_batch_metadata(self):
+        files = [SimpleUploadedFile(f'notes-{n}.txt', f'note {n}'.encode(), content_type='text/plain') for n in range(3)]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post(files, description='Lab notes', keywords='lab')
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual(body['created'], 3)
+        self.assertEqual([result['name'] for result in body['results']], ['notes-0.txt', 'notes-1.txt', 'notes-2.txt'])
+
+        team_files = TeamFile.objects.filter(team=self.team).order_by('id')
+        self.assertEqual([f.title for f in team_files], ['notes-0.txt', 'notes-1.txt', 'notes-2.txt'])
+        self.assertTrue(all(f.description == 'Lab notes' and f.keywords == 'lab' for f in team_files))
+        self.assertEqual(len([call for call in self.s3.calls if call[0] == 'upload_fileobj']), 3)
+        # Rows made by bulk_create still get previews
+        self.assertEqual(FilePreview.objects.filter(status='ready').count(), 3)
+        # ...and are in the search index
+        self.assertEqual(search_files(TeamFile.objects.all(), 'lab notes').count(), 3)
+
+    def test_zip_entries_are_extracted_and_deduplicated(self):
+        upload = zip_upload([
+            ('data/a.txt', b'same bytes'),
+            ('data/copy-of-a.txt', b'same bytes'),
+            ('data/report.pdf', b'%PDF-1.4 report'),
+            ('data/script.exe', b'MZ'),
+            ('__MACOSX/data/._a.txt', b'resource fork'),
+            ('data/', b''),
+        ])
+        response = self.post([upload])
+        results = response.json()['results']
+        self.assertEqual(
+            [(result['name'], result['status']) for result in results],
+            [('data/a.txt', 'created'), ('data/copy-of-a.txt', 'created'), ('data/report.pdf', 'created'), ('data/script.exe', 'error')],
+        )
+        # Two distinct contents: one upload each, one blob referenced twice
+        self.assertEqual(len([call for call in self.s3.calls if call[0] == 'upload_fileobj']), 2)
+        shared = StoredBlob.objects.get(content_type='text/plain')
+        self.assertEqual(shared.ref_count, 2)
+        self.assertEqual(TeamFile.objects.get(title='report.pdf').get_content_type(), 'application/pdf')
+
+    def test_known_content_reuses_stored_blob(self):
+        self.post([SimpleUploadedFile('a.txt', b'hello', content_type='text/plain')])
+        self.post([SimpleUploadedFile('b.txt', b'hello', content_type='text/plain')])
+        self.assertEqual(len([call for call in self.s3.calls if call[0] == 'upload_fileobj']), 1)
+        self.assertEqual(StoredBlob.objects.get().ref_count, 2)
+
+    @override_settings(BULK_UPLOAD_MAX_BYTES=10)
+    def test_archive_over_the_size_limit_is_rejected(self):
+        response = self.post([zip_upload([('big.txt', b'x' * 100)])])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('larger than the allowed', response.json()['error'])
+        self.assertFalse(TeamFile.objects.exists())
+
+    @override_settings(BULK_UPLOAD_MAX_FILES=2)
+    def test_too_many_files_are_rejected(self):
+        response = self.post([zip_upload([(f'{n}.txt', b'x') for n in range(3)])])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(TeamFile.objects.exists())
+
+    def test_corrupt_archive_is_rejected(self):
+        response = self.post([SimpleUploadedFile('broken.zip', b'not a zip', content_type='application/zip')])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('could not be read', response.json()['error'])
+
+    def test_non_members_cannot_upload(self):
+        User.objects.create_user(username="outsider", password="password")
+        self.client.login(username="outsider", password="password")
+        response = self.post([SimpleUploadedFile('a.txt', b'hello', content_type='text/plain')])
+        self.assertEqual(response.status_code, 403)
+
+    def test_form_page_renders_results(self):
+        response = self.client.post(self.url, {'files': [SimpleUploadedFile('a.txt', b'hello', content_type='text/plain')]})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'bulk_upload_team_files.html')
+        self.assertContains(response, 'Uploaded')
@@ -0,0 +1,104 @@
+import asyncio
+import threading
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.urls import reverse
+from project_b_07.chat_bus import InMemoryChatBus, get_chat_bus
+from project_b_07.models import Team, TeamChatMessage
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+
+class InMemoryChatBusTest(TestCase):
+    def test_publish_reaches_subscribers_of_the_team_only(self):
+        bus = InMemoryChatBus()
+
+        async def scenario():
+            subscription = bus.subscribe(1)
+            other = bus.subscribe(2)
+            # Publish from another thread, the way a sync view would
+            thread = threading.Thread(target=bus.publish, args=(1, {'id': 7}))
+            thread.start()
+            thread.join()
+            message = await asyncio.wait_for(subscription.get(), 1)
+            self.assertTrue(other.queue.empty())
+            subscription.close()
+            other.close()
+            return message
+
+        self.assertEqual(asyncio.run(scenario()), {'id': 7})
+        self.assertEqual(bus.subscriber_count(1), 0)
+
+    def test_slow_subscriber_drops_oldest_messages(self):
+        bus = InMemoryChatBus(queue_size=2)
+
+        async def scenario():
+            subscription = bus.subscribe(1)
+            for message_id in range(3):
+                bus.publish(1, {'id': message_id})
+            await asyncio.sleep(0)  # Let the loop run the scheduled deliveries
+            received = [subscription.queue.get_nowait() for _ in range(subscription.queue.qsize())]
+            subscription.close()
+            return received
+
+        self.assertEqual(asyncio.run(scenario()), [{'id': 1}, {'id': 2}])
+
+
+class TeamChatStreamTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password")
+        self.team = Team.objects.create(name="Test Team", created_by=self.user)
+        self.client.login(username="testuser", password="password")
+
+    def test_post_publishes_to_team_channel(self):
+        published = []
+        bus = get_chat_bus()
+        original_publish = bus.publish
+        bus.publish = lambda team_id, message: published.append((team_id, message))
+        try:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(
+                    reverse('post_chat_message', args=[self.team.id]),
+                    data={'message': 'hello'},
+                    content_type='application/json',
+                )
+        finally:
+            bus.publish = original_publish
+        self.assertEqual(len(published), 1)
+        self.assertEqual(published[0][0], self.team.id)
+        self.assertEqual(published[0][1]['content'], 'hello')
+
+    def test_stream_is_not_served_over_wsgi(self):
+        response = self.client.get(reverse('team_chat_stream', args=[self.team.id]))
+        self.assertEqual(response.status_code, 204)
+
+    async def test_stream_sends_missed_and_published_messages(self):
+        await self.async_client.aforce_login(self.user)
+        message = await TeamChatMessage.objects.acreate(team=self.team, user=self.user, message="earlier")
+        response = await self.async_client.get(reverse('team_chat_stream', args=[self.team.id]))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b'retry: 5000\n\n')
+        self.assertIn(f'id: {message.id}\n'.encode(), await anext(stream))
+
+        # The stream subscribed before sending its first chunk
+        get_chat_bus().publish(self.team.id, {'id': message.id + 1, 'content': 'live'})
+        self.assertIn(b'"live"', await asyncio.wait_for(anext(stream), 1))
+        await stream.aclose()
+
+    async def test_stream_replays_every_missed_message_past_the_page_limit(self):
+        await self.async_client.aforce_login(self.user)
+        messages = [
+            await TeamChatMessage.objects.acreate(team=self.team, user=self.user, message=f"missed {i}")
+            for i in range(5)
+        ]
+        with patch('project_b_07.views.CHAT_UPDATES_LIMIT', 2):
+            response = await self.async_client.get(reverse('team_chat_stream', args=[self.team.id]))
+            stream = aiter(response.streaming_content)
+            self.assertEqual(await anext(stream), b'retry: 5000\n\n')
+            for message in messages:
+                self.assertIn(f'id: {message.id}\n'.encode(), await asyncio.wait_for(anext(stream), 1))
+            await stream.aclose()
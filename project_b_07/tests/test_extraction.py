@@ -0,0 +1,149 @@
+import io
+from datetime import timedelta
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from project_b_07.extraction import chunk_text, schedule_extraction
+from project_b_07.jobs import claim_job, run_job
+from project_b_07.models import FileContent, Job, Team, TeamFile, TeamSearchTerm
+from project_b_07.search import highlight, search_files
+from project_b_07.storage import set_s3_client
+from project_b_07.tests.fakes import FakeS3Client, FlakyS3Client
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+PDF = b"""%PDF-1.4
+1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj
+2 0 obj<</Type/Pages/Kids[3 0 R]/Count 1>>endobj
+3 0 obj<</Type/Page/Parent 2 0 R/MediaBox[0 0 300 144]/Contents 4 0 R/Resources<</Font<</F1 5 0 R>>>>>>endobj
+4 0 obj<</Length 55>>stream
+BT /F1 18 Tf 20 100 Td (Protein folding results) Tj ET
+endstream endobj
+5 0 obj<</Type/Font/Subtype/Type1/BaseFont/Helvetica>>endobj
+trailer<</Root 1 0 R>>
+%%EOF"""
+
+
+class ChunkTextTest(TestCase):
+    def test_chunks_are_cut_on_whitespace(self):
+        chunks = chunk_text("alpha beta gamma delta epsilon", 12)
+        self.assertEqual(chunks, ['alpha beta', 'gamma delta', 'epsilon'])
+        self.assertEqual(' '.join(chunks), "alpha beta gamma delta epsilon")
+
+    def test_highlight_escapes_and_marks_matches(self):
+        snippet = highlight("Results <b>unclear</b>; folding rates doubled", "fold")
+        self.assertEqual(snippet, "Results &lt;b&gt;unclear&lt;/b&gt;; <mark>folding</mark> rates doubled")
+
+
+@override_settings(AWS_STORAGE_BUCKET_NAME='test-bucket', PREVIEW_INLINE=True, EXTRACT_CHUNK_CHARS=40)
+class ContentExtractionTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password")
+        self.team = Team.objects.create(name="Test Team", created_by=self.user)
+        self.client.login(username="testuser", password="password")
+        self.s3 = FakeS3Client()
+        set_s3_client(self.s3)
+        self.addCleanup(set_s3_client, None)
+
+    def upload(self, name, data, content_type):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('bulk_upload_team_files', args=[self.team.id]),
+                {'files': [SimpleUploadedFile(name, data, content_type=content_type)]},
+                HTTP_ACCEPT='application/json',
+            )
+        return TeamFile.objects.latest('id')
+
+    def search(self, query):
+        return list(search_files(self.team.files.all(), query))
+
+    def test_text_content_is_chunked_and_searchable(self):
+        body = b"Day one. " + b"Nothing happened. " * 10 + b"The centrifuge failed twice."
+        team_file = self.upload('log.txt', body, 'text/plain')
+
+        content = FileContent.objects.get(team_file=team_file)
+        self.assertEqual(content.status, 'ready')
+        self.assertEqual(content.term_count, 26)
+        self.assertGreater(team_file.content_chunks.count(), 1)
+        self.assertEqual(self.search("centrifuge fail"), [team_file])
+
+        gets = len([call for call in self.s3.calls if call[0] == 'get_object'])
+        response = self.client.get(reverse('team_detail', args=[self.team.id]), {'q': 'centrifuge'})
+        self.assertContains(response, '<mark>centrifuge</mark> failed twice.', html=False)
+        # Snippets come from the stored chunks
+        self.assertEqual(len([call for call in self.s3.calls if call[0] == 'get_object']), gets)
+
+    def test_pdf_text_is_extracted(self):
+        team_file = self.upload('paper.pdf', PDF, 'application/pdf')
+        self.assertEqual(self.search("protein folding"), [team_file])
+        self.assertEqual(TeamSearchTerm.objects.get(team=self.team, term='folding').occurrences, 1)
+
+    def test_extraction_is_idempotent_on_reupload(self):
+        first = self.upload('a.txt', b'shared results', 'text/plain')
+        schedule_extraction(first.id)
+        second = self.upload('copy.txt', b'shared results', 'text/plain')
+        # Same content, same blob: the text is copied rather than fetched and extracted again
+        # (ranged reads are the previews)
+        self.assertEqual(len([call for call in self.s3.calls if call[0] == 'get_object' and len(call) == 2]), 1)
+        self.assertEqual(list(second.content_chunks.values_list('text', flat=True)), ['shared results'])
+        self.assertEqual(self.search("shared"), [second, first])
+
+    def test_team_term_statistics_follow_files(self):
+        first = self.upload('a.txt', b'enzyme enzyme kinetics', 'text/plain')
+        self.upload('b.txt', b'enzyme assay', 'text/plain')
+        stats = TeamSearchTerm.objects.get(team=self.team, term='enzyme')
+        self.assertEqual((stats.file_count, stats.occurrences), (2, 3))
+
+        first.delete()
+        stats.refresh_from_db()
+        self.assertEqual((stats.file_count, stats.occurrences), (1, 1))
+        self.assertFalse(TeamSearchTerm.objects.filter(team=self.team, term='kinetics').exists())
+
+    def test_unsupported_types_are_recorded(self):
+        team_file = self.upload('photo.jpg', b'\xff\xd8\xff', 'image/jpeg')
+        self.assertEqual(FileContent.objects.get(team_file=team_file).status, 'unsupported')
+
+    def test_extraction_runs_as_a_queued_job(self):
+        team_file = self.upload('log.txt', b"The centrifuge failed twice.", 'text/plain')
+        FileContent.objects.filter(team_file=team_file).delete()
+        with override_settings(PREVIEW_INLINE=False):
+            schedule_extraction(team_file.id)
+        self.assertEqual(FileContent.objects.get(team_file=team_file).status, 'pending')
+
+        self.assertTrue(run_job(claim_job('worker-1')))
+        self.assertEqual(FileContent.objects.get(team_file=team_file).status, 'ready')
+        self.assertEqual(self.search('centrifuge'), [team_file])
+
+    def test_storage_errors_are_retried_by_the_queue(self):
+        team_file = self.upload('log.txt', b"The centrifuge failed twice.", 'text/plain')
+        FileContent.objects.filter(team_file=team_file).delete()
+        flaky = FlakyS3Client()
+        flaky.objects = self.s3.objects
+        set_s3_client(flaky)
+        with override_settings(PREVIEW_INLINE=False):
+            schedule_extraction(team_file.id)
+        self.assertFalse(run_job(claim_job('worker-1')))
+        self.assertEqual(FileContent.objects.get(team_file=team_file).status, 'pending')
+
+        Job.objects.update(run_after=timezone.now())
+        self.assertTrue(run_job(claim_job('worker-1')))
+        self.assertEqual(FileContent.objects.get(team_file=team_file).status, 'ready')
+
+    def test_unparsable_pdfs_fail_for_good(self):
+        team_file = self.upload('paper.pdf', b'%PDF-1.4 truncated', 'application/pdf')
+        self.assertEqual(FileContent.objects.get(team_file=team_file).status, 'failed')
+
+    def test_stale_pending_extractions_are_requeued(self):
+        team_file = self.upload('log.txt', b"The centrifuge failed twice.", 'text/plain')
+        recent = self.upload('notes.txt', b"Nothing happened.", 'text/plain')
+        FileContent.objects.filter(team_file=team_file).update(
+            status='pending', updated_at=timezone.now() - timedelta(days=1)
+        )
+        FileContent.objects.filter(team_file=recent).update(status='pending')
+        with override_settings(PREVIEW_INLINE=False):
+            call_command('extract_file_text', '--retry-pending', stdout=io.StringIO())
+        self.assertEqual([job.kwargs['team_file_id'] for job in Job.objects.all()], [team_file.id])
@@ -0,0 +1,40 @@
+import io
+import os
+import tempfile
+
+from django.test import SimpleTestCase
+from project_b_07.file_cache import DiskLRUCache
+
+
+class DiskLRUCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def put(self, cache, key, size):
+        entry = cache.put(key, io.BytesIO(b'x' * size), f'"{key}"', 'text/plain')
+        entry.open().close()
+        return entry
+
+    def test_round_trip(self):
+        cache = DiskLRUCache(self.directory.name, max_bytes=100)
+        self.assertIsNone(cache.get('a.txt'))
+        self.put(cache, 'a.txt', 10)
+        entry = cache.get('a.txt')
+        self.assertEqual(entry.etag, '"a.txt"')
+        with entry.open() as handle:
+            self.assertEqual(handle.read(), b'x' * 10)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_evicts_least_recently_used_by_bytes(self):
+        cache = DiskLRUCache(self.directory.name, max_bytes=25)
+        first = self.put(cache, 'first', 10)
+        second = self.put(cache, 'second', 10)
+        # Make "first" the most recently used before the budget is exceeded
+        os.utime(second.path, (1, 1))
+        cache.get('first')
+        self.put(cache, 'third', 10)
+        self.assertIsNotNone(cache.get('first'))
+        self.assertIsNone(cache.get('second'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertEqual(cache.stats()['bytes'], 20)
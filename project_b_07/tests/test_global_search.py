@@ -0,0 +1,105 @@
+import datetime
+import io
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from project_b_07.access import load_access
+from project_b_07.global_search import global_search, time_budget
+from project_b_07.models import SearchPosting, Team, TeamChatMessage, TeamFile, TeamMembership
+from roadmap.models import Milestone
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+
+@override_settings(PREVIEW_INLINE=True)
+class GlobalSearchTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password")
+        self.owner = User.objects.create_user(username="owner", password="password")
+        self.own = Team.objects.create(name="Own Team", created_by=self.user)
+        self.joined = Team.objects.create(name="Joined Team", created_by=self.owner)
+        self.pending = Team.objects.create(name="Pending Team", created_by=self.owner)
+        self.other = Team.objects.create(name="Other Team", created_by=self.owner)
+        TeamMembership.objects.create(user=self.user, team=self.joined, status='accepted')
+        TeamMembership.objects.create(user=self.user, team=self.pending, status='pending')
+
+        self.file = TeamFile.objects.create(
+            title="Spectrometer calibration", file='cal.txt', team=self.own, uploaded_by=self.user,
+        )
+        self.message = TeamChatMessage.objects.create(
+            team=self.joined, user=self.owner, message="Who booked the spectrometer on Friday?",
+        )
+        self.milestone = Milestone.objects.create(
+            user=self.owner, team=self.joined, title="Spectrometer upgrade", end_date=datetime.date(2030, 1, 1),
+        )
+        for team in (self.pending, self.other):
+            TeamFile.objects.create(title="Spectrometer manual", file='manual.txt', team=team, uploaded_by=self.owner)
+        self.client.login(username="testuser", password="password")
+
+    def hits(self, user, query, page=1):
+        return [(result.kind, result.object.pk) for result in global_search(load_access(user), query, page).results]
+
+    def test_searches_every_accepted_team_in_one_ranked_query(self):
+        with self.assertNumQueries(5):  # memberships, the ranked query, then files, messages and milestones
+            hits = self.hits(self.user, "spectro")
+        # Title matches outrank chat messages; ties go to the kind's name
+        self.assertEqual(hits, [('file', self.file.pk), ('milestone', self.milestone.pk), ('message', self.message.pk)])
+        self.assertEqual(self.hits(self.user, "spectrometer friday"), [('message', self.message.pk)])
+        self.assertEqual(self.hits(self.user, "manual"), [])
+
+    def test_pma_admins_search_every_team(self):
+        admin = User.objects.create_user(username="admin", password="password")
+        admin.profile.role = 'admin'
+        admin.profile.save()
+        self.assertEqual(len(self.hits(admin, "manual")), 2)
+
+    def test_teams_being_deleted_are_left_out(self):
+        Team.objects.filter(pk=self.own.pk).update(deleting_at=timezone.now())
+        self.assertNotIn(('file', self.file.pk), self.hits(self.user, "spectrometer"))
+
+    @override_settings(SEARCH_PAGE_SIZE=2)
+    def test_results_are_paginated(self):
+        first = global_search(load_access(self.user), "spectrometer")
+        second = global_search(load_access(self.user), "spectrometer", page=2)
+        self.assertTrue(first.has_next)
+        self.assertFalse(second.has_next)
+        self.assertEqual(len(first.results) + len(second.results), 3)
+
+    def test_query_over_budget_times_out(self):
+        with mock.patch('project_b_07.global_search.time_budget', side_effect=OperationalError('interrupted')):
+            page = global_search(load_access(self.user), "spectrometer")
+        self.assertTrue(page.timed_out)
+        self.assertEqual(page.results, [])
+
+    def test_time_budget_interrupts_long_queries(self):
+        with self.assertRaises(OperationalError), time_budget(0), connection.cursor() as cursor:
+            cursor.execute(
+                "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 10000000) SELECT count(*) FROM n"
+            )
+
+    def test_postings_follow_edits_and_deletes(self):
+        self.milestone.title = "Laser alignment"
+        self.milestone.save()
+        self.assertEqual(self.hits(self.user, "laser"), [('milestone', self.milestone.pk)])
+        self.milestone.delete()
+        self.assertFalse(SearchPosting.objects.filter(kind='milestone').exists())
+
+    def test_rebuild_command_indexes_messages_and_milestones(self):
+        SearchPosting.objects.all().delete()
+        call_command('rebuild_search_index', stdout=io.StringIO())
+        self.assertEqual(len(self.hits(self.user, "spectrometer")), 3)
+
+    def test_search_view(self):
+        response = self.client.get(reverse('search'), {'q': 'friday'}, HTTP_ACCEPT='application/json')
+        body = response.json()
+        self.assertEqual([result['kind'] for result in body['results']], ['message'])
+        self.assertIn('<mark>Friday</mark>', body['results'][0]['snippet'])
+        self.assertEqual(body['results'][0]['team']['name'], "Joined Team")
+
+        response = self.client.get(reverse('search'), {'q': 'calibration'})
+        self.assertContains(response, "Spectrometer calibration")
@@ -0,0 +1,34 @@
+from django.test import SimpleTestCase
+from project_b_07.http_ranges import multipart_byteranges, parse_range_header, range_applies
+
+
+class ParseRangeHeaderTest(SimpleTestCase):
+    def test_single_multiple_and_suffix_ranges(self):
+        self.assertEqual(parse_range_header('bytes=0-9', 100), [(0, 9)])
+        self.assertEqual(parse_range_header('bytes=90-', 100), [(90, 99)])
+        self.assertEqual(parse_range_header('bytes=-5', 100), [(95, 99)])
+        self.assertEqual(parse_range_header('bytes=0-0, 50-200', 100), [(0, 0), (50, 99)])
+
+    def test_malformed_headers_are_ignored(self):
+        for header in (None, '', 'items=0-1', 'bytes=5-1', 'bytes=a-b', 'bytes=-'):
+            self.assertIsNone(parse_range_header(header, 100), header)
+
+    def test_unsatisfiable_ranges(self):
+        self.assertEqual(parse_range_header('bytes=100-200', 100), [])
+        self.assertEqual(parse_range_header('bytes=-5', 0), [])
+
+    def test_if_range_requires_matching_validator(self):
+        self.assertTrue(range_applies(None, '"abc"', 0))
+        self.assertTrue(range_applies('"abc"', '"abc"', 0))
+        self.assertFalse(range_applies('"old"', '"abc"', 0))
+        self.assertFalse(range_applies('W/"abc"', '"abc"', 0))
+
+    def test_multipart_length_matches_body(self):
+        data = b'0123456789'
+        body, length = multipart_byteranges(
+            [(0, 1), (8, 9)], len(data), 'text/plain', 'BOUNDARY', lambda start, end: [data[start:end + 1]]
+        )
+        content = b''.join(body)
+        self.assertEqual(len(content), length)
+        self.assertIn(b'Content-Range: bytes 8-9/10\r\n\r\n89', content)
+        self.assertTrue(content.endswith(b'--BOUNDARY--\r\n'))
@@ -0,0 +1,91 @@
+import io
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from project_b_07.jobs import claim_job, enqueue, job_stats, requeue_stale_jobs, retry_delay, run_job
+from project_b_07.models import Job
+
+calls = []
+
+
+def record_call(value):
+    calls.append(value)
+
+
+def always_fail():
+    raise RuntimeError("boom")
+
+
+@override_settings(JOB_MAX_ATTEMPTS=3, JOB_RETRY_BACKOFF=10, JOB_RETRY_MAX_BACKOFF=60, JOB_TIMEOUT=60)
+class JobQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueued_job_runs_once(self):
+        enqueue(record_call, value=42)
+        job = claim_job('worker-1')
+        self.assertEqual((job.status, job.attempts, job.locked_by), ('running', 1, 'worker-1'))
+        # A claimed job is not handed to a second worker
+        self.assertIsNone(claim_job('worker-2'))
+
+        self.assertTrue(run_job(job))
+        job.refresh_from_db()
+        self.assertEqual(calls, [42])
+        self.assertEqual(job.status, 'done')
+        self.assertIsNotNone(job.duration)
+
+    def test_jobs_are_claimed_oldest_first_and_delays_respected(self):
+        later = enqueue(record_call, delay=60, value='later')
+        first = enqueue(record_call, value='first')
+        second = enqueue(record_call, value='second')
+        self.assertEqual(claim_job('w').id, first.id)
+        self.assertEqual(claim_job('w').id, second.id)
+        self.assertIsNone(claim_job('w'))
+        self.assertEqual(Job.objects.get(id=later.id).status, 'queued')
+
+    def test_failures_back_off_then_give_up(self):
+        enqueue(always_fail)
+        for attempt in (1, 2):
+            job = claim_job('w')
+            self.assertFalse(run_job(job))
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), ('queued', attempt))
+            self.assertIn('RuntimeError: boom', job.last_error)
+            self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=9))
+            Job.objects.filter(id=job.id).update(run_after=timezone.now())
+
+        self.assertFalse(run_job(claim_job('w')))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 3))
+
+    def test_retry_delay_doubles_up_to_the_cap(self):
+        self.assertTrue(10 <= retry_delay(1) <= 11)
+        self.assertTrue(40 <= retry_delay(3) <= 44)
+        self.assertTrue(60 <= retry_delay(10) <= 66)
+
+    def test_stale_jobs_are_requeued(self):
+        enqueue(record_call, value=1)
+        job = claim_job('crashed-worker')
+        Job.objects.filter(id=job.id).update(locked_at=timezone.now() - timedelta(seconds=120))
+        self.assertEqual(requeue_stale_jobs(), 1)
+        job = claim_job('w')
+        self.assertEqual(job.attempts, 2)
+        # The original worker can no longer record a result
+        Job.objects.filter(id=job.id).update(locked_by='w2')
+        job.locked_by = 'crashed-worker'
+        run_job(job)
+        self.assertEqual(Job.objects.get(id=job.id).status, 'running')
+
+    def test_worker_command_drains_the_queue(self):
+        for value in range(3):
+            enqueue(record_call, value=value)
+        enqueue(always_fail, max_attempts=1)
+        out = io.StringIO()
+        call_command('run_jobs', burst=True, concurrency=1, stdout=out)
+        self.assertEqual(calls, [0, 1, 2])
+        self.assertIn('project_b_07.tests.test_jobs.record_call', out.getvalue())
+        stats = job_stats()
+        self.assertEqual(stats['by_status'], {'done': 3, 'failed': 1})
+        self.assertEqual(stats['tasks'][0]['count'], 3)
@@ -0,0 +1,134 @@
+import io
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from project_b_07.jobs import claim_job, run_job, task_path
+from project_b_07.models import FilePreview, Job, Team, TeamFile
+from project_b_07.previews import SNIPPET_BYTES, THUMBNAIL_SIZE, generate_preview, preview_key
+from project_b_07.storage import set_s3_client
+from project_b_07.tests.fakes import FakeS3Client, FlakyS3Client
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+
+def image_bytes(format, size=(1200, 800)):
+    output = io.BytesIO()
+    Image.new('RGB', size, 'navy').save(output, format=format)
+    return output.getvalue()
+
+
+@override_settings(AWS_STORAGE_BUCKET_NAME='test-bucket', PREVIEW_INLINE=True)
+class PreviewPipelineTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password")
+        self.team = Team.objects.create(name="Test Team", created_by=self.user)
+        self.s3 = FakeS3Client()
+        set_s3_client(self.s3)
+        self.addCleanup(set_s3_client, None)
+
+    def create_file(self, key, body, content_type):
+        self.s3.put_object(Bucket='test-bucket', Key=key, Body=body, ContentType=content_type)
+        with self.captureOnCommitCallbacks(execute=True):
+            team_file = TeamFile.objects.create(title=key, file=key, team=self.team, uploaded_by=self.user)
+        return FilePreview.objects.get(team_file=team_file)
+
+    def thumbnail(self, key):
+        return Image.open(io.BytesIO(self.s3.objects[('test-bucket', preview_key(key))]['Body']))
+
+    def test_jpeg_thumbnail_is_stored_next_to_the_original(self):
+        preview = self.create_file('photo.jpg', image_bytes('JPEG'), 'image/jpeg')
+        self.assertEqual((preview.status, preview.image_key), ('ready', 'photo.jpg.preview.jpg'))
+        thumbnail = self.thumbnail('photo.jpg')
+        self.assertEqual(thumbnail.format, 'JPEG')
+        self.assertLessEqual(thumbnail.width, THUMBNAIL_SIZE[0])
+
+    def test_pdf_first_page_is_rasterised(self):
+        preview = self.create_file('paper.pdf', image_bytes('PDF'), 'application/pdf')
+        self.assertEqual(preview.status, 'ready')
+        self.assertEqual(self.thumbnail('paper.pdf').format, 'JPEG')
+
+    def test_text_snippet_reads_only_the_head(self):
+        preview = self.create_file('notes.txt', b'first line\n' + b'x' * 10000, 'text/plain')
+        self.assertEqual(preview.status, 'ready')
+        self.assertEqual(preview.image_key, '')
+        self.assertTrue(preview.snippet.startswith('first line\n'))
+        self.assertIn(('get_object', 'notes.txt', f'bytes=0-{SNIPPET_BYTES - 1}'), self.s3.calls)
+
+    def test_other_types_are_unsupported(self):
+        preview = self.create_file('data.csv', b'a,b', 'text/csv')
+        self.assertEqual(preview.status, 'unsupported')
+        self.assertNotIn(('get_object', 'data.csv'), self.s3.calls)
+
+    def test_broken_file_is_marked_failed(self):
+        preview = self.create_file('broken.jpg', b'not a jpeg', 'image/jpeg')
+        self.assertEqual(preview.status, 'failed')
+        self.assertTrue(preview.error)
+
+    @override_settings(PREVIEW_INLINE=False)
+    def test_preview_is_built_by_a_queued_job(self):
+        preview = self.create_file('notes.txt', b"Centrifuge results", 'text/plain')
+        self.assertEqual(preview.status, 'pending')
+        job = Job.objects.get(task=task_path(generate_preview))
+        self.assertEqual(job.kwargs, {'team_file_id': preview.team_file_id, 'source_key': 'notes.txt'})
+
+        for _ in range(Job.objects.count()):
+            self.assertTrue(run_job(claim_job('worker-1')))
+        preview.refresh_from_db()
+        self.assertEqual((preview.status, preview.snippet), ('ready', "Centrifuge results"))
+
+    @override_settings(PREVIEW_INLINE=False)
+    def test_storage_errors_are_retried_by_the_queue(self):
+        self.s3 = FlakyS3Client()
+        set_s3_client(self.s3)
+        preview = self.create_file('photo.jpg', image_bytes('JPEG'), 'image/jpeg')
+        self.assertFalse(run_job(claim_job('worker-1')))
+        self.assertEqual(FilePreview.objects.get(id=preview.id).status, 'pending')
+
+        Job.objects.update(run_after=timezone.now())
+        self.assertTrue(run_job(claim_job('worker-1')))
+        self.assertEqual(FilePreview.objects.get(id=preview.id).status, 'ready')
+
+    def test_undecodable_images_fail_for_good(self):
+        preview = self.create_file('photo.jpg', b'not a jpeg', 'image/jpeg')
+        self.assertEqual(preview.status, 'failed')
+
+    @override_settings(PREVIEW_INLINE=False)
+    def test_job_skips_files_pointed_at_other_content(self):
+        preview = self.create_file('notes.txt', b"Centrifuge results", 'text/plain')
+        TeamFile.objects.filter(id=preview.team_file_id).update(file='other.txt')
+        for _ in range(Job.objects.count()):
+            self.assertTrue(run_job(claim_job('worker-1')))
+        self.assertEqual(FilePreview.objects.get(id=preview.id).status, 'pending')
+
+
+@override_settings(AWS_STORAGE_BUCKET_NAME='test-bucket', FILE_PRESIGNED_URL_EXPIRY=300)
+class ServePreviewViewTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password")
+        self.team = Team.objects.create(name="Test Team", created_by=self.user)
+        self.team_file = TeamFile.objects.create(title="Photo", file="photo.jpg", team=self.team, uploaded_by=self.user)
+        self.s3 = FakeS3Client()
+        set_s3_client(self.s3)
+        self.addCleanup(set_s3_client, None)
+        self.url = reverse('serve_preview', args=[self.team_file.id])
+
+    def test_redirects_to_cacheable_signed_url(self):
+        FilePreview.objects.create(team_file=self.team_file, status='ready', image_key='photo.jpg.preview.jpg')
+        self.client.login(username="testuser", password="password")
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response['Location'].startswith('https://test-bucket.s3.test/photo.jpg.preview.jpg?'))
+        self.assertIn('max-age=270', response['Cache-Control'])
+
+    def test_missing_preview_is_not_found(self):
+        self.client.login(username="testuser", password="password")
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_outsiders_are_forbidden(self):
+        FilePreview.objects.create(team_file=self.team_file, status='ready', image_key='photo.jpg.preview.jpg')
+        User.objects.create_user(username="outsider", password="password")
+        self.client.login(username="outsider", password="password")
+        self.assertEqual(self.client.get(self.url).status_code, 403)
@@ -0,0 +1,120 @@
+import io
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from project_b_07.models import Team, TeamMembership
+from users.models import Profile
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+
+class SessionUserTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password")
+        self.team = Team.objects.create(name="Test Team", created_by=self.user)
+        self.client.login(username="testuser", password="password")
+
+    def test_user_and_profile_are_loaded_in_one_query(self):
+        url = reverse('team_chat_updates', args=[self.team.id])
+        self.client.get(url)
+        # session, user joined with profile, team, messages: no separate profile lookup
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(response.wsgi_request.user.profile.role, 'common')
+
+    def test_role_changes_apply_to_the_next_request(self):
+        profile = self.user.profile
+        profile.role = 'admin'
+        profile.save()
+        response = self.client.get(reverse('team_chat_updates', args=[self.team.id]))
+        self.assertTrue(response.wsgi_request.user.profile.is_admin())
+
+    def test_users_without_a_profile_get_one_at_login(self):
+        User.objects.bulk_create([User(username="imported", password=self.user.password)])
+        self.assertFalse(Profile.objects.filter(user__username="imported").exists())
+        self.assertTrue(self.client.login(username="imported", password="password"))
+        self.assertEqual(Profile.objects.get(user__username="imported").role, 'common')
+
+    def test_users_whose_profile_is_missing_get_one_on_their_next_request(self):
+        Profile.objects.filter(user=self.user).delete()
+        response = self.client.get(reverse('team_detail', args=[self.team.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Profile.objects.get(user=self.user).role, 'common')
+
+    def test_sessions_of_the_stock_backends_stay_logged_in(self):
+        session = self.client.session
+        session['_auth_user_backend'] = 'django.contrib.auth.backends.ModelBackend'
+        session.save()
+        response = self.client.get(reverse('team_chat_updates', args=[self.team.id]))
+        self.assertEqual(response.wsgi_request.user, self.user)
+
+
+class ProfileSaveTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password")
+
+    def test_saving_a_user_leaves_an_unchanged_profile_alone(self):
+        user = User.objects.select_related('profile').get(pk=self.user.pk)
+        with self.assertNumQueries(2):  # the user row, and whether they created teams listed by name
+            user.save()
+
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(1):  # the profile is not fetched just to be saved
+            user.save(update_fields=['last_login'])
+
+    def test_changed_profile_is_saved_with_its_user(self):
+        user = User.objects.select_related('profile').get(pk=self.user.pk)
+        version = user.profile.access_version
+        user.profile.role = 'admin'
+        self.assertEqual(user.profile.changed_fields(), {'role'})
+        user.save()
+        profile = Profile.objects.get(user=self.user)
+        self.assertEqual(profile.role, 'admin')
+        self.assertGreater(profile.access_version, version)
+        self.assertEqual(user.profile.changed_fields(), set())
+
+    def test_login_does_not_write_the_profile(self):
+        version = self.user.profile.access_version
+        self.assertTrue(self.client.login(username="testuser", password="password"))
+        self.assertEqual(Profile.objects.get(user=self.user).access_version, version)
+
+
+class ProvisionUsersCommandTest(TestCase):
+    def write_csv(self, rows):
+        handle = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False)
+        with handle:
+            handle.write("username,email\n")
+            handle.writelines(f"{username},{username}@example.edu\n" for username in rows)
+        self.addCleanup(os.unlink, handle.name)
+        return handle.name
+
+    def test_creates_a_class_in_a_handful_of_queries(self):
+        owner = User.objects.create_user(username="teacher", password="password")
+        team = Team.objects.create(name="Class", created_by=owner)
+        path = self.write_csv([f"student{i}" for i in range(500)] + ["teacher"])
+        with CaptureQueriesContext(connection) as queries:
+            call_command('provision_users', path, '--team', str(team.id), stdout=io.StringIO())
+        # One INSERT per table on PostgreSQL; SQLite's parameter limit splits them into a few
+        self.assertLess(len(queries), 20)
+        self.assertEqual(User.objects.count(), 501)
+        self.assertEqual(Profile.objects.filter(role='common').count(), 501)
+        self.assertEqual(Profile.objects.get(user__username="student7").user.email, "student7@example.edu")
+        self.assertFalse(User.objects.get(username="student7").has_usable_password())
+        self.assertEqual(TeamMembership.objects.filter(team=team, status='accepted').count(), 501)
+
+    def test_existing_users_are_kept(self):
+        path = self.write_csv(["testuser", "newcomer"])
+        existing = User.objects.create_user(username="testuser", password="password")
+        out = io.StringIO()
+        call_command('provision_users', path, '--role', 'admin', stdout=out)
+        self.assertIn("Created 1 user(s); 1 already existed.", out.getvalue())
+        self.assertTrue(User.objects.get(pk=existing.pk).check_password("password"))
+        self.assertEqual(Profile.objects.get(user=existing).role, 'common')
+        self.assertEqual(Profile.objects.get(user__username="newcomer").role, 'admin')
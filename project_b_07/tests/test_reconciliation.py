@@ -0,0 +1,108 @@
+import io
+import os
+import tempfile
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from project_b_07.models import FilePreview, StoredBlob, Team, TeamFile
+from project_b_07.reconciliation import Reconciler, delete_dangling
+from project_b_07.storage import set_s3_client
+from project_b_07.tests.fakes import FakeS3Client
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+
+@override_settings(AWS_STORAGE_BUCKET_NAME='test-bucket')
+class ReconcileStorageTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password")
+        self.team = Team.objects.create(name="Test Team", created_by=self.user)
+        self.s3 = FakeS3Client()
+        set_s3_client(self.s3)
+        self.addCleanup(set_s3_client, None)
+
+        blob = StoredBlob.objects.create(sha256='ab' * 32, key='blobs/ab/abab', size=1, content_type='text/plain', ref_count=1)
+        shared = TeamFile.objects.create(title="Shared", file=blob.key, blob=blob, team=self.team, uploaded_by=self.user)
+        FilePreview.objects.create(team_file=shared, status='ready', image_key='blobs/ab/abab.preview.jpg')
+        for key in ('a.txt', 'z.txt', 'é.txt'):
+            TeamFile.objects.create(title=key, file=key, team=self.team, uploaded_by=self.user)
+        TeamFile.objects.create(title="Lost", file='lost.txt', team=self.team, uploaded_by=self.user)
+
+        # Rows younger than --min-age-hours are not judged
+        three_days_ago = timezone.now() - timedelta(days=3)
+        TeamFile.objects.update(uploaded_at=three_days_ago)
+        StoredBlob.objects.update(created_at=three_days_ago)
+        FilePreview.objects.update(updated_at=three_days_ago)
+
+        for key in ('a.txt', 'z.txt', 'é.txt', 'blobs/ab/abab', 'blobs/ab/abab.preview.jpg', 'old-orphan.txt', 'zz-orphan.txt'):
+            self.put(key, age=timedelta(days=3))
+        self.put('new-upload.txt', age=timedelta(minutes=5))
+
+    def put(self, key, age):
+        self.s3.put_object(Bucket='test-bucket', Key=key, Body=b'data')
+        self.s3.objects[('test-bucket', key)]['LastModified'] = timezone.now() - age
+
+    def test_report_only_changes_nothing(self):
+        out = io.StringIO()
+        call_command('reconcile_storage', verbosity=2, stdout=out)
+        output = out.getvalue()
+        self.assertIn('orphan old-orphan.txt', output)
+        self.assertIn('orphan zz-orphan.txt', output)
+        self.assertIn('dangling lost.txt (file)', output)
+        self.assertNotIn('new-upload.txt', output)
+        self.assertIn('Checked 8 object(s): 5 matched, 2 orphaned (8 bytes), 1 object(s) or row key(s) too recent to judge, 1 dangling', output)
+        self.assertEqual(len(self.s3.objects), 8)
+        self.assertTrue(TeamFile.objects.filter(file='lost.txt').exists())
+
+    def test_deletes_orphans_in_batches_and_dangling_rows(self):
+        call_command('reconcile_storage', delete_orphans=True, delete_dangling=True, stdout=io.StringIO())
+        self.assertNotIn(('test-bucket', 'old-orphan.txt'), self.s3.objects)
+        self.assertNotIn(('test-bucket', 'zz-orphan.txt'), self.s3.objects)
+        self.assertIn(('test-bucket', 'new-upload.txt'), self.s3.objects)
+        self.assertIn(('test-bucket', 'blobs/ab/abab.preview.jpg'), self.s3.objects)
+        self.assertFalse(TeamFile.objects.filter(file='lost.txt').exists())
+        self.assertNotIn('delete_object', [call[0] for call in self.s3.calls])
+
+    def test_resumes_from_checkpoint(self):
+        orphan_batches = []
+
+        def interrupted(keys):
+            raise KeyboardInterrupt
+
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint = os.path.join(directory, 'reconcile.json')
+            # Pages of 3 keys: the first has no orphans, the second's are never handled
+            first = Reconciler(self.s3, 'test-bucket', page_size=3, checkpoint_path=checkpoint, on_orphans=interrupted)
+            with self.assertRaises(KeyboardInterrupt):
+                first.run()
+
+            second = Reconciler(self.s3, 'test-bucket', page_size=3, checkpoint_path=checkpoint, on_orphans=orphan_batches.append)
+            self.assertEqual(second.load_checkpoint(), 'blobs/ab/abab.preview.jpg')
+            counts = second.run()
+            self.assertFalse(os.path.exists(checkpoint))
+        self.assertIn(('list_objects_v2', 'blobs/ab/abab.preview.jpg'), self.s3.calls)
+        self.assertEqual((counts['objects'], counts['matched'], counts['dangling']), (8, 5, 1))
+        self.assertEqual(sorted(key for batch in orphan_batches for key in batch), ['old-orphan.txt', 'zz-orphan.txt'])
+
+    def test_rows_written_during_the_run_are_not_dangling(self):
+        # Committed after its part of the bucket was listed, as far as the run can tell
+        TeamFile.objects.create(title="Mid-run", file='b-mid-run.txt', team=self.team, uploaded_by=self.user)
+        out = io.StringIO()
+        call_command('reconcile_storage', delete_dangling=True, verbosity=2, stdout=out)
+        self.assertNotIn('b-mid-run.txt', out.getvalue())
+        self.assertIn('2 object(s) or row key(s) too recent to judge, 1 dangling', out.getvalue())
+        self.assertTrue(TeamFile.objects.filter(file='b-mid-run.txt').exists())
+        self.assertFalse(TeamFile.objects.filter(file='lost.txt').exists())
+
+    def test_dangling_rows_are_kept_if_their_object_turns_up(self):
+        def upload_before_delete(entries):
+            self.put('lost.txt', age=timedelta(0))
+            delete_dangling(self.s3, 'test-bucket', entries)
+
+        counts = Reconciler(self.s3, 'test-bucket', on_dangling=upload_before_delete).run()
+        self.assertEqual(counts['dangling'], 1)
+        self.assertIn(('head_object', 'lost.txt'), self.s3.calls)
+        self.assertTrue(TeamFile.objects.filter(file='lost.txt').exists())
@@ -0,0 +1,87 @@
+import io
+from unittest import skipIf, skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from project_b_07.models import FileSearchTerm, Team, TeamFile
+from project_b_07.search import search_files, tokenize
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+POSTGRES = connection.vendor == 'postgresql'
+
+
+@override_settings(PREVIEW_INLINE=True)
+class FileSearchTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password")
+        self.team = Team.objects.create(name="Test Team", created_by=self.user)
+        self.report = self.add("Quarterly report", description="Revenue by region", keywords="finance")
+        self.notes = self.add("Meeting notes", description="Discussed the quarterly report draft", keywords="minutes")
+        self.photo = self.add("Café photo", description="", keywords="team, social")
+
+    def add(self, title, description='', keywords=''):
+        return TeamFile.objects.create(
+            title=title, description=description, keywords=keywords, file=f"{title}.txt",
+            team=self.team, uploaded_by=self.user,
+        )
+
+    def search(self, query):
+        return list(search_files(self.team.files.all(), query))
+
+    def test_tokenize_folds_case_and_accents(self):
+        self.assertEqual(tokenize("Café, CRÈME-brûlée 2024"), ['cafe', 'creme', 'brulee', '2024'])
+
+    def test_words_are_prefixes_and_all_must_match(self):
+        self.assertEqual(self.search("quart"), [self.report, self.notes])
+        self.assertEqual(self.search("quarterly revenue"), [self.report])
+        self.assertEqual(self.search("quarterly photo"), [])
+        self.assertEqual(self.search("   "), [])
+
+    @skipIf(POSTGRES, "the PostgreSQL text search configuration keeps accents")
+    def test_inverted_index_folds_accents(self):
+        self.assertEqual(self.search("cafe"), [self.photo])
+        self.assertEqual(self.search("café"), [self.photo])
+
+    @skipUnless(POSTGRES, "tsvector search runs on PostgreSQL only")
+    def test_postgres_matches_accented_words_as_written(self):
+        self.assertEqual(self.search("café"), [self.photo])
+
+    def test_title_matches_rank_above_description_matches(self):
+        # Added last, so it would come first if rank were ignored; ties go to the newest file
+        budget = self.add("Budget", description="Quarterly figures")
+        self.assertEqual(self.search("quarterly"), [self.report, budget, self.notes])
+
+    @skipIf(POSTGRES, "ts_rank scores differ from the inverted index weights")
+    def test_inverted_index_ranks_by_the_weights_of_the_query_terms(self):
+        # Only postings of the query terms count towards the rank
+        self.assertEqual(self.search("quarterly")[0].search_rank, 1.0)
+
+    @skipUnless(POSTGRES, "tsvector search runs on PostgreSQL only")
+    def test_postgres_stores_a_vector_for_every_file(self):
+        self.assertFalse(TeamFile.objects.filter(search_vector__isnull=True).exists())
+        ranks = [team_file.search_rank for team_file in self.search("quarterly")]
+        self.assertEqual(ranks, sorted(ranks, reverse=True))
+        self.assertTrue(all(rank > 0 for rank in ranks))
+
+    def test_index_follows_updates_and_deletes(self):
+        self.report.title = "Annual summary"
+        self.report.save()
+        self.assertEqual(self.search("annual"), [self.report])
+        self.assertEqual(self.search("quarterly report"), [self.notes])
+
+        self.notes.delete()
+        self.assertFalse(FileSearchTerm.objects.filter(team_file_id=self.notes.id).exists())
+
+    def test_rebuild_command_indexes_every_file(self):
+        FileSearchTerm.objects.all().delete()
+        call_command('rebuild_search_index', batch_size=2, stdout=io.StringIO())
+        self.assertEqual(self.search("meeting"), [self.notes])
+
+    def test_team_page_uses_the_index(self):
+        self.client.login(username="testuser", password="password")
+        response = self.client.get(reverse('team_detail', args=[self.team.id]), {'q': 'region'})
+        self.assertEqual(list(response.context['files']), [self.report])
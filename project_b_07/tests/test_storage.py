@@ -0,0 +1,23 @@
+from django.test import SimpleTestCase, override_settings
+from project_b_07 import storage
+from project_b_07.tests.fakes import FakeS3Client
+
+
+@override_settings(AWS_S3_REGION_NAME='us-east-1', S3_MAX_POOL_CONNECTIONS=17)
+class SharedS3ClientTest(SimpleTestCase):
+    def setUp(self):
+        storage.set_s3_client(None)
+        self.addCleanup(storage.set_s3_client, None)
+
+    def test_client_is_built_once_per_process(self):
+        client = storage.get_s3_client()
+        self.assertIs(storage.get_s3_client(), client)
+        self.assertEqual(client.meta.config.max_pool_connections, 17)
+        self.assertTrue(client.meta.config.tcp_keepalive)
+
+    def test_use_s3_client_swaps_and_restores(self):
+        original = storage.get_s3_client()
+        fake = FakeS3Client()
+        with storage.use_s3_client(fake):
+            self.assertIs(storage.get_s3_client(), fake)
+        self.assertIs(storage.get_s3_client(), original)
@@ -0,0 +1,93 @@
+import importlib
+
+from django.apps import apps
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from project_b_07.models import Tag, Team, TeamFile
+from project_b_07.storage import set_s3_client
+from project_b_07.tags import parse_keywords
+from project_b_07.tests.fakes import FakeS3Client
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+
+@override_settings(AWS_STORAGE_BUCKET_NAME='test-bucket', PREVIEW_INLINE=True)
+class TagTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password")
+        self.team = Team.objects.create(name="Test Team", created_by=self.user)
+        self.other_team = Team.objects.create(name="Other Team", created_by=self.user)
+        self.client.login(username="testuser", password="password")
+
+    def add(self, title, keywords, team=None):
+        return TeamFile.objects.create(
+            title=title, keywords=keywords, file=f"{title}.txt", team=team or self.team, uploaded_by=self.user,
+        )
+
+    def counts(self, team=None):
+        return dict((team or self.team).tags.filter(file_count__gt=0).values_list('name', 'file_count'))
+
+    def test_parse_keywords_normalises_and_deduplicates(self):
+        self.assertEqual(parse_keywords(" Cell  Biology, microscopy,, cell biology ,"), ['cell biology', 'microscopy'])
+
+    def test_counters_follow_files(self):
+        first = self.add("a", "lab, data")
+        self.add("b", "Lab")
+        self.add("c", "lab", team=self.other_team)
+        self.assertEqual(self.counts(), {'lab': 2, 'data': 1})
+        self.assertEqual(self.counts(self.other_team), {'lab': 1})
+
+        first.keywords = "data, archive"
+        first.save()
+        self.assertEqual(self.counts(), {'lab': 1, 'data': 1, 'archive': 1})
+
+        first.delete()
+        self.assertEqual(self.counts(), {'lab': 1})
+
+    def test_bulk_uploads_are_tagged(self):
+        s3 = FakeS3Client()
+        set_s3_client(s3)
+        self.addCleanup(set_s3_client, None)
+        files = [SimpleUploadedFile(f'{n}.txt', f'note {n}'.encode(), content_type='text/plain') for n in range(3)]
+        self.client.post(
+            reverse('bulk_upload_team_files', args=[self.team.id]),
+            {'files': files, 'keywords': 'batch, notes'}, HTTP_ACCEPT='application/json',
+        )
+        self.assertEqual(self.counts(), {'batch': 3, 'notes': 3})
+
+    def test_team_page_filters_by_tags_and_shows_facets(self):
+        both = self.add("both", "lab, data")
+        self.add("lab only", "lab")
+        url = reverse('team_detail', args=[self.team.id])
+
+        response = self.client.get(url, {'tag': ['lab', 'data']})
+        self.assertEqual(list(response.context['files']), [both])
+        facets = {facet['name']: (facet['count'], facet['selected']) for facet in response.context['facets']}
+        self.assertEqual(facets, {'lab': (2, True), 'data': (1, True)})
+
+        response = self.client.get(url, {'tag': 'lab', 'q': 'only'})
+        self.assertEqual([f.title for f in response.context['files']], ["lab only"])
+
+    def test_autocomplete(self):
+        self.add("a", "microscopy, microbes")
+        self.add("b", "microscopy, methods")
+        url = reverse('autocomplete_team_tags', args=[self.team.id])
+        response = self.client.get(url, {'q': 'Micro'})
+        self.assertEqual(response.json()['tags'], [
+            {'name': 'microscopy', 'count': 2},
+            {'name': 'microbes', 'count': 1},
+        ])
+
+        User.objects.create_user(username="outsider", password="password")
+        self.client.login(username="outsider", password="password")
+        self.assertEqual(self.client.get(url, {'q': 'micro'}).status_code, 403)
+
+    def test_migration_backfills_existing_keywords(self):
+        self.add("a", "lab, data")
+        self.add("b", "lab")
+        Tag.objects.all().delete()
+        migration = importlib.import_module('project_b_07.migrations.0011_tags')
+        migration.backfill_tags(apps, None)
+        self.assertEqual(self.counts(), {'lab': 2, 'data': 1})
@@ -0,0 +1,99 @@
+import datetime
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from project_b_07.blobs import purge_pending_objects
+from project_b_07.jobs import claim_job, run_job
+from project_b_07.models import Job, PendingObjectDelete, Team, TeamChatMessage, TeamDeletion, TeamFile, TeamMembership
+from project_b_07.storage import set_s3_client
+from project_b_07.tests.fakes import FakeS3Client
+from roadmap.models import Milestone
+from users.models import Availability
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+
+@override_settings(AWS_STORAGE_BUCKET_NAME='test-bucket', TEAM_DELETE_BATCH_SIZE=2, TEAM_DELETE_BATCHES_PER_JOB=3)
+class TeamDeletionTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="password")
+        self.team = Team.objects.create(name="Doomed", created_by=self.owner)
+        self.s3 = FakeS3Client()
+        set_s3_client(self.s3)
+        self.addCleanup(set_s3_client, None)
+
+        for n in range(5):
+            key = f"team-files/{n}.txt"
+            self.s3.put_object(Bucket='test-bucket', Key=key, Body=b'x')
+            TeamFile.objects.create(title=f"File {n}", file=key, team=self.team, uploaded_by=self.owner)
+            TeamChatMessage.objects.create(team=self.team, user=self.owner, message=f"Message {n}")
+        member = User.objects.create_user(username="member", password="password")
+        TeamMembership.objects.create(user=member, team=self.team, status='accepted')
+        Availability.objects.create(
+            user=member, team=self.team, date=datetime.date(2024, 1, 1),
+            start_time=datetime.time(9), end_time=datetime.time(10),
+        )
+        Milestone.objects.create(user=self.owner, team=self.team, title="Ship", end_date=datetime.date(2024, 2, 1))
+        self.client.login(username="owner", password="password")
+
+    def run_queue(self):
+        runs = 0
+        while (job := claim_job('test-worker')) is not None:
+            self.assertTrue(run_job(job))
+            runs += 1
+        return runs
+
+    def test_delete_hides_team_and_removes_data_in_batches(self):
+        response = self.client.post(reverse('delete_team', args=[self.team.id]))
+        self.assertRedirects(response, reverse('team_list'), fetch_redirect_response=False)
+
+        # Hidden immediately, nothing removed yet
+        self.assertFalse(Team.objects.filter(id=self.team.id).exists())
+        self.assertEqual(TeamFile.objects.filter(team_id=self.team.id).count(), 5)
+        self.assertEqual(self.client.get(reverse('team_detail', args=[self.team.id])).status_code, 404)
+
+        # 5 files + 5 messages in batches of 2 need several slices of 3 batches
+        self.assertGreater(self.run_queue(), 3)
+        deletion = TeamDeletion.objects.get()
+        self.assertEqual(deletion.status, 'done')
+        self.assertEqual(deletion.progress['project_b_07.TeamFile'], 5)
+        self.assertEqual(deletion.progress['project_b_07.TeamChatMessage'], 5)
+        self.assertEqual(deletion.progress['users.Availability'], 1)
+        self.assertEqual(deletion.progress['roadmap.Milestone'], 1)
+        self.assertFalse(Team.all_objects.filter(id=self.team.id).exists())
+        self.assertFalse(TeamMembership.objects.filter(team_id=self.team.id).exists())
+
+        # Every file and preview key went out through batched DeleteObjects requests
+        self.assertEqual(self.s3.objects, {})
+        self.assertNotIn('delete_object', [call[0] for call in self.s3.calls])
+        deleted = [key for call in self.s3.calls if call[0] == 'delete_objects' for key in call[1]]
+        self.assertEqual(len(deleted), 10)
+        self.assertFalse(PendingObjectDelete.objects.exists())
+
+    def test_deletion_resumes_after_a_lost_job(self):
+        self.client.post(reverse('delete_team', args=[self.team.id]))
+        job = claim_job('crashed-worker')
+        # The worker died mid-way: only part of the files were removed
+        TeamFile.objects.filter(team_id=self.team.id).order_by('id').first().delete()
+        Job.objects.filter(id=job.id).update(status='queued')
+
+        self.run_queue()
+        self.assertEqual(TeamDeletion.objects.get().status, 'done')
+        self.assertFalse(TeamFile.objects.filter(team_id=self.team.id).exists())
+        self.assertEqual(self.s3.objects, {})
+
+    def test_purge_keeps_keys_that_are_in_use_again(self):
+        PendingObjectDelete.objects.create(key='team-files/0.txt')
+        PendingObjectDelete.objects.create(key='team-files/0.txt.preview.jpg')
+        PendingObjectDelete.objects.create(key='gone.txt')
+        purge_pending_objects()
+        self.assertEqual(self.s3.calls[-1], ('delete_objects', ('gone.txt',)))
+        self.assertFalse(PendingObjectDelete.objects.exists())
+
+    def test_other_users_cannot_delete(self):
+        User.objects.create_user(username="outsider", password="password")
+        self.client.login(username="outsider", password="password")
+        self.client.post(reverse('delete_team', args=[self.team.id]))
+        self.assertTrue(Team.objects.filter(id=self.team.id).exists())
+        self.assertFalse(TeamDeletion.objects.exists())
@@ -0,0 +1,29 @@
+import io
+
+from django.test import SimpleTestCase, override_settings
+from project_b_07.tests.fakes import FakeS3Client
+from project_b_07.transfers import UploadProgress, stream_upload
+
+
+class UploadProgressTest(SimpleTestCase):
+    def test_counts_parts_from_cumulative_bytes(self):
+        progress = UploadProgress(part_size=10)
+        for amount in (4, 8, 8, 5):  # 25 bytes in callbacks that do not line up with parts
+            progress(amount)
+        progress.finish()
+        stats = progress.as_dict()
+        self.assertEqual(stats['bytes'], 25)
+        self.assertEqual(len(stats['part_seconds']), 3)  # Two full parts and a trailing partial one
+
+
+@override_settings(
+    AWS_STORAGE_BUCKET_NAME='test-bucket', S3_MULTIPART_CHUNKSIZE=5 * 1024 * 1024, S3_UPLOAD_MAX_CONCURRENCY=2
+)
+class StreamUploadTest(SimpleTestCase):
+    def test_streams_in_configured_parts(self):
+        s3 = FakeS3Client()
+        data = b'x' * (11 * 1024 * 1024)
+        progress = stream_upload(s3, io.BytesIO(data), 'big.bin', 'application/octet-stream')
+        self.assertEqual(s3.objects[('test-bucket', 'big.bin')]['Body'], data)
+        self.assertEqual(progress.bytes_sent, len(data))
+        self.assertEqual(len(progress.part_seconds), 3)
@@ -1,6 +1,28 @@
-from django.test import TestCase
+import datetime
+import hashlib
+import io
+import tempfile
+import time
+import zipfile
+from unittest.mock import patch
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
 from django.urls import reverse
-from project_b_07.models import Team, TeamMembership
+from django.utils import timezone
+from django.utils.http import parse_http_date
+from project_b_07.blobs import content_key
+from project_b_07.models import PublicDirectoryVersion, Team, TeamMembership, TeamChatMessage, TeamFile, StoredBlob
+from project_b_07.file_cache import get_file_cache
+from project_b_07.jobs import claim_job, run_job
+from project_b_07.pagination import encode_cursor
+from project_b_07.public_teams import invalidate_public_teams
+from project_b_07.storage import set_s3_client, use_s3_client
+from project_b_07.team_deletion import request_team_deletion
+from project_b_07.tests.fakes import FakeS3Client
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -12,6 +34,46 @@ class FileUploadViewTest(TestCase):
         self.team = Team.objects.create(name="Test Team", created_by=self.user)
         self.client.login(username="testuser", password="password")
 
+    @override_settings(AWS_STORAGE_BUCKET_NAME='test-bucket')
+    def test_file_upload_streams_to_s3_once(self):
+        s3 = FakeS3Client()
+        upload = SimpleUploadedFile('notes.txt', b'hello world', content_type='text/plain')
+        with use_s3_client(s3):
+            response = self.client.post(
+                reverse('upload_team_file', args=[self.team.id]),
+                {'title': 'Notes', 'file': upload, 'description': 'd', 'keywords': 'k'},
+            )
+        self.assertRedirects(response, reverse('team_detail', args=[self.team.id]), fetch_redirect_response=False)
+        key = content_key(hashlib.sha256(b'hello world').hexdigest())
+        self.assertEqual(s3.calls, [('upload_fileobj', key)])
+        self.assertEqual(s3.objects[('test-bucket', key)]['Body'], b'hello world')
+        self.assertEqual(TeamFile.objects.get(team=self.team).file.name, key)
+
+    @override_settings(AWS_STORAGE_BUCKET_NAME='test-bucket')
+    def test_duplicate_uploads_share_one_stored_object(self):
+        s3 = FakeS3Client()
+        url = reverse('upload_team_file', args=[self.team.id])
+        with use_s3_client(s3):
+            for title in ('Slides', 'Slides again'):
+                upload = SimpleUploadedFile('slides.pdf', b'%PDF same bytes', content_type='application/pdf')
+                self.client.post(url, {'title': title, 'file': upload, 'description': 'd', 'keywords': 'k'})
+
+            self.assertEqual([call[0] for call in s3.calls], ['upload_fileobj'])
+            key = s3.calls[0][1]
+            first, second = TeamFile.objects.filter(team=self.team).order_by('id')
+            self.assertEqual(first.blob_id, second.blob_id)
+            self.assertEqual(StoredBlob.objects.get().ref_count, 2)
+
+            first.delete()
+            self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+            second.delete()
+            self.assertFalse(StoredBlob.objects.exists())
+            # The S3 object is removed by the queued job
+            self.assertIn(('test-bucket', key), s3.objects)
+            job = claim_job('test-worker')
+            self.assertTrue(run_job(job))
+        self.assertEqual(s3.objects, {})
+
     def test_file_upload_view(self):
         # Use the updated 'upload_team_file' URL name with team_id
         url = reverse('upload_team_file', args=[self.team.id])
@@ -29,3 +91,435 @@ class CreateTeamViewTest(TestCase):
         response = self.client.post(reverse('create_team'), {'name': 'New Team', 'description': 'A new team'})
         self.assertEqual(response.status_code, 302)  # Redirect after successful creation
         self.assertTrue(Team.objects.filter(name='New Team').exists())
+
+
+class TeamChatUpdatesViewTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password")
+        self.team = Team.objects.create(name="Test Team", created_by=self.user)
+        self.client.login(username="testuser", password="password")
+        self.url = reverse('team_chat_updates', args=[self.team.id])
+
+    def test_returns_only_messages_after_since(self):
+        first = TeamChatMessage.objects.create(team=self.team, user=self.user, message="first")
+        second = TeamChatMessage.objects.create(team=self.team, user=self.user, message="second")
+        response = self.client.get(self.url, {'since': first.id})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([m['id'] for m in data['messages']], [second.id])
+        self.assertEqual(data['messages'][0]['user'], "testuser")
+        self.assertEqual(data['last_id'], second.id)
+        self.assertFalse(data['has_more'])
+
+    def test_no_content_when_nothing_new(self):
+        message = TeamChatMessage.objects.create(team=self.team, user=self.user, message="hello")
+        response = self.client.get(self.url, {'since': message.id})
+        self.assertEqual(response.status_code, 204)
+
+    def test_non_member_is_forbidden(self):
+        User.objects.create_user(username="outsider", password="password")
+        self.client.login(username="outsider", password="password")
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+
+
+class TeamChatHistoryViewTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password")
+        self.team = Team.objects.create(name="Test Team", created_by=self.user)
+        self.client.login(username="testuser", password="password")
+
+    def test_history_pages_walk_back_without_gaps(self):
+        messages = [
+            TeamChatMessage.objects.create(team=self.team, user=self.user, message=f"message {i}")
+            for i in range(5)
+        ]
+        with patch('project_b_07.views.CHAT_PAGE_SIZE', 2):
+            response = self.client.get(reverse('team_chat', args=[self.team.id]))
+            self.assertEqual([m.id for m in response.context['chat_messages']], [m.id for m in messages[3:]])
+            self.assertEqual(response.context['last_message_id'], messages[-1].id)
+
+            seen = []
+            cursor = response.context['older_cursor']
+            while cursor:
+                page = self.client.get(reverse('team_chat_history', args=[self.team.id]), {'before': cursor}).json()
+                seen = [m['id'] for m in page['messages']] + seen
+                cursor = page['next_cursor']
+        self.assertEqual(seen, [m.id for m in messages[:3]])
+
+    def test_chat_page_is_forbidden_to_non_members(self):
+        TeamChatMessage.objects.create(team=self.team, user=self.user, message="members only")
+        User.objects.create_user(username="outsider", password="password")
+        self.client.login(username="outsider", password="password")
+        response = self.client.get(reverse('team_chat', args=[self.team.id]))
+        self.assertEqual(response.status_code, 403)
+        self.assertNotContains(response, "members only", status_code=403)
+
+    def test_non_members_cannot_post_to_the_chat(self):
+        User.objects.create_user(username="outsider", password="password")
+        self.client.login(username="outsider", password="password")
+        response = self.client.post(
+            reverse('post_chat_message', args=[self.team.id]),
+            data='{"message": "hello"}', content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(TeamChatMessage.objects.filter(team=self.team).exists())
+
+    def test_chat_page_uses_constant_queries(self):
+        for i in range(10):
+            TeamChatMessage.objects.create(team=self.team, user=self.user, message=f"message {i}")
+        url = reverse('team_chat', args=[self.team.id])
+        self.client.get(url)  # Warm up the session
+        with self.assertNumQueries(4):  # session, user with profile, team, messages joined with users
+            self.client.get(url)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(reverse('team_chat_history', args=[self.team.id]), {'before': 'garbage'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_cursor_with_wrong_value_types_is_rejected(self):
+        url = reverse('team_chat_history', args=[self.team.id])
+        for cursor in (encode_cursor('x', 'y'), encode_cursor({'dt': 'not a date'}, 1), encode_cursor(timezone.now(), 'x')):
+            self.assertEqual(self.client.get(url, {'before': cursor}).status_code, 400)
+
+
+@override_settings(AWS_STORAGE_BUCKET_NAME='test-bucket')
+class ServeFileViewTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password")
+        self.team = Team.objects.create(name="Test Team", created_by=self.user)
+        self.team_file = TeamFile.objects.create(
+            title="Paper", file="paper.pdf", team=self.team, uploaded_by=self.user
+        )
+        self.client.login(username="testuser", password="password")
+        self.s3 = FakeS3Client()
+        self.s3.put_object(Bucket='test-bucket', Key='paper.pdf', Body=b'%PDF-1.4', ContentType='application/pdf')
+        set_s3_client(self.s3)
+        self.addCleanup(set_s3_client, None)
+        self.url = reverse('serve_file', args=[self.team_file.id])
+
+    @override_settings(FILE_SERVE_MODE='redirect', FILE_PRESIGNED_URL_EXPIRY=60)
+    def test_redirect_mode_returns_presigned_url(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response['Location'].startswith('https://test-bucket.s3.test/paper.pdf?'))
+        self.assertIn('Expires=60', response['Location'])
+        self.assertIn('ResponseContentType=application%2Fpdf', response['Location'])
+        self.assertNotIn(('get_object', 'paper.pdf'), self.s3.calls)
+
+    @override_settings(FILE_SERVE_MODE='proxy')
+    def test_proxy_mode_streams_the_object(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4')
+        self.assertEqual(response['Content-Disposition'], 'inline; filename="Paper"')
+
+    @override_settings(FILE_SERVE_MODE='proxy')
+    def test_proxy_mode_serves_from_disk_cache_after_revalidation(self):
+        with tempfile.TemporaryDirectory() as cache_dir, override_settings(FILE_CACHE_DIR=cache_dir):
+            first = self.client.get(self.url)
+            self.assertEqual(b''.join(first.streaming_content), b'%PDF-1.4')
+            second = self.client.get(self.url)
+            self.assertEqual(b''.join(second.streaming_content), b'%PDF-1.4')
+            stats = get_file_cache().stats()
+
+            # A changed object is fetched again instead of served stale
+            self.s3.put_object(Bucket='test-bucket', Key='paper.pdf', Body=b'%PDF-2.0', ContentType='application/pdf')
+            third = self.client.get(self.url)
+            self.assertEqual(b''.join(third.streaming_content), b'%PDF-2.0')
+        self.assertEqual((stats['misses'], stats['hits'], stats['objects']), (1, 1, 1))
+
+    @override_settings(FILE_SERVE_MODE='proxy')
+    def test_conditional_get_returns_not_modified(self):
+        first = self.client.get(self.url)
+        etag = first['ETag']
+        self.assertEqual(first['Accept-Ranges'], 'bytes')
+        self.assertIn('Last-Modified', first)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.s3.calls[-1], ('head_object', 'paper.pdf'))
+
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(FILE_SERVE_MODE='proxy')
+    def test_single_range_is_fetched_from_s3_as_a_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=1-3')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 1-3/8')
+        self.assertEqual(b''.join(response.streaming_content), b'PDF')
+        self.assertEqual(self.s3.calls[-1], ('get_object', 'paper.pdf', 'bytes=1-3'))
+
+    @override_settings(FILE_SERVE_MODE='proxy')
+    def test_multiple_ranges_and_unsatisfiable_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-0,-2')
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response['Content-Type'].startswith('multipart/byteranges; boundary='))
+        content = b''.join(response.streaming_content)
+        self.assertEqual(len(content), int(response['Content-Length']))
+        self.assertIn(b'Content-Range: bytes 0-0/8\r\n\r\n%', content)
+        self.assertIn(b'Content-Range: bytes 6-7/8\r\n\r\n.4', content)
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=50-60')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */8')
+
+    @override_settings(FILE_SERVE_MODE='proxy')
+    def test_ranges_are_served_from_disk_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir, override_settings(FILE_CACHE_DIR=cache_dir):
+            b''.join(self.client.get(self.url).streaming_content)  # A full download populates the cache
+            response = self.client.get(self.url, HTTP_RANGE='bytes=4-7')
+            self.assertEqual(b''.join(response.streaming_content), b'-1.4')
+        self.assertNotIn(('get_object', 'paper.pdf', 'bytes=4-7'), self.s3.calls)
+
+    def test_non_member_is_redirected_without_signing(self):
+        User.objects.create_user(username="outsider", password="password")
+        self.client.login(username="outsider", password="password")
+        response = self.client.get(self.url)
+        self.assertRedirects(response, reverse('team_list'), fetch_redirect_response=False)
+        self.assertEqual(self.s3.calls, [('put_object', 'paper.pdf')])
+
+
+@override_settings(AWS_STORAGE_BUCKET_NAME='test-bucket', DIRECT_UPLOAD_MAX_BYTES=1024)
+class DirectUploadViewTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password")
+        self.team = Team.objects.create(name="Test Team", created_by=self.user)
+        self.client.login(username="testuser", password="password")
+        self.s3 = FakeS3Client()
+        set_s3_client(self.s3)
+        self.addCleanup(set_s3_client, None)
+
+    def presign(self, **data):
+        payload = {'file_name': 'notes.txt', 'content_type': 'text/plain', 'size': 10}
+        payload.update(data)
+        return self.client.post(
+            reverse('presign_team_upload', args=[self.team.id]), data=payload, content_type='application/json'
+        )
+
+    def test_presign_scopes_key_to_team_and_limits_size(self):
+        response = self.presign()
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertTrue(data['key'].startswith(f"teams/{self.team.id}/"))
+        self.assertTrue(data['key'].endswith('/notes.txt'))
+        self.assertEqual(data['fields']['Content-Type'], 'text/plain')
+
+    def test_presign_rejects_large_or_disallowed_files(self):
+        self.assertEqual(self.presign(size=4096).status_code, 400)
+        self.assertEqual(self.presign(content_type='application/x-msdownload').status_code, 400)
+
+    def test_complete_verifies_object_and_creates_team_file(self):
+        key = self.presign().json()['key']
+        complete_url = reverse('complete_team_upload', args=[self.team.id])
+
+        # Nothing has been uploaded yet
+        self.assertEqual(self.client.post(complete_url, {'key': key}).status_code, 404)
+
+        self.s3.put_object(Bucket='test-bucket', Key=key, Body=b'hello', ContentType='text/plain')
+        response = self.client.post(complete_url, {'key': key, 'title': 'Notes', 'keywords': 'week1'})
+        self.assertEqual(response.status_code, 200)
+        team_file = TeamFile.objects.get(id=response.json()['file_id'])
+        self.assertEqual(team_file.file.name, key)
+        self.assertEqual(team_file.team, self.team)
+        self.assertEqual(team_file.keywords, 'week1')
+
+        # The same upload cannot be recorded twice
+        self.assertEqual(self.client.post(complete_url, {'key': key}).status_code, 409)
+
+    def test_complete_rejects_keys_of_other_teams(self):
+        response = self.client.post(
+            reverse('complete_team_upload', args=[self.team.id]), {'key': 'teams/999/abc/notes.txt'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(AWS_STORAGE_BUCKET_NAME='test-bucket')
+class DownloadTeamFilesViewTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password")
+        self.team = Team.objects.create(name="Test Team", created_by=self.user)
+        self.client.login(username="testuser", password="password")
+        self.s3 = FakeS3Client()
+        set_s3_client(self.s3)
+        self.addCleanup(set_s3_client, None)
+        self.url = reverse('download_team_files', args=[self.team.id])
+
+        self.large = bytes(range(256)) * 1200  # About 300 KB, several chunks
+        for title, key, body, keywords in [
+            ('Paper', 'paper.pdf', self.large, 'physics'),
+            ('Paper', 'paper-v2.pdf', b'%PDF v2', 'physics'),
+            ('Notes', 'notes.txt', b'plain notes ' * 100, 'lab'),
+            ('Missing', 'missing.txt', None, 'lab'),
+        ]:
+            if body is not None:
+                self.s3.put_object(Bucket='test-bucket', Key=key, Body=body)
+            TeamFile.objects.create(title=title, file=key, keywords=keywords, team=self.team, uploaded_by=self.user)
+
+    def download(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        chunks = list(response.streaming_content)
+        return chunks, zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+
+    def test_streams_every_file_into_a_zip(self):
+        chunks, archive = self.download()
+        self.assertEqual(archive.namelist(), ['Paper.pdf', 'Paper (2).pdf', 'Notes.txt'])
+        self.assertEqual(archive.read('Paper.pdf'), self.large)
+        self.assertEqual(archive.read('Notes.txt'), b'plain notes ' * 100)
+        self.assertEqual(archive.getinfo('Notes.txt').compress_type, zipfile.ZIP_DEFLATED)
+        self.assertEqual(archive.getinfo('Paper.pdf').compress_type, zipfile.ZIP_STORED)
+        # Output is flushed chunk by chunk rather than as one buffer
+        self.assertGreater(len(chunks), 4)
+        self.assertLess(max(len(chunk) for chunk in chunks), 128 * 1024)
+
+    def test_keyword_query_narrows_the_archive(self):
+        _, archive = self.download(q='lab')
+        self.assertEqual(archive.namelist(), ['Notes.txt'])
+
+    def test_non_members_are_turned_away(self):
+        User.objects.create_user(username="outsider", password="password")
+        self.client.login(username="outsider", password="password")
+        response = self.client.get(self.url)
+        self.assertRedirects(response, reverse('team_list'), fetch_redirect_response=False)
+
+
+@patch('project_b_07.views.TEAM_PAGE_SIZE', 3)
+class TeamListViewTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password")
+        self.owner = User.objects.create_user(username="owner", password="password")
+        self.teams = [
+            Team.objects.create(name=name, created_by=self.owner)
+            for name in ("alpha", "Beta", "beta", "Gamma", "delta")
+        ]
+        self.own = Team.objects.create(name="Echo", created_by=self.user)
+        TeamMembership.objects.create(user=self.user, team=self.teams[0], status='accepted')
+        TeamMembership.objects.create(user=self.user, team=self.teams[1], status='pending')
+        TeamMembership.objects.create(user=self.owner, team=self.teams[0], status='accepted')
+        TeamFile.objects.create(title="Notes", file='notes.txt', team=self.teams[0], uploaded_by=self.owner)
+        self.client.login(username="testuser", password="password")
+
+    def test_pages_follow_the_cursor_in_name_order(self):
+        first = self.client.get(reverse('team_list'))
+        self.assertEqual([team.name for team in first.context['teams']], ["alpha", "Beta", "beta"])
+        second = self.client.get(reverse('team_list') + '?' + first.context['next_params'])
+        self.assertEqual([team.name for team in second.context['teams']], ["delta", "Echo", "Gamma"])
+        self.assertEqual(second.context['next_params'], '')
+
+    def test_teams_are_annotated_in_the_database(self):
+        teams = {team.name: team for team in self.client.get(reverse('team_list')).context['teams']}
+        self.assertEqual(teams["alpha"].membership_status, 'accepted')
+        self.assertEqual(teams["alpha"].member_count, 2)
+        self.assertEqual(teams["alpha"].file_count, 1)
+        self.assertEqual(teams["Beta"].membership_status, 'pending')
+        self.assertEqual(teams["beta"].member_count, 0)
+        echo = self.client.get(reverse('team_list'), {'q': 'ec'}).context['teams']
+        self.assertEqual([(team.name, team.is_owner) for team in echo], [("Echo", True)])
+
+    def test_cursor_with_wrong_value_types_shows_the_first_page(self):
+        for cursor in (encode_cursor('x', 'y'), encode_cursor(datetime.datetime(2024, 1, 1), 'x'), encode_cursor(1, 2)):
+            response = self.client.get(reverse('team_list'), {'after': cursor})
+            self.assertEqual([team.name for team in response.context['teams']], ["alpha", "Beta", "beta"])
+
+    def test_name_search_pages_keep_the_query(self):
+        first = self.client.get(reverse('team_list'), {'q': 'BE'})
+        self.assertEqual([team.name for team in first.context['teams']], ["Beta", "beta"])
+        self.assertEqual(first.context['next_params'], '')
+
+    def test_constant_queries_per_page(self):
+        for index in range(20):
+            Team.objects.create(name=f"zeta {index}", created_by=self.owner)
+        url = reverse('team_list')
+        self.client.get(url)
+        with self.assertNumQueries(3):  # session, user with profile, the annotated page
+            response = self.client.get(url, {'q': 'zeta'})
+        self.assertEqual(len(response.context['teams']), 3)
+
+
+@patch('project_b_07.public_teams.PUBLIC_TEAM_PAGE_SIZE', 2)
+class PublicTeamListViewTest(TestCase):
+    def setUp(self):
+        # Versions restart with each test's database, unlike the cached pages
+        cache.clear()
+        self.owner = User.objects.create_user(username="owner", password="password", first_name="Ada", last_name="Lovelace")
+        with self.captureOnCommitCallbacks(execute=True):
+            for name in ("Gamma", "alpha", "Beta"):
+                Team.objects.create(name=name, created_by=self.owner)
+        self.url = reverse('public_team_list')
+
+    def test_pages_are_cached_with_public_validators(self):
+        response = self.client.get(self.url)
+        self.assertContains(response, "alpha")
+        self.assertContains(response, "Created by: Ada Lovelace")
+        self.assertNotContains(response, "Gamma")
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('max-age=60', response['Cache-Control'])
+        self.assertTrue(response['ETag'])
+        self.assertTrue(response['Last-Modified'])
+
+        with self.assertNumQueries(2):  # the directory version, once per request
+            cached = self.client.get(self.url)
+            not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+
+    def test_next_page_follows_the_cursor(self):
+        first = self.client.get(self.url)
+        cursor = first.content.decode().split('?after=')[1].split('"')[0]
+        second = self.client.get(self.url + '?after=' + cursor)
+        self.assertContains(second, "Gamma")
+        self.assertNotContains(second, "Beta")
+
+    def test_cursor_with_wrong_value_types_shows_the_first_page(self):
+        first = self.client.get(self.url)
+        for cursor in (encode_cursor('x', 'y'), encode_cursor(True, 1)):
+            response = self.client.get(self.url, {'after': cursor})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.content, first.content)
+
+    def test_creating_and_deleting_teams_invalidates_the_pages(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            team = Team.objects.create(name="Aardvark", created_by=self.owner)
+        response = self.client.get(self.url)
+        self.assertContains(response, "Aardvark")
+        self.assertNotEqual(response['ETag'], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            request_team_deletion(team, self.owner)
+        self.assertNotContains(self.client.get(self.url), "Aardvark")
+
+    def test_changes_made_by_another_process_are_seen(self):
+        response = self.client.get(self.url)
+        # Another worker's change only reaches this one through the database
+        Team.objects.filter(name="alpha").update(name="Aardvark")
+        PublicDirectoryVersion.objects.update(number=F('number') + 1)
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertContains(changed, "Aardvark")
+
+    def test_bursts_of_changes_keep_last_modified_at_the_real_time(self):
+        etag = self.client.get(self.url)['ETag']
+        for _ in range(5):
+            invalidate_public_teams()
+        response = self.client.get(self.url)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertLessEqual(parse_http_date(response['Last-Modified']), time.time())
+
+    def test_renaming_a_creator_invalidates_the_pages(self):
+        self.client.get(self.url)
+        self.owner.first_name = "Grace"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.owner.save()
+        self.assertContains(self.client.get(self.url), "Created by: Grace Lovelace")
+
+    def test_benchmark_command(self):
+        out = io.StringIO()
+        call_command('benchmark_public_teams', '--requests', '5', '--seed', '10', stdout=out)
+        self.assertEqual(out.getvalue().count("requests/s"), 3)
+        self.assertFalse(Team.objects.filter(name__startswith="Benchmark").exists())
@@ -0,0 +1,106 @@
+"""
+Streaming uploads to S3 through boto3's managed transfer.
+
+``upload_fileobj`` reads the source in ``S3_MULTIPART_CHUNKSIZE`` parts and sends up
+to ``S3_UPLOAD_MAX_CONCURRENCY`` of them at once, so memory per upload stays roughly
+``chunksize * concurrency`` no matter how large the file is.
+"""
+
+import logging
+import threading
+import time
+
+from boto3.s3.transfer import TransferConfig
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def get_transfer_config():
+    """
+    Build the TransferConfig used for server-side uploads from the project settings.
+    """
+    return TransferConfig(
+        multipart_threshold=settings.S3_MULTIPART_THRESHOLD,
+        multipart_chunksize=settings.S3_MULTIPART_CHUNKSIZE,
+        max_concurrency=settings.S3_UPLOAD_MAX_CONCURRENCY,
+        use_threads=settings.S3_UPLOAD_MAX_CONCURRENCY > 1,
+    )
+
+
+class UploadProgress:
+    """
+    Transfer callback that records throughput and how long each part-sized slice took.
+    boto3 invokes it from its worker threads with the number of bytes just sent.
+    """
+
+    def __init__(self, part_size):
+        self.part_size = part_size
+        self.bytes_sent = 0
+        self.part_seconds = []
+        self.started = time.monotonic()
+        self.finished = None
+        self._last_mark = self.started
+        self._lock = threading.Lock()
+
+    def __call__(self, bytes_amount):
+        with self._lock:
+            self.bytes_sent += bytes_amount
+            # Parts run concurrently, so a part is counted as done each time another
+            # part_size bytes have been acknowledged in total
+            while self.bytes_sent >= (len(self.part_seconds) + 1) * self.part_size:
+                self._mark_part()
+
+    def _mark_part(self):
+        now = time.monotonic()
+        self.part_seconds.append(now - self._last_mark)
+        self._last_mark = now
+
+    def finish(self):
+        """
+        Close the measurement, counting any trailing partial part.
+        """
+        with self._lock:
+            if self.bytes_sent > len(self.part_seconds) * self.part_size:
+                self._mark_part()
+            self.finished = time.monotonic()
+
+    @property
+    def seconds(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def throughput(self):
+        """
+        Average upload rate in bytes per second.
+        """
+        return self.bytes_sent / self.seconds if self.seconds > 0 else 0.0
+
+    def as_dict(self):
+        return {
+            'bytes': self.bytes_sent,
+            'seconds': round(self.seconds, 3),
+            'bytes_per_second': round(self.throughput, 1),
+            'part_seconds': [round(seconds, 3) for seconds in self.part_seconds],
+        }
+
+
+def stream_upload(s3_client, fileobj, key, content_type, bucket=None):
+    """
+    Upload a file-like object to S3 without reading it into memory.
+    Returns the UploadProgress describing the transfer.
+    """
+    config = get_transfer_config()
+    progress = UploadProgress(config.multipart_chunksize)
+    fileobj.seek(0)
+    s3_client.upload_fileobj(
+        fileobj,
+        bucket or settings.AWS_STORAGE_BUCKET_NAME,
+        key,
+        ExtraArgs={'ContentType': content_type},
+        Callback=progress,
+        Config=config,
+    )
+    progress.finish()
+    logger.info("Uploaded %s to S3: %s", key, progress.as_dict())
+    return progress
@@ -25,17 +25,28 @@ urlpatterns = [
     # Uploads
     path('upload-confirmation/<str:file_name>/', upload_confirmation, name='upload_confirmation'),
     
+    # Search across all of the user's teams
+    path('search/', views.search, name='search'),
+
     # Teams
     path('teams/', team_list, name='team_list'),
     path('teams/create/', create_team, name='create_team'),
     path('teams/<int:team_id>/join/', join_team, name='join_team'),
     path('teams/<int:team_id>/', team_detail, name='team_detail'),
     path('teams/<int:team_id>/upload/', upload_team_file, name='upload_team_file'),
+    path('teams/<int:team_id>/upload/bulk/', views.bulk_upload_team_files, name='bulk_upload_team_files'),
+    path('teams/<int:team_id>/upload/presign/', views.presign_team_upload, name='presign_team_upload'),
+    path('teams/<int:team_id>/upload/complete/', views.complete_team_upload, name='complete_team_upload'),
     path('teams/<int:team_id>/files/', view_team_files, name='view_team_files'),
+    path('teams/<int:team_id>/files/download/', views.download_team_files, name='download_team_files'),
+    path('teams/<int:team_id>/tags/autocomplete/', views.autocomplete_team_tags, name='autocomplete_team_tags'),
     path('teams/<int:team_id>/delete/', delete_team, name='delete_team'),
     path('teams/<int:team_id>/leave/', views.leave_team, name='leave_team'),
     path('team/<int:team_id>/chat/', views.team_chat, name='team_chat'),
     path('team/<int:team_id>/chat/post/', views.post_chat_message, name='post_chat_message'),
+    path('team/<int:team_id>/chat/updates/', views.team_chat_updates, name='team_chat_updates'),
+    path('team/<int:team_id>/chat/stream/', views.team_chat_stream, name='team_chat_stream'),
+    path('team/<int:team_id>/chat/history/', views.team_chat_history, name='team_chat_history'),
 
     # Membership requests
     path('teams/<int:team_id>/membership/<int:membership_id>/accept/', views.accept_membership_request, name='accept_membership_request'),
@@ -43,6 +54,8 @@ urlpatterns = [
     
     # File preview and serving
     path('file/serve/<int:file_id>/', serve_file, name='serve_file'),  # New URL pattern for serving files
+    path('file/preview/<int:file_id>/', views.serve_preview, name='serve_preview'),
+    path('file/cache/stats/', views.file_cache_stats, name='file_cache_stats'),
     
     # Roadmap
     path('roadmap/', include('roadmap.urls')),
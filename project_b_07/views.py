@@ -1,17 +1,51 @@
-import boto3, os, json
+import asyncio, logging, os, json, uuid
+from datetime import datetime
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponse, FileResponse, JsonResponse, HttpResponseForbidden
+from django.http import Http404, HttpResponse, FileResponse, JsonResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import BooleanField, Count, ExpressionWrapper, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Lower
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.conf import settings
 from botocore.exceptions import ClientError
-from urllib.parse import quote
-from django.views.generic import ListView
+from urllib.parse import quote, urlencode
+from django.views.generic import View
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.models import AnonymousUser
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 
-from .forms import TeamCreationForm, TeamFileUploadForm, Team
+from .forms import TeamCreationForm, TeamFileUploadForm, DirectUploadCompleteForm, BulkUploadForm, Team
 from .models import Team, TeamMembership, TeamFile, TeamChatMessage
+from .blobs import release_blob, store_file
+from .bulk_upload import BulkUploadError, bulk_store, collect_entries
+from .chat_bus import get_chat_bus
+from .pagination import encode_cursor, decode_cursor
+from .public_teams import public_team_page
+from .access import get_access
+from .file_cache import get_file_cache
+from .global_search import SearchPage, global_search
+from .http_ranges import content_range, multipart_byteranges, parse_range_header, range_applies, read_chunks
+from .search import highlight, prefix_q, search_files, with_snippets
+from .storage import get_s3_client
+from .tags import autocomplete_tags, normalize_tag, team_facets
+from .team_deletion import request_team_deletion
+from .zip_stream import ZipEntry, stream_zip, unique_name
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of messages returned by a single chat update poll
+CHAT_UPDATES_LIMIT = 100
+# Number of chat messages rendered on page load and returned per history page
+CHAT_PAGE_SIZE = 50
+# Number of teams listed per page of the team list
+TEAM_PAGE_SIZE = 50
+# Seconds between keep-alive comments on an idle chat stream
+CHAT_STREAM_HEARTBEAT = 25
 
 '''
 *  REFERENCES
@@ -32,15 +66,21 @@ from .models import Team, TeamMembership, TeamFile, TeamChatMessage
 '''
 
 # Public view for Anonymous Users
-class PublicTeamListView(ListView):
-    model = Team
-    template_name = 'public_team_list.html'  # Create a separate template
-    context_object_name = 'teams'
-
-    def get_queryset(self):
-        # Return all teams; limit the information exposed in the template
-        return Team.objects.all().select_related('created_by')
-    
+class PublicTeamListView(View):
+    """
+    The public team directory, served from the cache with validators for shared caches (see public_teams.py).
+    """
+
+    def get(self, request):
+        page = public_team_page(request.GET.get('after'))
+        response = get_conditional_response(request, etag=page.etag, last_modified=page.last_modified)
+        if response is None:
+            response = HttpResponse(page.body)
+        response['ETag'] = page.etag
+        response['Last-Modified'] = http_date(page.last_modified)
+        patch_cache_control(response, public=True, max_age=settings.PUBLIC_TEAMS_MAX_AGE)
+        return response
+
 
 @login_required
 def moderate_project(request, team_id):
@@ -48,9 +88,8 @@ def moderate_project(request, team_id):
     Allow PMA Administrators to moderate a team (e.g., delete files or entire teams).
     """
     team = get_object_or_404(Team, id=team_id)
-    user_profile = request.user.profile
 
-    if user_profile.role != 'admin':
+    if not get_access(request).is_admin:
         messages.error(request, "You do not have permission to moderate this team.")
         return redirect('team_detail', team_id=team.id)
 
@@ -86,8 +125,7 @@ def create_team(request):
     Allow only Common Users to create a new team.
     PMA Administrators are restricted from creating teams.
     """
-    user_profile = request.user.profile
-    if user_profile.role != 'common':
+    if not get_access(request).is_common:
         messages.error(request, "You do not have permission to create a team.")
         return redirect('team_list')  # Redirect to the team list page
 
@@ -111,20 +149,78 @@ def create_team(request):
     return render(request, "create_team.html", {"form": form})
 
 
+@login_required
+def search(request):
+    """
+    Search files, chat messages and milestones across every team the user can see.
+    Responds with JSON for API clients, a results page otherwise.
+    """
+    query = request.GET.get('q', '').strip()
+    try:
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        page = 1
+    results = global_search(get_access(request), query, page) if query else SearchPage([], 1, has_next=False)
+
+    if 'application/json' in request.headers.get('Accept', ''):
+        return JsonResponse({
+            'query': query,
+            'page': results.page,
+            'has_next': results.has_next,
+            'timed_out': results.timed_out,
+            'results': [result.as_dict() for result in results.results],
+        })
+    return render(request, 'search.html', {'query': query, 'results': results})
+
+
 @login_required
 def team_list(request):
     """
-    Display a list of all teams and annotate each team with the user's membership status.
+    Display a page of teams, in name order, annotated with the user's membership status,
+    ownership and the member and file counts. Pages follow an ``after`` cursor on
+    (lowercased name, id) and ``q`` narrows the list to names starting with it, both read
+    from the matching index, so every page costs the same few queries.
     """
-    teams = Team.objects.all()
-    user_memberships = TeamMembership.objects.filter(user=request.user)
-    # Create a mapping of team IDs to membership statuses
-    memberships = {membership.team_id: membership.status for membership in user_memberships}
-    # Annotate each team with the user's membership status and ownership
-    for team in teams:
-        team.membership_status = memberships.get(team.id)
-        team.is_owner = team.created_by == request.user
-    return render(request, 'team_list.html', {'teams': teams})
+    query = request.GET.get('q', '').strip()
+    teams = _annotate_team_list(Team.objects.annotate(name_key=Lower('name')), request.user)
+    if query:
+        teams = teams.filter(prefix_q(query.lower(), 'name_key'))
+    cursor = decode_cursor(request.GET.get('after'), str, int)
+    if cursor is not None:
+        after_name, after_id = cursor
+        teams = teams.filter(Q(name_key__gt=after_name) | Q(name_key=after_name, id__gt=after_id))
+
+    teams = list(teams.order_by('name_key', 'id')[:TEAM_PAGE_SIZE + 1])
+    next_cursor = None
+    if len(teams) > TEAM_PAGE_SIZE:
+        teams = teams[:TEAM_PAGE_SIZE]
+        next_cursor = encode_cursor(teams[-1].name_key, teams[-1].id)
+    params = {'q': query} if query else {}
+    return render(request, 'team_list.html', {
+        'teams': teams,
+        'query': query,
+        'next_params': urlencode({**params, 'after': next_cursor}) if next_cursor else '',
+        'first_params': urlencode(params) if cursor is not None else None,
+    })
+
+
+def _annotate_team_list(teams, user):
+    """
+    Annotate ``membership_status``, ``is_owner``, ``member_count`` and ``file_count``
+    as subqueries, so the list needs no query per team.
+    """
+    membership = TeamMembership.objects.filter(team=OuterRef('pk'), user_id=user.id)
+    members = (
+        TeamMembership.objects.filter(team=OuterRef('pk'), status='accepted')
+        .order_by().values('team').annotate(count=Count('pk')).values('count')
+    )
+    files = TeamFile.objects.filter(team=OuterRef('pk')).order_by().values('team').annotate(count=Count('pk')).values('count')
+    return teams.annotate(
+        membership_status=Subquery(membership.values('status')[:1]),
+        is_owner=ExpressionWrapper(Q(created_by_id=user.id), output_field=BooleanField()),
+        member_count=Coalesce(Subquery(members), 0),
+        file_count=Coalesce(Subquery(files), 0),
+    )
 
 
 @login_required
@@ -134,7 +230,7 @@ def join_team(request, team_id):
     """
     team = get_object_or_404(Team, id=team_id)
     # Prevent the owner from rejoining their own team
-    if team.created_by == request.user:
+    if get_access(request).is_owner(team):
         messages.info(request, "You are the owner of this team.")
         return redirect('team_detail', team_id=team.id)
 
@@ -163,22 +259,20 @@ def team_detail(request, team_id):
     Display detailed information about a team, including files and members if the user is a member, owner, or PMA Administrator.
     """
     team = get_object_or_404(Team, id=team_id)
-    user = request.user
-    is_owner = team.created_by == user
-
-    # Check if the user is a PMA Administrator
-    user_profile = request.user.profile
-    is_pma_admin = user_profile.role == 'admin'
-
-    # Check if the user has an existing membership
-    membership = TeamMembership.objects.filter(user=user, team=team).first()
-    is_member = (membership.status == 'accepted' if membership else False) or is_owner or is_pma_admin  # Include PMA Admins
+    access = get_access(request)
+    is_owner = access.is_owner(team)
+    is_pma_admin = access.is_admin
+    is_member = access.can_view(team)  # Includes PMA Admins
 
     # Handle file filtering based on the search query
-    files = team.files.all()
     query = request.GET.get('q', '').strip()
+    selected_tags = _selected_tags(request)
+    files = _filter_team_files(team.files.select_related('uploaded_by', 'preview'), query, selected_tags)
     if query:
-        files = files.filter(keywords__icontains=query)  # Case-insensitive keyword search
+        # Matching excerpts of the extracted content, from the database rather than S3
+        files = list(with_snippets(files, query))
+        for team_file in files:
+            team_file.snippet = highlight(team_file.snippet_text, query)
 
     members = team.memberships.filter(status='accepted').select_related('user') if is_member else None
     pending_requests = team.memberships.filter(status='pending').select_related('user') if is_owner or is_pma_admin else None
@@ -191,63 +285,103 @@ def team_detail(request, team_id):
         'files': files,
         'members': members,
         'pending_requests': pending_requests,
-        'membership': membership,
+        'membership_status': access.status(team),
         'query': query,  # Pass the query back to the template
+        'selected_tags': selected_tags,
+        'facets': _tag_facets(team, query, selected_tags),
+        'filter_params': urlencode({'q': query, 'tag': selected_tags}, doseq=True),
+        'form': TeamFileUploadForm(),  # Upload form shown to members
     })
 
 
 
+def _filter_team_files(files, query, tag_names=()):
+    """
+    Narrow a team's files to those carrying every selected tag and matching the ``q``
+    search of the team page, best matches first.
+    """
+    for name in tag_names:
+        files = files.filter(tags__name=name)
+    if query:
+        files = search_files(files, query)  # Prefix match on every word of title, keywords and description
+    return files
+
+
+def _selected_tags(request):
+    """
+    The distinct, normalised ``tag`` parameters of the request.
+    """
+    return list(dict.fromkeys(filter(None, map(normalize_tag, request.GET.getlist('tag')))))
+
+
+def _tag_facets(team, query, selected_tags):
+    """
+    The team's most used tags with their counters, each with the query string that toggles it.
+    """
+    facets = []
+    for tag in team_facets(team):
+        selected = tag.name in selected_tags
+        names = [name for name in selected_tags if name != tag.name] if selected else selected_tags + [tag.name]
+        facets.append({
+            'name': tag.name,
+            'count': tag.file_count,
+            'selected': selected,
+            'params': urlencode({'q': query, 'tag': names}, doseq=True),
+        })
+    return facets
+
+
+@login_required
+def autocomplete_team_tags(request, team_id):
+    """
+    Return the team's tags starting with ``q`` as JSON, most used first.
+    """
+    team = get_object_or_404(Team, id=team_id)
+    if not get_access(request).can_view(team):
+        return JsonResponse({'error': 'You do not have access to this team.'}, status=403)
+    tags = autocomplete_tags(team, request.GET.get('q', ''))
+    return JsonResponse({'tags': [{'name': tag.name, 'count': tag.file_count} for tag in tags]})
+
+
 @login_required
 def upload_team_file(request, team_id):
     """
     Handle file uploads to a team by checking membership status and uploading to S3.
     """
     team = get_object_or_404(Team, id=team_id)
-    is_owner = team.created_by == request.user
-    is_member = TeamMembership.objects.filter(
-        user=request.user, team=team, status='accepted'
-    ).exists() or is_owner
 
-    if not is_member:
+    if not get_access(request).can_contribute(team):
         messages.error(request, "You are not an accepted member of this team.")
         return redirect('team_detail', team_id=team.id)
     if request.method == 'POST':
         form = TeamFileUploadForm(request.POST, request.FILES)
         if form.is_valid():
-            team_file = TeamFile(
-                title=form.cleaned_data['title'],
-                file=form.cleaned_data['file'],
-                description=form.cleaned_data['description'],
-                keywords=form.cleaned_data['keywords'],
-                uploaded_by=request.user,
-                team=team
-            )
+            uploaded_file = form.cleaned_data['file']
 
             # Generate and encode file name
-            file_name = os.path.basename(team_file.file.name)
-            file_name_encoded = quote(file_name)
-
-            # Create S3 client for file upload
-            s3_client = boto3.client(
-                's3',
-                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                region_name=settings.AWS_S3_REGION_NAME,
-            )
+            file_name = os.path.basename(uploaded_file.name)
 
             try:
-                # Read file content and upload to S3
-                file_content = team_file.file.open('rb').read()
-
-                s3_client.put_object(
-                    Bucket=settings.AWS_STORAGE_BUCKET_NAME,
-                    Key=file_name,
-                    Body=file_content,
-                    ContentType=request.FILES['file'].content_type,
+                # Hash the file and stream it to S3 under its content address, unless the
+                # same bytes are already stored
+                blob, uploaded = store_file(uploaded_file, uploaded_file.content_type)
+
+                # Save the file entry to the database after successful upload. The row points at the
+                # stored object, so the storage backend does not upload the bytes a second time.
+                team_file = TeamFile(
+                    title=form.cleaned_data['title'],
+                    file=blob.key,
+                    blob=blob,
+                    description=form.cleaned_data['description'],
+                    keywords=form.cleaned_data['keywords'],
+                    uploaded_by=request.user,
+                    team=team
                 )
-
-                # Save the file entry to the database after successful upload
-                team_file.save()
+                try:
+                    team_file.save()
+                except Exception:
+                    release_blob(blob.id)
+                    raise
                 messages.success(request, "File uploaded successfully.")
                 return redirect('team_detail', team_id=team.id)
 
@@ -257,21 +391,157 @@ def upload_team_file(request, team_id):
                 return render(request, 'upload_team_file.html', {'form': form, 'error': str(e), 'team': team})
     else:
         form = TeamFileUploadForm()  # Display an empty form for GET requests
-    files = team.files.all()
+    files = team.files.select_related('uploaded_by', 'preview')
     return render(request, 'upload_team_file.html', {'form': form, 'team': team, 'files': files})
 
 
+@login_required
+def bulk_upload_team_files(request, team_id):
+    """
+    Upload many files, or one zip archive, to a team in a single request.
+    Responds with per-file results: JSON for API clients, a results page otherwise.
+    """
+    team = get_object_or_404(Team, id=team_id)
+    wants_json = 'application/json' in request.headers.get('Accept', '')
+
+    if not get_access(request).can_contribute(team):
+        if wants_json:
+            return JsonResponse({'error': 'You are not an accepted member of this team.'}, status=403)
+        messages.error(request, "You are not an accepted member of this team.")
+        return redirect('team_detail', team_id=team.id)
+
+    results = None
+    error = None
+    if request.method == 'POST':
+        form = BulkUploadForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                entries = collect_entries(form.cleaned_data['files'])
+                results = bulk_store(
+                    entries, team, request.user,
+                    description=form.cleaned_data['description'],
+                    keywords=form.cleaned_data['keywords'],
+                )
+            except BulkUploadError as e:
+                error = str(e)
+        elif wants_json:
+            return JsonResponse({'errors': form.errors}, status=400)
+    else:
+        form = BulkUploadForm()
+
+    if wants_json:
+        if error:
+            return JsonResponse({'error': error}, status=400)
+        if results is None:
+            return JsonResponse({'error': 'Invalid request method'}, status=405)
+        created = sum(result['status'] == 'created' for result in results)
+        return JsonResponse({'created': created, 'results': results}, status=201 if created else 400)
+    return render(request, 'bulk_upload_team_files.html', {
+        'form': form, 'team': team, 'results': results, 'error': error,
+    })
+
+
+@login_required
+def presign_team_upload(request, team_id):
+    """
+    Issue a presigned POST policy so the browser can upload a file straight to S3.
+    The policy pins the object key under the team's prefix and enforces the content
+    type and size limits, so the bytes never pass through a web worker.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid request method.'}, status=400)
+    team = get_object_or_404(Team, id=team_id)
+    if not get_access(request).can_contribute(team):
+        return JsonResponse({'error': 'You are not an accepted member of this team.'}, status=403)
+
+    try:
+        data = json.loads(request.body)
+        file_name = os.path.basename(str(data.get('file_name', ''))).strip()
+        content_type = str(data.get('content_type', ''))
+        size = int(data.get('size', 0))
+    except (json.JSONDecodeError, TypeError, ValueError):
+        return JsonResponse({'error': 'Invalid JSON data.'}, status=400)
+
+    if not file_name:
+        return JsonResponse({'error': 'A file name is required.'}, status=400)
+    if content_type not in settings.ALLOWED_UPLOAD_CONTENT_TYPES:
+        return JsonResponse({'error': 'This file type is not allowed.'}, status=400)
+    if not 0 < size <= settings.DIRECT_UPLOAD_MAX_BYTES:
+        return JsonResponse({'error': 'The file is empty or too large.'}, status=400)
+
+    key = f"{_team_upload_prefix(team)}{uuid.uuid4().hex}/{file_name}"
+    presigned = get_s3_client().generate_presigned_post(
+        Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+        Key=key,
+        Fields={'Content-Type': content_type},
+        Conditions=[
+            {'Content-Type': content_type},
+            ['content-length-range', 1, settings.DIRECT_UPLOAD_MAX_BYTES],
+        ],
+        ExpiresIn=settings.DIRECT_UPLOAD_EXPIRY,
+    )
+    return JsonResponse({'url': presigned['url'], 'fields': presigned['fields'], 'key': key})
+
+
+@login_required
+def complete_team_upload(request, team_id):
+    """
+    Record a file the browser uploaded directly to S3.
+    The object is checked with a HEAD request before the TeamFile row is created.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid request method.'}, status=400)
+    team = get_object_or_404(Team, id=team_id)
+    if not get_access(request).can_contribute(team):
+        return JsonResponse({'error': 'You are not an accepted member of this team.'}, status=403)
+
+    form = DirectUploadCompleteForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'error': 'Invalid upload details.', 'errors': form.errors}, status=400)
+    key = form.cleaned_data['key']
+
+    # Only keys issued for this team can be claimed
+    if not key.startswith(_team_upload_prefix(team)) or '..' in key:
+        return JsonResponse({'error': 'Invalid upload key.'}, status=400)
+    if TeamFile.objects.filter(file=key).exists():
+        return JsonResponse({'error': 'This upload has already been recorded.'}, status=409)
+
+    try:
+        head = get_s3_client().head_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=key)
+    except ClientError:
+        return JsonResponse({'error': 'The uploaded file could not be found.'}, status=404)
+    if head['ContentLength'] > settings.DIRECT_UPLOAD_MAX_BYTES or \
+            head.get('ContentType') not in settings.ALLOWED_UPLOAD_CONTENT_TYPES:
+        return JsonResponse({'error': 'The uploaded file does not match the upload policy.'}, status=400)
+
+    team_file = TeamFile.objects.create(
+        title=form.cleaned_data['title'] or os.path.basename(key),
+        file=key,
+        description=form.cleaned_data['description'],
+        keywords=form.cleaned_data['keywords'],
+        uploaded_by=request.user,
+        team=team,
+    )
+    messages.success(request, "File uploaded successfully.")
+    return JsonResponse({'success': True, 'file_id': team_file.id})
+
+
+def _team_upload_prefix(team):
+    """
+    S3 key prefix under which direct uploads for a team are stored.
+    """
+    return f"teams/{team.id}/"
+
+
 @login_required
 def view_team_files(request, team_id):
     """
     View to list all files associated with a specific team if the user is a member.
     """
     team = get_object_or_404(Team, id=team_id)
-    user_profile = request.user.profile
-    is_pma_admin = user_profile.role == 'admin'
-    membership = TeamMembership.objects.filter(user=request.user, team=team).exists()
+    access = get_access(request)
 
-    if not is_pma_admin or not membership:
+    if not access.is_admin or access.status(team) is None:
         messages.error(request, "You are not a member of this team.")
         return redirect('team_list')
 
@@ -286,11 +556,11 @@ def delete_team(request, team_id):
     Allow PMA Administrators to delete any team.
     """
     team = get_object_or_404(Team, id=team_id)
-    user_profile = request.user.profile
 
     # Check if the user is the team owner or a PMA Administrator
-    if team.created_by == request.user or user_profile.role == 'admin':
-        team.delete()
+    if get_access(request).can_manage(team):
+        # Hidden right away; its data is removed in the background
+        request_team_deletion(team, request.user)
         messages.success(request, f"Team '{team.name}' has been deleted.")
         return redirect('team_list')
     else:
@@ -304,9 +574,8 @@ def accept_membership_request(request, team_id, membership_id):
     """
     team = get_object_or_404(Team, id=team_id)
     membership = get_object_or_404(TeamMembership, id=membership_id, team=team, status='pending')
-    user_profile = request.user.profile
 
-    if not (team.created_by == request.user):
+    if not get_access(request).is_owner(team):
         messages.error(request, "You do not have permission to accept membership requests.")
         return redirect('team_detail', team_id=team.id)
 
@@ -322,9 +591,8 @@ def reject_membership_request(request, team_id, membership_id):
     """
     team = get_object_or_404(Team, id=team_id)
     membership = get_object_or_404(TeamMembership, id=membership_id, team=team, status='pending')
-    user_profile = request.user.profile
 
-    if not (team.created_by == request.user):
+    if not get_access(request).is_owner(team):
         messages.error(request, "You do not have permission to reject membership requests.")
         return redirect('team_detail', team_id=team.id)
 
@@ -341,36 +609,262 @@ def serve_file(request, file_id):
     PMA Administrators can access any file.
     Common Users can access files within their teams.
     """
-    team_file = get_object_or_404(TeamFile, id=file_id)
-    user_profile = request.user.profile
-
-    # PMA Administrators can access any file
-    if user_profile.role != 'admin':
-        # Check if the user is a member or the owner of the team
-        is_member = TeamMembership.objects.filter(user=request.user, team=team_file.team, status='accepted').exists()
-        is_owner = team_file.team.created_by == request.user
-        if not (is_member or is_owner):
-            messages.error(request, "You do not have permission to access this file.")
-            return redirect('team_list')
-
-    # Initialize an S3 client
-    s3 = boto3.client(
-        's3',
-        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-        region_name=settings.AWS_S3_REGION_NAME
+    team_file = get_object_or_404(TeamFile.objects.select_related('team', 'blob'), id=file_id, team__deleting_at__isnull=True)
+    if not get_access(request).can_view(team_file.team):
+        messages.error(request, "You do not have permission to access this file.")
+        return redirect('team_list')
+
+    # Shared S3 client
+    s3 = get_s3_client()
+    content_disposition = f'inline; filename="{quote(team_file.title)}"'
+
+    if settings.FILE_SERVE_MODE == 'redirect':
+        # Send the browser straight to S3 with a short-lived signed URL so the
+        # transfer does not occupy a worker
+        url = s3.generate_presigned_url(
+            'get_object',
+            Params={
+                'Bucket': settings.AWS_STORAGE_BUCKET_NAME,
+                'Key': team_file.file.name,
+                'ResponseContentDisposition': content_disposition,
+                'ResponseContentType': team_file.get_content_type(),
+            },
+            ExpiresIn=settings.FILE_PRESIGNED_URL_EXPIRY,
+        )
+        return redirect(url)
+
+    return _serve_proxied(request, s3, team_file.file.name, content_disposition)
+
+
+@login_required
+def download_team_files(request, team_id):
+    """
+    Stream a zip of a team's files, optionally narrowed by the team page's search and tag filters.
+    Objects are copied from S3 into the archive chunk by chunk, so memory use does not
+    grow with the size of the files.
+    """
+    team = get_object_or_404(Team, id=team_id)
+    if not get_access(request).can_view(team):
+        messages.error(request, "You do not have permission to access this file.")
+        return redirect('team_list')
+
+    query = request.GET.get('q', '').strip()
+    files = _filter_team_files(team.files.select_related('blob'), query, _selected_tags(request)).order_by('id')
+    s3 = get_s3_client()
+
+    def opener(key):
+        def open_object():
+            obj = s3.get_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=key)
+            return obj['Body'], obj['ContentLength'], obj['LastModified']
+        return open_object
+
+    # Rows are read up front; only the S3 transfers happen while streaming
+    used_names = set()
+    entries = []
+    for team_file in files:
+        name = team_file.title
+        ext = os.path.splitext(team_file.file.name)[1]
+        if ext and not name.lower().endswith(ext.lower()):
+            name += ext
+        entries.append(ZipEntry(
+            unique_name(name.replace('/', '_'), used_names), team_file.get_content_type(), opener(team_file.file.name),
+        ))
+
+    content = stream_zip(entries)
+    if isinstance(request, ASGIRequest):
+        content = _iterate_in_thread(content)
+    response = StreamingHttpResponse(content, content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{quote(team.name)}.zip"'
+    return response
+
+
+async def _iterate_in_thread(iterator):
+    """
+    Pull a blocking iterator one item at a time from a worker thread. Django would
+    otherwise read a synchronous streaming body into memory whole under ASGI.
+    """
+    done = object()
+    while True:
+        chunk = await sync_to_async(next, thread_sensitive=False)(iterator, done)
+        if chunk is done:
+            return
+        yield chunk
+
+
+@login_required
+def serve_preview(request, file_id):
+    """
+    Redirect to the thumbnail generated for a team file. The redirect may be cached by the
+    browser for as long as the signed URL is valid, so a team page with many files only
+    fetches each small thumbnail once.
+    """
+    team_file = get_object_or_404(TeamFile.objects.select_related('team', 'preview'), id=file_id, team__deleting_at__isnull=True)
+    if not get_access(request).can_view(team_file.team):
+        return HttpResponseForbidden("You do not have permission to access this file.")
+    preview = getattr(team_file, 'preview', None)
+    if preview is None or not preview.image_key:
+        raise Http404("No preview is available for this file.")
+
+    url = get_s3_client().generate_presigned_url(
+        'get_object',
+        Params={
+            'Bucket': settings.AWS_STORAGE_BUCKET_NAME,
+            'Key': preview.image_key,
+            'ResponseContentType': 'image/jpeg',
+        },
+        ExpiresIn=settings.FILE_PRESIGNED_URL_EXPIRY,
     )
+    response = redirect(url)
+    # Stop reusing the redirect a little before the signature expires
+    patch_cache_control(response, private=True, max_age=max(settings.FILE_PRESIGNED_URL_EXPIRY - 30, 0))
+    return response
+
+
+def _serve_proxied(request, s3, key, content_disposition):
+    """
+    Stream an S3 object through the worker, answering conditional requests with 304
+    and Range requests with 206 without downloading the bytes that were not asked for.
+    """
+    cache = get_file_cache()
+    cached = cache.get(key) if cache else None
+    wants_part = 'Range' in request.headers or 'If-None-Match' in request.headers or \
+        'If-Modified-Since' in request.headers
+    bucket = settings.AWS_STORAGE_BUCKET_NAME
 
     try:
-        # Retrieve the file from the S3 bucket
-        file_obj = s3.get_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=team_file.file.name)
-        response = FileResponse(file_obj['Body'], content_type=file_obj['ContentType'])
-        response['Content-Disposition'] = f'inline; filename="{quote(team_file.title)}"'
-        return response
+        if cached:
+            # Only confirm the cached copy is still current
+            try:
+                file_obj = s3.get_object(Bucket=bucket, Key=key, IfNoneMatch=cached.etag)
+            except ClientError as e:
+                if not _is_not_modified(e):
+                    raise
+                cache.record_hit()
+                file_obj = None
+            else:
+                cache.record_revalidation()
+        elif wants_part:
+            # Metadata is enough to answer the validators; ranges are fetched below
+            file_obj = s3.head_object(Bucket=bucket, Key=key)
+        else:
+            file_obj = s3.get_object(Bucket=bucket, Key=key)
     except ClientError as e:
-        print(f"Failed to retrieve file from S3: {e}")
+        logger.warning("Failed to retrieve %s from S3: %s", key, e)
         return HttpResponse("File not found.", status=404)
 
+    body = file_obj.get('Body') if file_obj else None
+    if body is not None and cache and file_obj['ContentLength'] <= settings.FILE_CACHE_MAX_OBJECT_BYTES:
+        # Copy into the local cache and serve from disk so the server can use sendfile
+        cached = cache.put(
+            key, body, file_obj.get('ETag'), file_obj['ContentType'],
+            last_modified=int(file_obj['LastModified'].timestamp()) if file_obj.get('LastModified') else None,
+        )
+        body = None
+    elif file_obj is not None:
+        cached = None  # The cached copy is stale and the new version is not cacheable
+
+    if cached:
+        etag, last_modified, size, content_type = cached.etag, cached.last_modified, cached.size, cached.content_type
+    else:
+        etag = file_obj.get('ETag')
+        last_modified = int(file_obj['LastModified'].timestamp()) if file_obj.get('LastModified') else None
+        size, content_type = file_obj['ContentLength'], file_obj['ContentType']
+
+    def with_headers(response):
+        response['Accept-Ranges'] = 'bytes'
+        response['Cache-Control'] = 'private, no-cache'
+        response['Content-Disposition'] = content_disposition
+        if etag:
+            response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    # If-None-Match / If-Modified-Since
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    ranges = None
+    if not_modified is None and range_applies(request.headers.get('If-Range'), etag, last_modified):
+        ranges = parse_range_header(request.headers.get('Range'), size)
+
+    if not_modified is None and ranges is None:
+        # Full body
+        if body is None:
+            body = cached.open() if cached else s3.get_object(Bucket=bucket, Key=key)['Body']
+        response = FileResponse(body, content_type=content_type)
+        response['Content-Length'] = size
+        return with_headers(response)
+
+    if body is not None:
+        body.close()
+    if not_modified is not None or not ranges:
+        if cached:
+            cached.release()
+        if not_modified is not None:
+            return with_headers(not_modified)
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f"bytes */{size}"
+        return with_headers(response)
+
+    # One handle serves every range of a cached file, even if the entry is evicted meanwhile
+    handle = cached.open() if cached else None
+
+    def open_range(start, end):
+        if handle is not None:
+            handle.seek(start)
+            return read_chunks(handle, end - start + 1, close=False)
+        # Ask S3 for exactly the requested bytes of the version whose metadata we used
+        conditions = {'IfMatch': etag} if etag else {}
+        part = s3.get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{end}", **conditions)
+        return read_chunks(part['Body'], end - start + 1)
+
+    def closing(iterable):
+        try:
+            yield from iterable
+        finally:
+            if handle is not None:
+                handle.close()
+
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        try:
+            part = open_range(start, end)
+        except ClientError as e:
+            logger.warning("Failed to retrieve bytes %s-%s of %s from S3: %s", start, end, key, e)
+            return HttpResponse("File not found.", status=404)
+        response = StreamingHttpResponse(closing(part), status=206, content_type=content_type)
+        response['Content-Range'] = content_range(start, end, size)
+        response['Content-Length'] = end - start + 1
+        return with_headers(response)
+
+    boundary = uuid.uuid4().hex
+    parts, length = multipart_byteranges(ranges, size, content_type, boundary, open_range)
+    response = StreamingHttpResponse(
+        closing(parts), status=206, content_type=f"multipart/byteranges; boundary={boundary}"
+    )
+    response['Content-Length'] = length
+    return with_headers(response)
+
+
+def _is_not_modified(error):
+    """
+    True when a conditional S3 request failed only because the object is unchanged.
+    """
+    return error.response.get('ResponseMetadata', {}).get('HTTPStatusCode') == 304 or \
+        error.response.get('Error', {}).get('Code') in ('304', 'NotModified')
+
+
+@login_required
+def file_cache_stats(request):
+    """
+    Report this worker's file cache counters to PMA Administrators, to help size the cache.
+    """
+    if not get_access(request).is_admin:
+        return JsonResponse({'error': 'You do not have permission to view cache statistics.'}, status=403)
+    cache = get_file_cache()
+    if cache is None:
+        return JsonResponse({'enabled': False})
+    return JsonResponse(dict(cache.stats(), enabled=True))
+
 
 @login_required
 def team_chat(request, team_id):
@@ -378,13 +872,176 @@ def team_chat(request, team_id):
     Display the chat page for a team with existing messages.
     """
     team = get_object_or_404(Team, id=team_id)  # Get the team or return a 404 if not found
-    chat_messages = TeamChatMessage.objects.filter(team=team).order_by('created_at')  # Retrieve chat messages for the team
+    if not get_access(request).can_view(team):
+        return HttpResponseForbidden("You do not have access to this team.")
+    # Only the newest page is rendered; older messages are loaded on demand through team_chat_history
+    newest = list(
+        TeamChatMessage.objects.filter(team=team)
+        .select_related('user')
+        .order_by('-created_at', '-id')[:CHAT_PAGE_SIZE + 1]
+    )
+    has_older = len(newest) > CHAT_PAGE_SIZE
+    chat_messages = newest[:CHAT_PAGE_SIZE][::-1]  # Display oldest first
+    older_cursor = None
+    if has_older:
+        older_cursor = encode_cursor(chat_messages[0].created_at, chat_messages[0].id)
     return render(request, 'team_chat.html', {
         'team': team,  # Pass the team object to the template
-        'chat_messages': chat_messages  # Pass chat messages to the template
+        'chat_messages': chat_messages,  # Pass chat messages to the template
+        'last_message_id': max((message.id for message in chat_messages), default=0),
+        'older_cursor': older_cursor,  # Cursor for the "load older" request, None when everything is shown
     })
 
 
+@login_required
+def team_chat_history(request, team_id):
+    """
+    Return the page of chat messages older than the ``before`` cursor as JSON.
+    Pages are read with a (created_at, id) keyset filter on the matching index, so
+    scrolling back through a long history costs the same on every page.
+    """
+    team = get_object_or_404(Team, id=team_id)
+    if not get_access(request).can_view(team):
+        return JsonResponse({'error': 'You do not have access to this team.'}, status=403)
+
+    cursor = decode_cursor(request.GET.get('before'), datetime, int)
+    if cursor is None:
+        return JsonResponse({'error': 'Invalid cursor.'}, status=400)
+    before_created_at, before_id = cursor
+
+    rows = list(
+        TeamChatMessage.objects.filter(team=team)
+        .filter(Q(created_at__lt=before_created_at) | Q(created_at=before_created_at, id__lt=before_id))
+        .order_by('-created_at', '-id')
+        .values_list('id', 'user__username', 'message', 'created_at')[:CHAT_PAGE_SIZE + 1]
+    )
+    has_more = len(rows) > CHAT_PAGE_SIZE
+    rows = rows[:CHAT_PAGE_SIZE][::-1]  # Oldest first, ready to prepend
+
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor(rows[0][3], rows[0][0])
+    return JsonResponse({
+        'messages': [_serialize_chat_message(*row) for row in rows],
+        'next_cursor': next_cursor,
+    })
+
+
+def _serialize_chat_message(message_id, username, content, created_at):
+    """
+    Build the JSON payload the chat page uses to render a single message.
+    """
+    return {
+        'id': message_id,
+        'user': username,
+        'content': content,
+        'created_at': timezone.localtime(created_at).strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def _chat_messages_since(team_id, since, limit=CHAT_UPDATES_LIMIT):
+    """
+    Return up to ``limit + 1`` serialized messages of a team with an id greater than ``since``.
+    The extra row tells the caller whether more messages are waiting.
+    """
+    rows = (
+        TeamChatMessage.objects.filter(team_id=team_id, id__gt=since)
+        .order_by('id')
+        .values_list('id', 'user__username', 'message', 'created_at')[:limit + 1]
+    )
+    return [_serialize_chat_message(*row) for row in rows]
+
+
+@login_required
+def team_chat_updates(request, team_id):
+    """
+    Return the chat messages posted after the ``since`` message id as JSON.
+    Polling clients pass the id of the last message they rendered, so each poll only
+    reads the new rows through the (team, id) index. Responds with 204 when nothing changed.
+    """
+    team = get_object_or_404(Team, id=team_id)
+    if not get_access(request).can_view(team):
+        return JsonResponse({'error': 'You do not have access to this team.'}, status=403)
+
+    try:
+        since = int(request.GET.get('since', 0))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid message id.'}, status=400)
+
+    chat_messages = _chat_messages_since(team.id, since)
+    if not chat_messages:
+        return HttpResponse(status=204)
+
+    has_more = len(chat_messages) > CHAT_UPDATES_LIMIT
+    chat_messages = chat_messages[:CHAT_UPDATES_LIMIT]
+    return JsonResponse({
+        'messages': chat_messages,
+        'last_id': chat_messages[-1]['id'],
+        'has_more': has_more,
+    })
+
+
+def _sse_event(message):
+    """
+    Format a serialized chat message as a server-sent event.
+    """
+    return f"id: {message['id']}\ndata: {json.dumps(message)}\n\n"
+
+
+@login_required
+async def team_chat_stream(request, team_id):
+    """
+    Push new chat messages to the browser as server-sent events.
+    Access is checked once when the stream opens; afterwards messages arrive through the
+    chat bus as soon as they are posted. Only served under ASGI - WSGI workers answer 204 so
+    the page falls back to polling instead of pinning a worker for the life of the tab.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    team = await sync_to_async(get_object_or_404)(Team, id=team_id)
+    # Memberships may have to be loaded, which is a query
+    if not await sync_to_async(lambda: get_access(request).can_view(team))():
+        return JsonResponse({'error': 'You do not have access to this team.'}, status=403)
+
+    # Resume after the last message the client saw (EventSource sends Last-Event-ID on reconnect)
+    try:
+        since = int(request.headers.get('Last-Event-ID') or request.GET.get('since', 0))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid message id.'}, status=400)
+
+    async def event_stream():
+        last_id = since
+        subscription = get_chat_bus().subscribe(team.id)
+        try:
+            yield 'retry: 5000\n\n'
+            # Send anything posted between the page render and the subscription, a page at a time
+            while True:
+                missed = await sync_to_async(_chat_messages_since)(team.id, last_id, CHAT_UPDATES_LIMIT)
+                for message in missed[:CHAT_UPDATES_LIMIT]:
+                    last_id = message['id']
+                    yield _sse_event(message)
+                if len(missed) <= CHAT_UPDATES_LIMIT:
+                    break
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.get(), CHAT_STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+                    continue
+                if message['id'] <= last_id:
+                    continue
+                last_id = message['id']
+                yield _sse_event(message)
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Stop proxies from buffering the stream
+    return response
+
+
 @login_required
 def post_chat_message(request, team_id):
     """
@@ -392,11 +1049,13 @@ def post_chat_message(request, team_id):
     """
     if request.method == 'POST':
         team = get_object_or_404(Team, id=team_id)  # Get the team or return a 404 if not found
-        user_profile = request.user.profile
-        
+
         #pma admins should not be able to send message
-        if user_profile.role == 'admin':
+        access = get_access(request)
+        if access.is_admin:
             return JsonResponse({'success': False, 'error': 'PMA Administrators are not allowed to post messages'}, status=403)
+        if not access.can_contribute(team):
+            return JsonResponse({'success': False, 'error': 'Only team members can post messages'}, status=403)
         
         data = json.loads(request.body)  # Parse the JSON body of the request
         message_content = data.get('message', '')  # Get the message content from the data
@@ -408,16 +1067,13 @@ def post_chat_message(request, team_id):
                 user=request.user,
                 message=message_content
             )
+            payload = _serialize_chat_message(
+                new_message.id, request.user.username, new_message.message, new_message.created_at
+            )
+            # Push the message to everyone connected to the team's chat stream
+            transaction.on_commit(lambda: get_chat_bus().publish(team.id, payload))
             # Return the new message data so it can be appended dynamically
-            return JsonResponse({
-                'success': True,
-                'message': {
-                    'id': new_message.id,
-                    'user': new_message.user.username,
-                    'content': new_message.message,
-                    'created_at': new_message.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                }
-            })
+            return JsonResponse({'success': True, 'message': payload})
 
         return JsonResponse({'success': False, 'error': 'Message cannot be empty'})
     return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=400)
@@ -427,7 +1083,7 @@ def leave_team(request, team_id):
     team = get_object_or_404(Team, id=team_id)
     membership = get_object_or_404(TeamMembership, user=request.user, team=team, status='accepted')
 
-    if team.created_by == request.user:
+    if get_access(request).is_owner(team):
         messages.error(request, "Team owners cannot leave their own team.")
         return redirect('team_detail', team_id=team.id)
 
@@ -446,10 +1102,6 @@ def anonymous_login(request):
         # If a logged-in user tries to access this view, redirect to their team list
         return redirect('team_list')
 
-def is_admin(user):
-    """Helper function to check if a user is an admin."""
-    return user.profile.role == 'admin'
-
 @login_required
 def delete_file(request, file_id):
     """
@@ -458,7 +1110,7 @@ def delete_file(request, file_id):
     file = get_object_or_404(TeamFile, id=file_id)
 
     # Ensure the user has permission to delete the file
-    if not (is_admin(request.user) or file.uploaded_by == request.user):
+    if not (get_access(request).is_admin or file.uploaded_by_id == request.user.id):
         return HttpResponseForbidden("You do not have permission to delete this file.")
 
     if request.method == 'POST':  # Ensure the method is POST for deletion
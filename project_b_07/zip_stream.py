@@ -0,0 +1,100 @@
+"""
+Zip archives built on the fly for streaming responses.
+
+``zipfile`` writes into a sink that is not seekable, so each entry is written with a
+data descriptor and nothing has to be rewound. After every chunk the bytes the sink
+holds are handed to the client, so memory stays around one chunk whatever the total
+size. Entries are opened lazily, one at a time.
+"""
+
+import logging
+import os
+import zipfile
+
+from .http_ranges import read_chunks
+
+logger = logging.getLogger(__name__)
+
+# Content that is already compressed is stored as is; deflating it again only costs CPU
+DEFLATE_CONTENT_TYPES = ('text/',)
+
+
+class _ZipSink:
+    """
+    Write-only file object collecting what ``zipfile`` writes until it is drained.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ZipEntry:
+    """
+    A file to add to the archive. ``open()`` returns ``(stream, size, modified)``,
+    or raises to have the entry skipped.
+    """
+
+    def __init__(self, name, content_type, open):
+        self.name = name
+        self.content_type = content_type
+        self.open = open
+
+
+def unique_name(name, used):
+    """
+    Return ``name``, or ``name (2)``, ``name (3)``... if it is already in ``used``.
+    """
+    stem, ext = os.path.splitext(name)
+    candidate = name
+    counter = 2
+    while candidate in used:
+        candidate = f"{stem} ({counter}){ext}"
+        counter += 1
+    used.add(candidate)
+    return candidate
+
+
+def stream_zip(entries):
+    """
+    Yield the bytes of a zip archive containing ``entries``. Entries that cannot be
+    opened are left out, since the response has already started by the time they are reached.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, 'w', allowZip64=True) as archive:
+        for entry in entries:
+            try:
+                stream, size, modified = entry.open()
+            except Exception as e:
+                logger.warning("Leaving %s out of the archive: %s", entry.name, e)
+                continue
+
+            info = zipfile.ZipInfo(entry.name, date_time=max(modified.timetuple()[:6], (1980, 1, 1, 0, 0, 0)))
+            info.compress_type = (
+                zipfile.ZIP_DEFLATED if entry.content_type.startswith(DEFLATE_CONTENT_TYPES) else zipfile.ZIP_STORED
+            )
+            info.file_size = size  # Lets zipfile decide up front whether the entry needs zip64
+            with archive.open(info, 'w') as dest:
+                for chunk in read_chunks(stream, size):
+                    dest.write(chunk)
+                    yield from _drained(sink)
+            yield from _drained(sink)
+    # Closing the archive writes the central directory
+    yield from _drained(sink)
+
+
+def _drained(sink):
+    data = sink.drain()
+    if data:
+        yield data
@@ -13,7 +13,8 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from .models import Milestone
 from .forms import MilestoneForm
-from project_b_07.models import Team, TeamMembership
+from project_b_07.access import get_access
+from project_b_07.models import Team
 from django.contrib import messages
 
 @login_required
@@ -23,8 +24,7 @@ def team_roadmap(request, team_id):
     PMA Administrators can access any team's roadmap.
     """
     team = get_object_or_404(Team, id=team_id)
-    user_profile = request.user.profile
-    is_pma_admin = user_profile.role == 'admin'
+    is_pma_admin = get_access(request).is_admin
 
     # Fetch all milestones for the team
     milestones = Milestone.objects.filter(team=team).order_by('end_date')
@@ -39,20 +39,14 @@ def team_roadmap(request, team_id):
 def add_team_milestone(request, team_id):
     """Add a new milestone for a team."""
     team = get_object_or_404(Team, id=team_id)
-    user = request.user
-    user_profile = request.user.profile
-    is_pma_admin = user_profile.role == 'admin'
+    access = get_access(request)
 
-    if is_pma_admin:
+    if access.is_admin:
         messages.error(request, "PMA Admins are not allowed to add milestones.")
         return redirect('team_detail', team_id=team.id)
     
     # Check if user is a team member
-    is_member = TeamMembership.objects.filter(
-        user=request.user,
-        team=team,
-        status='accepted'
-    ).exists() or team.created_by == request.user
+    is_member = access.is_member(team)
 
     if not is_member:
         messages.error(request, "You must be a team member to add milestones.")
@@ -80,17 +74,15 @@ def edit_team_milestone(request, team_id, milestone_id):
     """Edit an existing team milestone."""
     team = get_object_or_404(Team, id=team_id)
     milestone = get_object_or_404(Milestone, id=milestone_id, team=team)
-    user = request.user
-    user_profile = request.user.profile
-    is_pma_admin = user_profile.role == 'admin'
+    access = get_access(request)
 
     # PMA Admins cannot edit milestones
-    if is_pma_admin:
+    if access.is_admin:
         messages.error(request, "PMA Administrators cannot edit milestones.")
         return redirect('team_roadmap', team_id=team.id)
     
     # Check if user is a team owner or milestone creator
-    is_authorized = team.created_by == user or milestone.user == user
+    is_authorized = access.is_owner(team) or milestone.user_id == request.user.id
 
     if not is_authorized:
         messages.error(request, "You must be the team owner or milestone creator to edit this milestone.")
@@ -116,12 +108,10 @@ def delete_team_milestone(request, team_id, milestone_id):
     """Delete a team milestone."""
     team = get_object_or_404(Team, id=team_id)
     milestone = get_object_or_404(Milestone, id=milestone_id, team=team)
-    user = request.user
-
     # Check if the user is a PMA Admin or the team owner/milestone creator
-    user_profile = request.user.profile
-    is_pma_admin = user_profile.role == 'admin'
-    is_authorized = is_pma_admin or team.created_by == user or milestone.user == user
+    access = get_access(request)
+    is_pma_admin = access.is_admin
+    is_authorized = is_pma_admin or access.is_owner(team) or milestone.user_id == request.user.id
 
     # PMA Admins cannot delite milestones
     if is_pma_admin:
@@ -147,9 +137,7 @@ def mark_milestone_complete(request, team_id, milestone_id):
     """Mark a milestone as complete."""
     team = get_object_or_404(Team, id=team_id)
     milestone = get_object_or_404(Milestone, id=milestone_id, team=team)
-    user = request.user
-
-    is_authorized = team.created_by == user or milestone.user == user
+    is_authorized = get_access(request).is_owner(team) or milestone.user_id == request.user.id
     if not is_authorized:
         messages.error(request, "You must be the team owner or milestone creator to mark this milestone as complete.")
         return redirect('team_roadmap', team_id=team.id)
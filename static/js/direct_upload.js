@@ -0,0 +1,74 @@
+// Uploads the selected file straight to S3 with a presigned POST, then tells the
+// server to record it. Falls back to the regular form submission if any step of
+// the direct upload cannot be started.
+document.addEventListener('DOMContentLoaded', () => {
+    const form = document.getElementById('uploadForm');
+    if (!form || !form.dataset.presignUrl) {
+        return;
+    }
+
+    form.addEventListener('submit', event => {
+        const fileInput = form.querySelector('input[type="file"]');
+        const file = fileInput && fileInput.files[0];
+        if (!file || form.dataset.directUploadFailed) {
+            return; // Let the browser submit the form normally
+        }
+        event.preventDefault();
+
+        const csrfToken = form.querySelector('input[name="csrfmiddlewaretoken"]').value;
+        const submitButton = form.querySelector('button[type="submit"]');
+        submitButton.disabled = true;
+
+        fetch(form.dataset.presignUrl, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json', 'X-CSRFToken': csrfToken },
+            body: JSON.stringify({ file_name: file.name, content_type: file.type, size: file.size })
+        })
+        .then(response => {
+            if (!response.ok) {
+                throw new Error('presign');
+            }
+            return response.json();
+        })
+        .then(presigned => {
+            const s3Data = new FormData();
+            Object.entries(presigned.fields).forEach(([name, value]) => s3Data.append(name, value));
+            s3Data.append('file', file); // S3 requires the file to be the last field
+            return fetch(presigned.url, { method: 'POST', body: s3Data }).then(response => {
+                if (!response.ok) {
+                    throw new Error('S3 rejected the upload.');
+                }
+                return presigned.key;
+            });
+        })
+        .then(key => {
+            const details = new FormData();
+            details.append('key', key);
+            ['title', 'description', 'keywords'].forEach(name => {
+                const field = form.querySelector(`[name="${name}"]`);
+                details.append(name, field ? field.value : '');
+            });
+            return fetch(form.dataset.completeUrl, {
+                method: 'POST',
+                headers: { 'X-CSRFToken': csrfToken },
+                body: details
+            }).then(response => response.json());
+        })
+        .then(result => {
+            if (!result.success) {
+                throw new Error(result.error || 'Upload failed.');
+            }
+            window.location.href = form.dataset.successUrl;
+        })
+        .catch(error => {
+            submitButton.disabled = false;
+            if (error.message === 'presign') {
+                // Direct upload is unavailable for this file; upload through the server instead
+                form.dataset.directUploadFailed = 'true';
+                form.requestSubmit();
+            } else {
+                alert(error.message);
+            }
+        });
+    });
+});
@@ -0,0 +1,32 @@
+# backends.py
+from allauth.account.auth_backends import AuthenticationBackend
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+UserModel = get_user_model()
+
+
+class ProfileUserMixin:
+    """
+    Load the session user together with their Profile, so the role checks every view makes
+    (and ``project_b_07.access``) cost no query of their own.
+    """
+
+    def get_user(self, user_id):
+        try:
+            user = UserModel._default_manager.select_related('profile').get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+
+class ProfileModelBackend(ProfileUserMixin, ModelBackend):
+    """
+    Django's username and password backend, loading the user with their Profile.
+    """
+
+
+class ProfileAuthenticationBackend(ProfileUserMixin, AuthenticationBackend):
+    """
+    The allauth backend, loading the user with their Profile.
+    """
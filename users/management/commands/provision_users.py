@@ -0,0 +1,74 @@
+import argparse
+import csv
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+
+from project_b_07.models import Team, TeamMembership
+from users.models import Profile
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Create users and their profiles in bulk from a CSV with a 'username' column and optional "
+        "'email', 'first_name' and 'last_name' columns. Existing usernames are left as they are. "
+        "Users sign in with Google, so they get no usable password."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', type=argparse.FileType(encoding='utf-8'), help="Path of the CSV file.")
+        parser.add_argument('--role', choices=[choice for choice, _ in Profile.ROLE_CHOICES], default='common',
+                            help="Role of the new profiles.")
+        parser.add_argument('--team', type=int, help="Also make every listed user an accepted member of this team; existing memberships are kept.")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows per INSERT.")
+
+    def handle(self, *args, **options):
+        with options['csv_file'] as csv_file:
+            rows = list(csv.DictReader(csv_file))
+        if rows and 'username' not in rows[0]:
+            raise CommandError("The CSV needs a 'username' column.")
+        rows = {row['username'].strip(): row for row in rows if (row.get('username') or '').strip()}
+        team = None
+        if options['team'] is not None:
+            team = Team.objects.filter(pk=options['team']).first()
+            if team is None:
+                raise CommandError(f"Team {options['team']} does not exist.")
+
+        batch_size = options['batch_size']
+        unusable_password = make_password(None)
+        with transaction.atomic():
+            existing = set(User.objects.filter(username__in=rows).values_list('username', flat=True))
+            # bulk_create sends no post_save, so the profiles are inserted here rather than by the signal
+            User.objects.bulk_create([
+                User(
+                    username=username,
+                    email=(row.get('email') or '').strip(),
+                    first_name=(row.get('first_name') or '').strip(),
+                    last_name=(row.get('last_name') or '').strip(),
+                    password=unusable_password,
+                )
+                for username, row in rows.items() if username not in existing
+            ], batch_size=batch_size)
+            user_ids = dict(User.objects.filter(username__in=rows).values_list('username', 'id'))
+            new_ids = [user_id for username, user_id in user_ids.items() if username not in existing]
+            Profile.objects.bulk_create(
+                [Profile(user_id=user_id, role=options['role']) for user_id in new_ids], batch_size=batch_size,
+            )
+
+            if team is not None:
+                TeamMembership.objects.bulk_create(
+                    [TeamMembership(user_id=user_id, team=team, status='accepted') for user_id in user_ids.values()],
+                    batch_size=batch_size, ignore_conflicts=True,
+                )
+                # Existing users may have cached team access; new ones start from a fresh version
+                old_ids = [user_id for username, user_id in user_ids.items() if username in existing]
+                Profile.objects.filter(user_id__in=old_ids).update(access_version=F('access_version') + 1)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(new_ids)} user(s); {len(existing)} already existed."
+        ))
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.1 on 2026-10-18 21:19
+
+import users.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='access_version',
+            field=models.PositiveIntegerField(default=users.models.new_access_version, editable=False),
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def create_missing_profiles(apps, schema_editor):
+    """
+    Give every user without a profile a common one, now that requests no longer create them.
+    """
+    User = apps.get_model('auth', 'User')
+    Profile = apps.get_model('users', 'Profile')
+    user_ids = User.objects.filter(profile__isnull=True).values_list('id', flat=True)
+    Profile.objects.bulk_create(
+        [Profile(user_id=user_id, role='common') for user_id in user_ids.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0002_profile_access_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_missing_profiles, migrations.RunPython.noop),
+    ]
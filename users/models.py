@@ -21,6 +21,15 @@ from django.contrib.auth.models import User  # Import the built-in User model fo
 from django.db import models  # Import Django's models module for database modeling
 from django.conf import settings  # Import settings for project-level configurations
 from project_b_07.models import Team  # Import the Team model from another app in the project
+import secrets
+
+
+def new_access_version():
+    """
+    Random starting version for the cached team access of a new profile, so a reused
+    user id never meets an entry cached for an earlier user (see project_b_07/access.py).
+    """
+    return secrets.randbelow(2 ** 30)
 
 class Profile(models.Model):
     """
@@ -33,6 +42,57 @@ class Profile(models.Model):
     ]
     user = models.OneToOneField(User, on_delete=models.CASCADE)  # Link each Profile to a single User with one-to-one relationship
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='common')  # Role field with choices and a default value
+    access_version = models.PositiveIntegerField(default=new_access_version, editable=False)  # Bumped whenever the user's team access may have changed
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remember the loaded field values so changed_fields() can tell what was edited since.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._saved_values = instance._tracked_values()
+        return instance
+
+    def _tracked_values(self):
+        """
+        Current values of the fields a save persists; access_version is the profile's own bookkeeping.
+        """
+        return {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+            if not field.primary_key and field.attname != 'access_version' and field.attname in self.__dict__
+        }
+
+    def changed_fields(self):
+        """
+        Names of the fields changed since the profile was loaded or last saved (all of them for a new profile).
+        """
+        saved = getattr(self, '_saved_values', None)
+        current = self._tracked_values()
+        if self._state.adding or saved is None:
+            return set(current)
+        return {name for name, value in current.items() if name not in saved or saved[name] != value}
+
+    def save(self, *args, **kwargs):
+        """
+        Save the profile and retire the user's cached team access, since the role may have changed.
+        """
+        bump = not self._state.adding
+        if bump:
+            # Incremented in the database, so a stale instance never rolls back a bump made meanwhile
+            self.access_version = models.F('access_version') + 1
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'access_version'}
+        super().save(*args, **kwargs)
+        if bump:
+            self.refresh_from_db(fields=['access_version'])
+        current = self._tracked_values()
+        if update_fields is not None and getattr(self, '_saved_values', None) is not None:
+            # Fields left out of update_fields still differ from the row
+            written = {self._meta.get_field(name).attname for name in update_fields}
+            current = {**self._saved_values, **{name: value for name, value in current.items() if name in written}}
+        self._saved_values = current
 
     def is_admin(self):
         """
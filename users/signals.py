@@ -1,4 +1,5 @@
 # signals.py
+from django.contrib.auth.signals import user_logged_in
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
@@ -12,6 +13,16 @@ def create_user_profile(sender, instance, created, **kwargs):
 
 @receiver(post_save, sender=User)
 def save_user_profile(sender, instance, **kwargs):
-    # Save the profile if it exists to handle any updates
-    if hasattr(instance, 'profile'):
-        instance.profile.save()
\ No newline at end of file
+    # Save the profile along with the user only if it was loaded and edited; a profile that
+    # was never fetched (e.g., on the last_login update at each login) has nothing to save
+    if User.profile.is_cached(instance):
+        profile = getattr(instance, 'profile', None)
+        if profile is not None and profile.changed_fields():
+            profile.save()
+
+@receiver(user_logged_in)
+def ensure_user_profile(sender, user, **kwargs):
+    # Users created without the signal above (e.g., bulk inserts) get their profile at
+    # login rather than on every request; the session user is loaded with it from then on
+    if not hasattr(user, 'profile'):
+        Profile.objects.get_or_create(user=user, defaults={'role': 'common'})
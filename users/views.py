@@ -18,7 +18,8 @@ from django.http import JsonResponse
 from django.contrib import messages
 import json
 import datetime
-from project_b_07.models import Team, TeamMembership, TeamFile, TeamChatMessage
+from project_b_07.access import get_access
+from project_b_07.models import Team, TeamFile, TeamChatMessage
 from roadmap.models import Milestone
 
 @login_required
@@ -30,12 +31,12 @@ def home(request):
     user = request.user
     
     # Check if the user belongs to the 'admin' or 'common' group
-    user_profile = request.user.profile
-    is_admin = user_profile.role == 'admin'
-    is_common_user = user_profile.role == 'common'
+    access = get_access(request)
+    is_admin = access.is_admin
+    is_common_user = access.is_common
 
     # Fetch user's teams
-    user_teams = Team.objects.filter(memberships__user=user, memberships__status='accepted')
+    user_teams = Team.objects.filter(id__in=access.accepted_team_ids())
 
     # Fetch messages related to user's teams
     user_messages = TeamChatMessage.objects.filter(team__in=user_teams).order_by('-created_at')[:10]
@@ -71,8 +72,7 @@ def calendar_view(request, team_id):
     PMA Administrators can access any team's calendar.
     """
     team = get_object_or_404(Team, id=team_id)
-    user_profile = request.user.profile
-    is_pma_admin = user_profile.role == 'admin'
+    is_pma_admin = get_access(request).is_admin
 
     # Fetch all availability events for the team
     availabilities = Availability.objects.filter(team=team)
@@ -92,14 +92,9 @@ def add_availability(request, team_id):
     team = get_object_or_404(Team, id=team_id)
 
     # Check if the user is a team member
-    is_member = TeamMembership.objects.filter(
-        user=request.user,
-        team=team,
-        status='accepted'
-    ).exists() or team.created_by == request.user
-
-    user_profile = request.user.profile
-    is_pma_admin = user_profile.role == 'admin'
+    access = get_access(request)
+    is_member = access.is_member(team)
+    is_pma_admin = access.is_admin
 
     if is_pma_admin:
         messages.error(request, "You do not have permission to add availability.")
@@ -152,11 +147,9 @@ def delete_availability(request, team_id, availability_id):
     team = get_object_or_404(Team, id=team_id)
     availability = get_object_or_404(Availability, id=availability_id, team=team)
     user = request.user
-    user_profile = request.user.profile
-    is_pma_admin = user_profile.role == 'admin'
 
     # Check permissions
-    is_authorized = availability.user == user or team.created_by == user
+    is_authorized = availability.user_id == user.id or get_access(request).is_owner(team)
 
     if not is_authorized:
         return JsonResponse({'error': 'You do not have permission to delete this availability.'}, status=403)
@@ -173,12 +166,9 @@ def get_availability_data(request, team_id):
     Retrieves all availability data for a specific team.
     """
     team = get_object_or_404(Team, id=team_id)
-    user = request.user
-    user_profile = request.user.profile
-    is_pma_admin = user_profile.role == 'admin'
 
     # Check if the user has access to the team's data
-    is_member = TeamMembership.objects.filter(user=user, team=team, status='accepted').exists() or is_pma_admin
+    is_member = get_access(request).can_view(team)
 
     if not is_member:
         return JsonResponse({'error': 'You do not have access to this team.'}, status=403)